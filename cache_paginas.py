@@ -0,0 +1,140 @@
+"""Cache das páginas: `st.cache_data` e `st.cache_resource` com limites e contadores.
+
+Os módulos de `riscos` já guardam séries, cotações e modelos ajustados (em disco e em
+memória). Esta camada fica por cima, no processo do Streamlit, e evita refazer a cada
+interação o que só depende dos mesmos argumentos: consultas às fontes de dados,
+séries reduzidas para os gráficos, figuras Plotly e arquivos para download.
+
+- `cache_dados`: resultados serializáveis (DataFrames, bytes); cada acerto devolve uma
+  cópia, então a página pode alterar o resultado à vontade;
+- `cache_recurso`: objetos compartilhados entre sessões, sem cópia (figuras); não devem
+  ser alterados depois de criados.
+
+Todo cache tem limite de entradas (as mais antigas saem primeiro), para limitar a
+memória do processo, e os dados remotos têm validade (`TTL_DADOS_REMOTOS`). Acertos,
+falhas e tempos de cada função são contados e aparecem em `painel_depuracao()`, na
+barra lateral, com RISCOS_DEPURAR_CACHE=1 no ambiente ou `?depurar=cache` na URL.
+"""
+import functools
+import os
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+# Validade das consultas às fontes remotas (BCB, Yahoo Finance)
+TTL_DADOS_REMOTOS = timedelta(hours=1)
+
+# Entradas mantidas por função: dados tabulares, figuras e arquivos gerados
+MAX_ENTRADAS_DADOS = 64
+MAX_ENTRADAS_GRAFICOS = 32
+MAX_ENTRADAS_ARQUIVOS = 8
+
+_estatisticas = {}
+_funcoes = {}
+_trava = threading.Lock()
+_local = threading.local()
+
+
+def _contar(nome, calculou, duracao):
+    with _trava:
+        contadores = _estatisticas.setdefault(nome, {"acertos": 0, "falhas": 0, "tempo_acertos": 0.0,
+                                                     "tempo_falhas": 0.0})
+        tipo = "falhas" if calculou else "acertos"
+        contadores[tipo] += 1
+        contadores[f"tempo_{tipo}"] += duracao
+
+
+def _com_contadores(decorador, funcao):
+    """Aplica o decorador de cache do Streamlit a `funcao` e conta acertos e falhas de cada chamada.
+
+    A função decorada só executa numa falha; ela marca a chamada corrente (por thread)
+    como calculada. A marcação anterior é restaurada no fim, para chamadas aninhadas.
+    """
+    nome = f"{Path(funcao.__code__.co_filename).stem}: {funcao.__qualname__}"
+
+    @functools.wraps(funcao)
+    def calcular(*args, **kwargs):
+        _local.calculou = True
+        return funcao(*args, **kwargs)
+
+    em_cache = decorador(calcular)
+
+    @functools.wraps(funcao)
+    def chamar(*args, **kwargs):
+        anterior = getattr(_local, "calculou", False)
+        _local.calculou = False
+        inicio = time.perf_counter()
+        try:
+            return em_cache(*args, **kwargs)
+        finally:
+            _contar(nome, _local.calculou, time.perf_counter() - inicio)
+            _local.calculou = anterior
+
+    chamar.clear = em_cache.clear
+    _funcoes[nome] = chamar
+    return chamar
+
+
+def cache_dados(ttl=None, max_entries=MAX_ENTRADAS_DADOS):
+    """Decorador `st.cache_data` com contadores. Argumentos com prefixo `_` ficam fora da chave."""
+    return lambda funcao: _com_contadores(st.cache_data(ttl=ttl, max_entries=max_entries, show_spinner=False),
+                                          funcao)
+
+
+def cache_recurso(ttl=None, max_entries=MAX_ENTRADAS_GRAFICOS):
+    """Decorador `st.cache_resource` com contadores, para objetos compartilhados e não alterados."""
+    return lambda funcao: _com_contadores(st.cache_resource(ttl=ttl, max_entries=max_entries, show_spinner=False),
+                                          funcao)
+
+
+def estatisticas():
+    """Tabela com acertos, falhas, tempos médios e tempo poupado de cada função em cache."""
+    with _trava:
+        linhas = [(nome, dict(contadores)) for nome, contadores in _estatisticas.items()]
+    tabela = pd.DataFrame([{
+        "Função": nome,
+        "Acertos": contadores["acertos"],
+        "Falhas": contadores["falhas"],
+        "Taxa de acerto (%)": 100 * contadores["acertos"] / (contadores["acertos"] + contadores["falhas"]),
+        "Falha média (ms)": 1000 * contadores["tempo_falhas"] / max(contadores["falhas"], 1),
+        "Acerto médio (ms)": 1000 * contadores["tempo_acertos"] / max(contadores["acertos"], 1),
+    } for nome, contadores in linhas], columns=["Função", "Acertos", "Falhas", "Taxa de acerto (%)",
+                                                 "Falha média (ms)", "Acerto médio (ms)"])
+    # Cada acerto poupa o tempo médio de uma falha, menos o que o próprio acerto levou
+    tabela["Economia (s)"] = (tabela["Acertos"] * (tabela["Falha média (ms)"] - tabela["Acerto médio (ms)"])
+                              / 1000).clip(lower=0)
+    return tabela.sort_values("Função", ignore_index=True)
+
+
+def limpar():
+    """Esvazia todos os caches registrados e zera os contadores."""
+    for funcao in list(_funcoes.values()):
+        funcao.clear()
+    with _trava:
+        _estatisticas.clear()
+
+
+def depuracao_ativa():
+    return os.environ.get("RISCOS_DEPURAR_CACHE") == "1" or st.query_params.get("depurar") == "cache"
+
+
+def painel_depuracao():
+    """Contadores dos caches na barra lateral; chamado no fim da página, para incluir a execução corrente."""
+    if not depuracao_ativa():
+        return
+    with st.sidebar.expander("🛠️ Cache (depuração)", expanded=True):
+        tabela = estatisticas()
+        if tabela.empty:
+            st.caption("Nenhuma função em cache foi chamada neste processo.")
+            return
+        st.dataframe(tabela, hide_index=True, use_container_width=True,
+                     column_config={coluna: st.column_config.NumberColumn(format="%.2f")
+                                    for coluna in tabela.columns[3:]})
+        st.caption(f"Tempo poupado pelos acertos desde o início do processo: {tabela['Economia (s)'].sum():.2f} s. "
+                   "Os contadores valem para todas as sessões e páginas.")
+        if st.button("Limpar caches", key="limpar_caches"):
+            limpar()
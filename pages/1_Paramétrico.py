@@ -1,8 +1,12 @@
+from datetime import date, timedelta
+from statistics import NormalDist
+
 import streamlit as st
 import numpy as np
-from scipy.stats import norm
 import pandas as pd
 
+from riscos.parametrico import ESTIMADORES, covariancia_historica, decompor_var, var_parametrico
+
 # Configuração da página
 st.set_page_config(page_title="Cálculo de VaR Paramétrico", layout="wide")
 st.title("Cálculo de VaR Paramétrico")
@@ -13,48 +17,108 @@ diária e um nível de confiança, assumindo que os retornos seguem uma distribu
 para calcular o VaR do seu portfólio em um horizonte de tempo específico!
 """)
 
-# Entrada do usuário
-st.subheader("Insira os dados do portfólio")
-valor_portfolio = st.number_input("💰 Valor do portfólio (R$)", min_value=0.0, value=1000000.0, format="%.2f")
-volatilidade_diaria = st.number_input("📉 Volatilidade diária (% por dia)", min_value=0.0, value=1.26, format="%.2f")
-nivel_confianca = st.selectbox("🔍 Nível de confiança", options=[0.90, 0.95, 0.99], index=1)
-horizonte_tempo = st.number_input("📅 Horizonte de tempo (dias)", min_value=1, value=1, format="%d")
-
-# Botão para calcular
-if st.button("🚀 Calcular VaR"):
-    # Conversão dos inputs
-    volatilidade_horizonte = (volatilidade_diaria / 100) * np.sqrt(horizonte_tempo)  # Ajusta para o horizonte de tempo
-    z_score = norm.ppf(nivel_confianca)  # Z-score correspondente ao nível de confiança
-
-    # Cálculo do VaR
-    var = valor_portfolio * volatilidade_horizonte * z_score
-    var_percentual = (var / valor_portfolio) * 100
-
-    # Exibição dos resultados
-    st.subheader("📊 Resultado do VaR")
-    st.success(f"✅ **VaR ({nivel_confianca*100:.0f}% de confiança):** R$ {var:,.2f}")
-    st.write(f"**VaR percentual:** {var_percentual:.2f}% do valor do portfólio")
-
-    # Interpretação do resultado
-    st.write("🔍 **O que isso significa?**")
-    st.write(f"""
-    Com {nivel_confianca*100:.0f}% de confiança, a perda máxima esperada do portfólio em {horizonte_tempo} 
-    dia(s) é de R$ {var:,.2f}. Isso significa que há uma chance de {100 - nivel_confianca*100:.0f}% de as perdas 
-    excederem esse valor, considerando a volatilidade diária de {volatilidade_diaria:.2f}% e a distribuição normal 
-    dos retornos.
-    """)
-    st.write(f"""
-    - **Volatilidade no horizonte:** {(volatilidade_horizonte*100):.2f}%  
-    - **Z-score usado:** {z_score:.2f}
-    """)
-
-    # Gráfico simples da distribuição
-    st.subheader("📈 Visualização da Distribuição")
-    x = np.linspace(-4, 4, 100)  # Z-scores para a curva normal
-    y = norm.pdf(x, 0, 1)  # Densidade da normal padrão
-    df = pd.DataFrame({"Z-score": x, "Densidade": y}).set_index("Z-score")
-    st.line_chart(df)
-    st.write(f"A linha vertical seria em {z_score:.2f}, delimitando o VaR na cauda esquerda.")
+# Uma posição com volatilidade informada ou uma carteira com covariância estimada do histórico
+modo = st.radio("Tipo de cálculo", ["Posição única", "Carteira"], horizontal=True)
+
+if modo == "Posição única":
+    # Entrada do usuário
+    st.subheader("Insira os dados do portfólio")
+    valor_portfolio = st.number_input("💰 Valor do portfólio (R$)", min_value=0.0, value=1000000.0, format="%.2f")
+    volatilidade_diaria = st.number_input("📉 Volatilidade diária (% por dia)", min_value=0.0, value=1.26, format="%.2f")
+    nivel_confianca = st.selectbox("🔍 Nível de confiança", options=[0.90, 0.95, 0.99], index=1)
+    horizonte_tempo = st.number_input("📅 Horizonte de tempo (dias)", min_value=1, value=1, format="%d")
+
+    # Botão para calcular
+    if st.button("🚀 Calcular VaR"):
+        # Conversão dos inputs
+        volatilidade_horizonte = (volatilidade_diaria / 100) * np.sqrt(horizonte_tempo)  # Ajusta para o horizonte de tempo
+        z_score = NormalDist().inv_cdf(nivel_confianca)  # Z-score correspondente ao nível de confiança
+
+        # Cálculo do VaR
+        var = var_parametrico(valor_portfolio, volatilidade_diaria / 100, nivel_confianca, horizonte_tempo)
+        var_percentual = (var / valor_portfolio) * 100
+
+        # Exibição dos resultados
+        st.subheader("📊 Resultado do VaR")
+        st.success(f"✅ **VaR ({nivel_confianca*100:.0f}% de confiança):** R$ {var:,.2f}")
+        st.write(f"**VaR percentual:** {var_percentual:.2f}% do valor do portfólio")
+
+        # Interpretação do resultado
+        st.write("🔍 **O que isso significa?**")
+        st.write(f"""
+        Com {nivel_confianca*100:.0f}% de confiança, a perda máxima esperada do portfólio em {horizonte_tempo} 
+        dia(s) é de R$ {var:,.2f}. Isso significa que há uma chance de {100 - nivel_confianca*100:.0f}% de as perdas 
+        excederem esse valor, considerando a volatilidade diária de {volatilidade_diaria:.2f}% e a distribuição normal 
+        dos retornos.
+        """)
+        st.write(f"""
+        - **Volatilidade no horizonte:** {(volatilidade_horizonte*100):.2f}%  
+        - **Z-score usado:** {z_score:.2f}
+        """)
+
+        # Gráfico simples da distribuição
+        st.subheader("📈 Visualização da Distribuição")
+        x = np.linspace(-4, 4, 100)  # Z-scores para a curva normal
+        y = np.exp(-x ** 2 / 2) / np.sqrt(2 * np.pi)  # Densidade da normal padrão
+        df = pd.DataFrame({"Z-score": x, "Densidade": y}).set_index("Z-score")
+        st.line_chart(df)
+        st.write(f"A linha vertical seria em {z_score:.2f}, delimitando o VaR na cauda esquerda.")
+
+else:
+    st.subheader("Insira as posições da carteira")
+    arquivo_posicoes = st.file_uploader("Posições (CSV com colunas Ativo e Exposição (R$))", type="csv")
+    if arquivo_posicoes is not None:
+        df_posicoes = pd.read_csv(arquivo_posicoes)
+    else:
+        df_posicoes = pd.DataFrame({
+            "Ativo": ["PETR4.SA", "VALE3.SA", "ITUB4.SA", "BOVA11.SA"],
+            "Exposição (R$)": [400_000.0, 300_000.0, 200_000.0, -150_000.0],
+        })
+    df_posicoes = st.data_editor(df_posicoes, num_rows="dynamic", use_container_width=True).dropna()
+    # Posições repetidas do mesmo ativo são somadas
+    posicoes = df_posicoes.groupby(df_posicoes["Ativo"].astype(str).str.strip().str.upper(),
+                                   sort=False)["Exposição (R$)"].sum()
+
+    estimador = st.selectbox("🧮 Estimador da covariância", list(ESTIMADORES), format_func=ESTIMADORES.get,
+                             help="Ledoit-Wolf reduz o ruído da matriz amostral quando há muitos ativos "
+                                  "em relação ao número de dias.")
+    dias_historico = st.number_input("🗓️ Histórico para a covariância (dias corridos)", min_value=30, value=365)
+    nivel_confianca = st.selectbox("🔍 Nível de confiança", options=[0.90, 0.95, 0.99], index=1)
+    horizonte_tempo = st.number_input("📅 Horizonte de tempo (dias)", min_value=1, value=1, format="%d")
+
+    if st.button("🚀 Calcular VaR da Carteira") and len(posicoes):
+        try:
+            with st.spinner(f"Estimando a covariância de {len(posicoes)} ativos..."):
+                covariancia, retornos = covariancia_historica(posicoes.index, date.today() - timedelta(days=int(dias_historico)),
+                                                              estimador)
+        except ValueError as erro:
+            st.error(str(erro))
+            st.stop()
+
+        resultado = decompor_var(posicoes.to_numpy(dtype=float), covariancia, nivel_confianca, horizonte_tempo)
+        valor_bruto = posicoes.abs().sum()
+
+        st.subheader("📊 Resultado do VaR da Carteira")
+        st.success(f"✅ **VaR ({nivel_confianca*100:.0f}% de confiança):** R$ {resultado['var']:,.2f}")
+        st.write(f"**VaR percentual:** {resultado['var'] / valor_bruto * 100:.2f}% da exposição bruta")
+        st.caption(f"Covariância estimada com {len(retornos)} dias de retornos comuns a todos os ativos "
+                   f"({retornos.index[0]:%d/%m/%Y} a {retornos.index[-1]:%d/%m/%Y}).")
+
+        st.subheader("🧩 Decomposição do VaR")
+        st.dataframe(pd.DataFrame({
+            "Ativo": posicoes.index,
+            "Exposição (R$)": posicoes.to_numpy(),
+            "Volatilidade Diária (%)": np.sqrt(np.diag(covariancia)) * 100,
+            "VaR Marginal": resultado["var_marginal"],
+            "VaR Componente (R$)": resultado["var_componentes"],
+            "Contribuição (%)": resultado["var_componentes"] / resultado["var"] * 100,
+            "VaR Incremental (R$)": resultado["var_incremental"],
+        }), use_container_width=True, hide_index=True)
+        st.write("""
+        - **VaR marginal:** variação do VaR por R$ 1 adicional na posição.  
+        - **VaR componente:** parcela do VaR atribuída à posição; os componentes somam o VaR total.  
+        - **VaR incremental:** redução do VaR se a posição fosse zerada.
+        """)
 
 # Informações adicionais
 st.markdown("""
@@ -1,5 +1,10 @@
+import os
+
 import streamlit as st
 import numpy as np
+import pandas as pd
+
+from riscos.monte_carlo import AMOSTRAGENS, covariancia_correlacao, var_monte_carlo
 
 # Configurar layout wide
 st.set_page_config(page_title="Simulação de VaR Monte Carlo", layout="wide")
@@ -11,39 +16,124 @@ st.title("Simulação de VaR Monte Carlo")
 def formatar_moeda(valor):
     return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
-# Entrada do valor da exposição sem formatação (internamente)
-valor_exposicao = st.number_input("Valor da Exposição (R$)", min_value=1_000_000, value=100_000_000, step=1_000_000)
+# Escolha entre uma única exposição ou uma carteira com várias posições correlacionadas
+modo = st.radio("Tipo de simulação", ["Exposição única", "Carteira"], horizontal=True)
+
+if modo == "Exposição única":
+    # Entrada do valor da exposição sem formatação (internamente)
+    valor_exposicao = st.number_input("Valor da Exposição (R$)", min_value=1_000_000, value=100_000_000, step=1_000_000)
+
+    # Entrada de outros parâmetros
+    media_retorno = st.number_input("Média de Retorno Diário (%)", value=0.05) / 100
+    desvio_padrao = st.number_input("Volatilidade Diária (%)", value=2.0) / 100
+
+    ativos = ["Exposição"]
+    exposicoes = np.array([valor_exposicao], dtype=float)
+    medias = np.array([media_retorno])
+    covariancia = np.array([[desvio_padrao ** 2]])
+else:
+    st.markdown("""
+    Informe as posições da carteira (uma linha por ativo) e a correlação entre os retornos.
+    Para carteiras grandes, envie arquivos CSV com as posições e com a matriz de correlação.
+    """)
+    arquivo_posicoes = st.file_uploader(
+        "Posições (CSV com colunas Ativo, Exposição (R$), Média (%), Volatilidade (%))", type="csv")
+    if arquivo_posicoes is not None:
+        df_posicoes = pd.read_csv(arquivo_posicoes)
+    else:
+        df_posicoes = pd.DataFrame({
+            "Ativo": ["PETR4", "VALE3", "USD/BRL"],
+            "Exposição (R$)": [40_000_000.0, 35_000_000.0, 25_000_000.0],
+            "Média (%)": [0.05, 0.04, 0.01],
+            "Volatilidade (%)": [2.2, 1.9, 0.9],
+        })
+    df_posicoes = st.data_editor(df_posicoes, num_rows="dynamic", use_container_width=True).dropna()
+
+    ativos = df_posicoes["Ativo"].astype(str).tolist()
+    exposicoes = df_posicoes["Exposição (R$)"].to_numpy(dtype=float)
+    medias = df_posicoes["Média (%)"].to_numpy(dtype=float) / 100
+    volatilidades = df_posicoes["Volatilidade (%)"].to_numpy(dtype=float) / 100
+
+    arquivo_correlacao = st.file_uploader("Matriz de correlação (CSV quadrado, na ordem das posições)", type="csv")
+    if arquivo_correlacao is not None:
+        correlacao = pd.read_csv(arquivo_correlacao, index_col=0).to_numpy(dtype=float)
+    else:
+        correlacao = st.slider("Correlação entre os ativos", min_value=-0.5, max_value=1.0, value=0.3, step=0.05)
+
+    try:
+        covariancia = covariancia_correlacao(volatilidades, correlacao)
+    except ValueError as erro:
+        st.error(str(erro))
+        st.stop()
 
-# Entrada de outros parâmetros
-media_retorno = st.number_input("Média de Retorno Diário (%)", value=0.05) / 100
-desvio_padrao = st.number_input("Volatilidade Diária (%)", value=2.0) / 100
 num_simulacoes = st.number_input("Número de Simulações", min_value=1_000, value=100_000, step=1_000)
 nivel_confianca = st.slider("Nível de Confiança (%)", min_value=90, max_value=99, value=95) / 100
 
+# Redução de variância: menos cenários para a mesma precisão do VaR
+amostragem = st.selectbox("Método de amostragem", list(AMOSTRAGENS), format_func=AMOSTRAGENS.get,
+                          help="Antitéticas, Sobol/Halton e amostragem por importância reduzem o erro padrão "
+                               "do VaR para o mesmo número de simulações.")
+
+# Execução paralela e reprodutibilidade
+with st.expander("⚙️ Opções de execução"):
+    processos = st.number_input("Processos paralelos", min_value=1, max_value=os.cpu_count() or 1, value=1, step=1,
+                                help="Divide as simulações entre processos; útil a partir de alguns milhões de cenários.")
+    fixar_semente = st.checkbox("Fixar semente (resultado reproduzível)", value=True)
+    semente = st.number_input("Semente", min_value=0, value=42, step=1, disabled=not fixar_semente)
+    streaming = st.checkbox("Quantil em streaming (memória constante)", value=False,
+                            help="Não guarda todos os cenários: VaR e ES são estimados por um histograma "
+                                 "da cauda, com erro máximo informado junto ao resultado.")
+
 # Botão para calcular
 if st.button("Calcular VaR"):
-    # Gerar simulação de retornos aleatórios
-    retornos_simulados = np.random.normal(media_retorno, desvio_padrao, num_simulacoes)
-
-    # Calcular perdas simuladas
-    perdas = valor_exposicao * retornos_simulados
+    try:
+        resultado = var_monte_carlo(exposicoes, covariancia, nivel_confianca, int(num_simulacoes), medias=medias,
+                                    semente=int(semente) if fixar_semente else None,
+                                    componentes=len(ativos) > 1, processos=int(processos), streaming=streaming,
+                                    amostragem=amostragem)
+    except ValueError as erro:
+        st.error(str(erro))
+        st.stop()
 
-    # Determinar o percentil do VaR
-    var_monte_carlo = np.percentile(perdas, (1 - nivel_confianca) * 100)
+    var_monte_carlo_carteira = resultado["var"]
 
     # Exibir resultado formatado
     st.markdown(f"### Resultado da Simulação:")
-    st.metric("Valor da Exposição", formatar_moeda(valor_exposicao))
-    st.metric(f"VaR Monte Carlo ({int(nivel_confianca * 100)}% de confiança)",
-              formatar_moeda(abs(var_monte_carlo)))
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Valor da Exposição", formatar_moeda(exposicoes.sum()))
+    col2.metric(f"VaR Monte Carlo ({int(nivel_confianca * 100)}% de confiança)",
+                formatar_moeda(var_monte_carlo_carteira))
+    col3.metric(f"Expected Shortfall ({int(nivel_confianca * 100)}%)", formatar_moeda(resultado["es"]))
+    if np.isfinite(resultado["erro_padrao_var"]):
+        st.caption(f"Erro padrão de simulação ({AMOSTRAGENS[amostragem]}): ± {formatar_moeda(resultado['erro_padrao_var'])} "
+                   f"no VaR e ± {formatar_moeda(resultado['erro_padrao_es'])} no ES.")
+    if streaming:
+        if np.isfinite(resultado["erro_var"]):
+            st.caption(f"Erro máximo de discretização do streaming: ± {formatar_moeda(resultado['erro_var'])} "
+                       f"no VaR e ± {formatar_moeda(resultado['erro_es'])} no ES.")
+        else:
+            st.warning("O quantil ficou fora da grade estimada pelo primeiro lote; "
+                       "desative o modo streaming ou aumente o número de simulações.")
 
     # Explicação do VaR
     st.markdown(
         f"🔹 **O que significa esse resultado?**\n\n"
         f"O **VaR Monte Carlo ({int(nivel_confianca * 100)}% de confiança)** indica que, em **{int(nivel_confianca * 100)}% dos casos**, "
-        f"a perda **não deve ultrapassar** {formatar_moeda(abs(var_monte_carlo))} em um único dia, considerando as premissas de volatilidade e retorno médio."
+        f"a perda **não deve ultrapassar** {formatar_moeda(var_monte_carlo_carteira)} em um único dia, considerando as premissas de volatilidade e retorno médio. "
+        f"Nos **{100 - int(nivel_confianca * 100)}% piores cenários**, a perda média (Expected Shortfall) é de {formatar_moeda(resultado['es'])}."
     )
 
+    if len(ativos) > 1:
+        st.subheader("Contribuição de cada posição (VaR Componente)")
+        df_componentes = pd.DataFrame({
+            "Ativo": ativos,
+            "Exposição (R$)": exposicoes,
+            "VaR Componente (R$)": resultado["var_componentes"],
+            "% do VaR": resultado["var_componentes"] / var_monte_carlo_carteira * 100,
+            "ES Componente (R$)": resultado["es_componentes"],
+        })
+        st.dataframe(df_componentes, use_container_width=True)
+
 st.markdown("""
 Entre em contato comigo:  
 📧 **E-mail:** william.paiva@outlook.com  
@@ -1,7 +1,57 @@
+from datetime import date, timedelta
+
+import re
+
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import numpy as np
+import plotly.graph_objects as go
+
+from cache_paginas import MAX_ENTRADAS_ARQUIVOS, TTL_DADOS_REMOTOS, cache_dados, cache_recurso, painel_depuracao
+from riscos.backtest import backtest_universo, backtest_var
+from riscos.cotacoes import obter_cotacoes, obter_cotacoes_lote
+from riscos.historico import matriz_retornos, tabela_var_historico, var_historico
+from riscos.planilhas import gerar_excel
+from riscos.volatilidade import var_filtrado
+
+# Métodos de VaR disponíveis no modo de ativo único
+METODOS = {
+    'Histórico (pesos iguais)': None,
+    'Simulação histórica filtrada — EWMA (λ = 0,94)': 'ewma',
+    'Simulação histórica filtrada — GARCH(1,1)': 'garch',
+}
+
+
+# Cotações, exportações e o gráfico do backtest ficam em cache: as interações que não mudam os dados
+# (trocar o ativo do gráfico, baixar um arquivo) não refazem consultas, workbooks nem figuras
+@cache_dados(ttl=TTL_DADOS_REMOTOS)
+def cotacoes_ativo(ticker, inicio):
+    return obter_cotacoes(ticker, inicio)
+
+
+@cache_dados(ttl=TTL_DADOS_REMOTOS)
+def cotacoes_universo(tickers, inicio):
+    return obter_cotacoes_lote(list(tickers), inicio)
+
+
+@cache_dados(max_entries=MAX_ENTRADAS_ARQUIVOS)
+def arquivos_universo(df_resultado):
+    return gerar_excel({'VaR_Historico': df_resultado}), df_resultado.to_parquet(index=False)
+
+
+@cache_recurso()
+def grafico_excecoes(retornos, janela, nivel_confianca, ativo):
+    serie, _ = backtest_var(retornos, janela, nivel_confianca)
+    excecoes = serie[serie['Exceção']]
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=serie.index, y=serie['Retorno'], mode='lines', name='Retorno diário',
+                             line=dict(color='lightgray')))
+    fig.add_trace(go.Scatter(x=serie.index, y=serie['VaR'], mode='lines', name=f'VaR {nivel_confianca:.0%}',
+                             line=dict(color='#0A66C2')))
+    fig.add_trace(go.Scatter(x=excecoes.index, y=excecoes['Retorno'], mode='markers', name='Exceção',
+                             marker=dict(color='red', size=7)))
+    fig.update_layout(title=f'Exceções do VaR — {ativo}', yaxis_tickformat='.1%')
+    return fig
 
 
 # Configurar layout wide
@@ -20,19 +70,39 @@ st.markdown('''
 - Exemplos de códigos: `AAPL` (Apple), `PETR4.SA` (Petrobras), `BTC-USD` (Bitcoin).
 ''')
 
-# Campo de entrada para o usuário inserir o código do ativo
-ticker = st.text_input('Digite o código do ativo (ex: AAPL para Apple, PETR4.SA para Petrobras):', 'AAPL')
+# Um ativo por vez ou um universo inteiro de ativos numa única consulta
+modo = st.radio('Modo de cálculo', ['Ativo único', 'Universo de ativos', 'Backtest'], horizontal=True)
+
+if modo == 'Ativo único':
+    # Campo de entrada para o usuário inserir o código do ativo
+    ticker = st.text_input('Digite o código do ativo (ex: AAPL para Apple, PETR4.SA para Petrobras):', 'AAPL')
+    metodo = st.selectbox('Método', list(METODOS),
+                          help='A simulação histórica filtrada reescala os retornos pela volatilidade atual '
+                               '(EWMA ou GARCH), reagindo mais rápido a mudanças de regime.')
+else:
+    texto_tickers = st.text_area('Códigos dos ativos (separados por vírgula, espaço ou linha):',
+                                 'AAPL, MSFT, PETR4.SA, VALE3.SA, ITUB4.SA, BTC-USD')
+    arquivo_tickers = st.file_uploader('Ou envie um CSV com os códigos na primeira coluna', type='csv')
+    if arquivo_tickers is not None:
+        tickers = pd.read_csv(arquivo_tickers).iloc[:, 0].dropna().astype(str).str.strip().tolist()
+    else:
+        tickers = [codigo for codigo in re.split(r'[\s,;]+', texto_tickers.upper()) if codigo]
 
 # Campo de entrada para o nível de confiança
 confidence_level = st.number_input('Nível de confiança (ex: 95 para 95%):', min_value=90, max_value=99, value=95)
 
-# Campo para o período
-period = st.number_input('Digite o número de dias para o período (ex: 60):', min_value=1, value=60)
+if modo == 'Backtest':
+    # Histórico longo e janela móvel para reestimar o VaR a cada dia
+    anos_historico = st.number_input('Anos de histórico para o backtest:', min_value=1, max_value=30, value=10)
+    janela = st.number_input('Janela móvel do VaR (dias úteis):', min_value=20, value=250)
+else:
+    # Campo para o período
+    period = st.number_input('Digite o número de dias para o período (ex: 60):', min_value=1, value=60)
 
 # Botão para buscar a cotação e calcular o VaR
-if st.button('Buscar Cotação e Calcular VaR'):
-    # Coletar os dados do Yahoo Finance
-    dados = yf.download(ticker, period=f'{period}d', interval='1d')
+if modo == 'Ativo único' and st.button('Buscar Cotação e Calcular VaR'):
+    # Coletar os dados do Yahoo Finance (via cache local, que só busca as datas que faltam)
+    dados = cotacoes_ativo(ticker, date.today() - timedelta(days=int(period)))
 
     # Verificar se os dados foram coletados corretamente
     if not dados.empty:
@@ -46,13 +116,19 @@ if st.button('Buscar Cotação e Calcular VaR'):
         st.write(f'Cotação do ativo {ticker}:')
         st.data_editor(dados)
 
-        # Calcular o VaR histórico
-        retornos = dados['Retorno Diário'].sort_values().values  # Ordenar retornos
-        var_index = int(np.ceil((1 - confidence_level / 100) * len(retornos)) - 1)  # Índice do percentil
-        var = retornos[var_index]  # VaR histórico
+        # Calcular o VaR histórico (estatística de ordem via partição, sem ordenar a série inteira)
+        if METODOS[metodo] is None:
+            var, es = var_historico(dados['Retorno Diário'], confidence_level / 100)
+        else:
+            if METODOS[metodo] == 'garch' and len(dados) < 250:
+                st.warning('O ajuste GARCH(1,1) fica instável com menos de ~250 observações; aumente o período.')
+            var, es, volatilidade_prevista = var_filtrado(dados['Retorno Diário'], confidence_level / 100,
+                                                          METODOS[metodo], ticker=ticker)
+            st.write(f'Volatilidade diária prevista para o próximo pregão: {volatilidade_prevista * 100:.2f}%')
 
         # Exibir o VaR
         st.write(f'VaR Histórico ({confidence_level}%): {var:.4f} (ou {var * 100:.2f}%)')
+        st.write(f'Expected Shortfall ({confidence_level}%): {es:.4f} (ou {es * 100:.2f}%)')
 
         # Explicação do VaR
         st.markdown(f'''
@@ -69,6 +145,70 @@ if st.button('Buscar Cotação e Calcular VaR'):
     else:
         st.error('Ativo não encontrado ou código inválido.')
 
+# VaR histórico de todo o universo: uma consulta em lote e uma partição vetorizada por coluna
+if modo == 'Universo de ativos' and st.button('Calcular VaR do Universo'):
+    with st.spinner(f'Buscando cotações de {len(tickers)} ativos...'):
+        cotacoes = cotacoes_universo(tuple(tickers), date.today() - timedelta(days=int(period)))
+    retornos = matriz_retornos(cotacoes)
+    st.session_state.var_universo = tabela_var_historico(retornos, confidence_level / 100)
+    st.session_state.var_universo_sem_dados = sorted(set(tickers) - set(retornos.columns))
+    # Parâmetros do cálculo, guardados com a tabela: o título mostra estes, e não os campos atuais
+    st.session_state.var_universo_parametros = (confidence_level, int(period))
+
+if modo == 'Universo de ativos' and 'var_universo' in st.session_state:
+    df_resultado = st.session_state.var_universo
+    confianca_calculo, periodo_calculo = st.session_state.var_universo_parametros
+    if st.session_state.var_universo_sem_dados:
+        st.warning('Sem cotações para: ' + ', '.join(st.session_state.var_universo_sem_dados))
+    if (confianca_calculo, periodo_calculo) != (confidence_level, int(period)):
+        st.info('Os parâmetros mudaram desde o último cálculo; clique em "Calcular VaR do Universo" para '
+                'atualizar a tabela.')
+
+    st.subheader(f'VaR Histórico ({confianca_calculo}%, últimos {periodo_calculo} dias) por ativo')
+    st.caption('Clique no cabeçalho de uma coluna para ordenar.')
+    st.dataframe(df_resultado, use_container_width=True, hide_index=True,
+                 column_config={coluna: st.column_config.NumberColumn(format='%.2f')
+                                for coluna in df_resultado.columns if '(%)' in coluna})
+
+    col1, col2 = st.columns(2)
+    excel, parquet = arquivos_universo(df_resultado)
+    col1.download_button(label='📥 Baixar resultados em Excel', data=excel,
+                         file_name='var_historico_universo.xlsx',
+                         mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    col2.download_button(label='📥 Baixar resultados em Parquet', data=parquet,
+                         file_name='var_historico_universo.parquet', mime='application/octet-stream')
+
+# Backtest: VaR em janela móvel, contagem de exceções e testes de Kupiec e Christoffersen
+if modo == 'Backtest' and st.button('Executar Backtest'):
+    with st.spinner(f'Buscando {anos_historico} anos de cotações de {len(tickers)} ativos...'):
+        cotacoes = cotacoes_universo(tuple(tickers), date.today() - timedelta(days=int(365.25 * anos_historico)))
+    st.session_state.backtest_retornos = matriz_retornos(cotacoes)
+    st.session_state.backtest_resumo = backtest_universo(st.session_state.backtest_retornos, int(janela),
+                                                         confidence_level / 100)
+    # Parâmetros do backtest, guardados com o resultado: título e gráfico usam estes, e não os campos atuais
+    st.session_state.backtest_parametros = (int(janela), confidence_level)
+
+if modo == 'Backtest' and 'backtest_resumo' in st.session_state:
+    df_resumo = st.session_state.backtest_resumo
+    janela_calculo, confianca_calculo = st.session_state.backtest_parametros
+    if (janela_calculo, confianca_calculo) != (int(janela), confidence_level):
+        st.info('Os parâmetros mudaram desde o último backtest; clique em "Executar Backtest" para atualizar '
+                'os resultados.')
+    st.subheader(f'Backtest do VaR Histórico ({confianca_calculo}%, janela de {janela_calculo} dias)')
+    st.dataframe(df_resumo, use_container_width=True, hide_index=True)
+    st.markdown('''
+    - **Kupiec (POF):** verifica se o número de exceções é compatível com o nível de confiança.
+    - **Christoffersen (independência):** verifica se as exceções aparecem agrupadas no tempo.
+    - p-valores abaixo de 5% indicam que o modelo deve ser **rejeitado**.
+    ''')
+
+    ativo_grafico = st.selectbox('Ativo para o gráfico de exceções', df_resumo['Ativo'])
+    fig = grafico_excecoes(st.session_state.backtest_retornos[ativo_grafico], janela_calculo,
+                           confianca_calculo / 100, ativo_grafico)
+    st.plotly_chart(fig, use_container_width=True)
+
+painel_depuracao()
+
 
 st.markdown("""
 Entre em contato comigo:  
@@ -1,8 +1,44 @@
+from datetime import date, timedelta
+
 import streamlit as st
+import numpy as np
 import pandas as pd
+import plotly.graph_objects as go
 from babel.numbers import format_currency
-from io import BytesIO
-import io
+
+from cache_paginas import MAX_ENTRADAS_ARQUIVOS, cache_dados, painel_depuracao
+from riscos.calendario import datas_uteis, somar_dias_uteis
+from riscos.curvas import curva_forward
+from riscos.ndf import (COLUNAS_MARCACAO, agregar_blotter, calcular_ajuste, calcular_blotter, grade_cenarios,
+                        ler_blotter, marcar_a_mercado)
+from riscos.planilhas import gerar_excel
+
+
+@cache_dados(max_entries=MAX_ENTRADAS_ARQUIVOS)
+def excel_em_cache(chave, _tabelas):
+    # Só a chave identifica o arquivo: as tabelas, às vezes grandes, não precisam ser comparadas a cada execução
+    return gerar_excel(_tabelas)
+
+
+def botao_excel(chave, tabelas, nome_arquivo):
+    """Gera o Excel só quando pedido; o arquivo fica em cache enquanto os dados não mudarem."""
+    if st.session_state.get("ndf_excel_chave") != chave:
+        if not st.button("📄 Gerar Excel", key=f"gerar_{nome_arquivo}"):
+            return
+        st.session_state.ndf_excel_chave = chave
+    st.download_button(
+        label="📥 Baixar Resultados em Excel",
+        data=excel_em_cache(chave, tabelas),
+        file_name=nome_arquivo,
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+
+
+def vertices(tabela):
+    """(prazos, taxas em fração ao ano) de uma tabela de vértices com taxas em %."""
+    tabela = tabela.sort_values(tabela.columns[0])
+    return tabela.iloc[:, 0].to_numpy(dtype=float), tabela.iloc[:, 1].to_numpy(dtype=float) / 100
+
 
 # Configurar layout wide
 st.set_page_config(layout="wide")
@@ -21,81 +57,182 @@ Esta ferramenta permite simular o ajuste financeiro de um NDF com base nos dados
 - **PIS/COFINS** para operações não caracterizadas como hedge.
 """)
 
-# Seleção de posição
-posicao = st.selectbox("Posição", ["Importador", "Exportador"])
-
-# Seleção de moeda
-moeda = st.selectbox("Moeda", ["USD", "EUR"])
-
-# Determinar rótulo da cotação fechada com base na posição
-rotulo_cotacao = "Cotação de Compra Fechada" if posicao == "Importador" else "Cotação de Venda Fechada"
-cotacao_fechada = st.number_input(rotulo_cotacao, min_value=0.0001, format="%.4f")
-
-# Notional
-notional = st.number_input("Notional Montante na Moeda Selecionada", min_value=1_000.0, format="%.2f")
-
-# Cotação de fechamento
-cotacao_fechamento = st.number_input("Cotação de Fechamento", min_value=0.0001, format="%.4f")
-
-# Cálculo do ajuste
-diferenca_cotacao = cotacao_fechamento - cotacao_fechada
-ajuste = diferenca_cotacao * notional
-
-# Pagamento
-pagamento = cotacao_fechamento * notional
-
-# Valor Líquido
-valor_liquido = pagamento - ajuste
-
-# Exibir resultados
-st.subheader("Resultado da Operação")
-st.write("**Ajuste**")
-st.write(format_currency(abs(ajuste), "BRL", locale="pt_BR"))
-
-st.write("**Pagamento**")
-st.write(format_currency(pagamento, "BRL", locale="pt_BR"))
-
-st.write("**Valor Líquido**")
-st.write(format_currency(valor_liquido, "BRL", locale="pt_BR"))
+# Uma operação digitada, uma carteira inteira de NDFs (blotter) enviada em arquivo ou a marcação a mercado
+# das NDFs em aberto pelas curvas forward
+modo = st.radio("Modo", ["Operação única", "Blotter de NDFs", "Marcação a mercado"], horizontal=True)
+
+if modo == "Operação única":
+    # Seleção de posição
+    posicao = st.selectbox("Posição", ["Importador", "Exportador"])
+
+    # Seleção de moeda
+    moeda = st.selectbox("Moeda", ["USD", "EUR"])
+
+    # Determinar rótulo da cotação fechada com base na posição
+    rotulo_cotacao = "Cotação de Compra Fechada" if posicao == "Importador" else "Cotação de Venda Fechada"
+    cotacao_fechada = st.number_input(rotulo_cotacao, min_value=0.0001, format="%.4f")
+
+    # Notional
+    notional = st.number_input("Notional Montante na Moeda Selecionada", min_value=1_000.0, format="%.2f")
+
+    # Cotação de fechamento
+    cotacao_fechamento = st.number_input("Cotação de Fechamento", min_value=0.0001, format="%.4f")
+
+    # Cálculo do ajuste, do pagamento e do valor líquido
+    ajuste, pagamento, valor_liquido = calcular_ajuste(cotacao_fechada, notional, cotacao_fechamento)
+
+    # Exibir resultados
+    st.subheader("Resultado da Operação")
+    st.write("**Ajuste**")
+    st.write(format_currency(abs(ajuste), "BRL", locale="pt_BR"))
+
+    st.write("**Pagamento**")
+    st.write(format_currency(pagamento, "BRL", locale="pt_BR"))
+
+    st.write("**Valor Líquido**")
+    st.write(format_currency(valor_liquido, "BRL", locale="pt_BR"))
+
+    # Interpretação do ajuste
+    st.subheader("Interpretação da Operação")
+    if (posicao == "Importador" and cotacao_fechamento > cotacao_fechada) or (posicao == "Exportador" and cotacao_fechamento < cotacao_fechada):
+        st.info("Como a cotação de fechamento foi desfavorável à posição assumida, a empresa **deverá receber** o ajuste na moeda local. Isso ocorre porque a NDF protegeu a empresa contra a variação cambial.")
+    else:
+        st.info("Como a cotação de fechamento foi favorável à posição assumida, a empresa **deverá pagar** o ajuste na moeda local. Isso ocorre porque a NDF garantiu um valor protegido, mas a cotação de mercado foi mais vantajosa.")
+
+    # Criar um DataFrame com os resultados
+    df = pd.DataFrame({
+        "Posição": [posicao],
+        "Moeda": [moeda],
+        "Cotação Fechada": [cotacao_fechada],
+        "Notional": [notional],
+        "Cotação de Fechamento": [cotacao_fechamento],
+        "Ajuste": [ajuste],
+        "Pagamento": [pagamento],
+        "Valor Líquido": [valor_liquido],
+    })
+
+    # Excel gerado apenas sob demanda, e não a cada alteração dos campos
+    botao_excel(("operacao", posicao, moeda, cotacao_fechada, notional, cotacao_fechamento),
+                {"Ajuste_NDF": df}, "ajuste_ndf.xlsx")
+
+elif modo == "Blotter de NDFs":
+    st.markdown("""
+    Envie um arquivo **CSV ou XLSX** com uma NDF por linha e as colunas `Posição` (Importador ou Exportador),
+    `Moeda`, `Cotação Fechada`, `Notional` e `Cotação de Fechamento`. A coluna `Vencimento` é opcional e,
+    se presente, entra na consolidação.
+    """)
+    arquivo_blotter = st.file_uploader("Blotter de NDFs", type=["csv", "xlsx"])
+
+    if arquivo_blotter is not None:
+        # O cálculo é refeito apenas quando um novo arquivo é enviado
+        if st.session_state.get("ndf_blotter_id") != arquivo_blotter.file_id:
+            try:
+                blotter = calcular_blotter(ler_blotter(arquivo_blotter))
+            except ValueError as erro:
+                st.error(str(erro))
+                st.stop()
+            st.session_state.ndf_blotter = blotter
+            st.session_state.ndf_consolidado = agregar_blotter(blotter)
+            st.session_state.ndf_blotter_id = arquivo_blotter.file_id
+        blotter = st.session_state.ndf_blotter
+        consolidado = st.session_state.ndf_consolidado
+
+        st.subheader("Resultado do Blotter")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Operações", f"{len(blotter):,}".replace(",", "."))
+        col2.metric("Ajuste líquido para a empresa", format_currency(blotter["Ajuste para a Empresa"].sum(), "BRL",
+                                                                       locale="pt_BR"))
+        col3.metric("Pagamento total", format_currency(blotter["Pagamento"].sum(), "BRL", locale="pt_BR"))
+        st.caption("Ajuste para a empresa: positivo quando a empresa recebe o ajuste e negativo quando paga.")
+
+        st.write("**Consolidado por moeda, posição e vencimento**")
+        st.dataframe(consolidado, use_container_width=True, hide_index=True)
+        st.write("**Operações**")
+        st.dataframe(blotter, use_container_width=True, hide_index=True)
+
+        botao_excel(("blotter", arquivo_blotter.file_id),
+                    {"Consolidado": consolidado, "Operacoes": blotter}, "ajuste_ndf_blotter.xlsx")
 
-# Interpretação do ajuste
-st.subheader("Interpretação da Operação")
-if (posicao == "Importador" and cotacao_fechamento > cotacao_fechada) or (posicao == "Exportador" and cotacao_fechamento < cotacao_fechada):
-    st.info("Como a cotação de fechamento foi desfavorável à posição assumida, a empresa **deverá receber** o ajuste na moeda local. Isso ocorre porque a NDF protegeu a empresa contra a variação cambial.")
 else:
-    st.info("Como a cotação de fechamento foi favorável à posição assumida, a empresa **deverá pagar** o ajuste na moeda local. Isso ocorre porque a NDF garantiu um valor protegido, mas a cotação de mercado foi mais vantajosa.")
-
-# Criar um DataFrame com os resultados
-df = pd.DataFrame({
-    "Posição": [posicao],
-    "Moeda": [moeda],
-    "Cotação Fechada": [cotacao_fechada],
-    "Notional": [notional],
-    "Cotação de Fechamento": [cotacao_fechamento],
-    "Ajuste": [ajuste],
-    "Pagamento": [pagamento],
-    "Valor Líquido": [valor_liquido],
-     # Certifique-se de que esta variável contém a explicação correta
-})
-
-# Criar um buffer de memória
-output = io.BytesIO()
-
-# Criar um writer do Pandas e salvar no buffer
-with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-    df.to_excel(writer, sheet_name="Ajuste_NDF", index=False)
-    writer.close()
-
-# Mover para o início do buffer
-output.seek(0)
-
-# Criar botão de download
-st.download_button(
-    label="📥 Baixar Resultados em Excel",
-    data=output,
-    file_name="ajuste_ndf.xlsx",
-    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-)
+    st.markdown("""
+    As NDFs em aberto são marcadas pelo **forward** de cada vencimento, construído a partir do spot, da curva
+    **DI** (exponencial, dias úteis/252) e da curva de **cupom cambial** (linear, dias corridos/360), com
+    interpolação flat-forward dia a dia. O ajuste projetado é trazido a valor presente pela curva DI.
+    """)
+    data_base = st.date_input("Data-base", value=date.today(), format="DD/MM/YYYY")
+    col1, col2 = st.columns(2)
+    spots = {
+        "USD": col1.number_input("Spot USD/BRL", min_value=0.0001, value=5.40, format="%.4f"),
+        "EUR": col2.number_input("Spot EUR/BRL", min_value=0.0001, value=6.30, format="%.4f"),
+    }
+
+    st.write("**Curvas (taxas em % a.a.)**")
+    col1, col2, col3 = st.columns(3)
+    curva_di = col1.data_editor(pd.DataFrame({"Dias Úteis": [21, 63, 126, 252, 504, 756],
+                                              "DI (%)": [14.90, 14.95, 15.00, 14.80, 14.20, 13.90]}),
+                                num_rows="dynamic", hide_index=True, key="curva_di").dropna()
+    cupom_usd = col2.data_editor(pd.DataFrame({"Dias Corridos": [30, 90, 180, 360, 720, 1080],
+                                               "Cupom USD (%)": [5.50, 5.60, 5.70, 5.80, 6.00, 6.10]}),
+                                 num_rows="dynamic", hide_index=True, key="cupom_usd").dropna()
+    cupom_eur = col3.data_editor(pd.DataFrame({"Dias Corridos": [30, 90, 180, 360, 720, 1080],
+                                               "Cupom EUR (%)": [3.00, 3.05, 3.10, 3.20, 3.35, 3.45]}),
+                                 num_rows="dynamic", hide_index=True, key="cupom_eur").dropna()
+
+    curva_di = vertices(curva_di)
+    curvas_cupom = {"USD": vertices(cupom_usd), "EUR": vertices(cupom_eur)}
+
+    # Curva forward de cada moeda em todos os dias úteis até o último vértice
+    vencimentos = datas_uteis(data_base + timedelta(days=1),
+                              somar_dias_uteis(data_base, int(curva_di[0].max(initial=1))))
+    fig = go.Figure()
+    try:
+        for moeda, spot in spots.items():
+            curva = curva_forward(spot, curva_di, curvas_cupom[moeda], data_base, vencimentos)
+            fig.add_trace(go.Scatter(x=curva["Vencimento"], y=curva["Pontos Forward"], mode="lines",
+                                     name=f"{moeda}/BRL"))
+    except ValueError as erro:
+        st.error(str(erro))
+        st.stop()
+    fig.update_layout(title="Pontos forward (forward - spot) por dia útil", yaxis_title="R$")
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.write("**NDFs em aberto**")
+    arquivo_abertas = st.file_uploader("Blotter de NDFs em aberto (CSV ou XLSX com as colunas "
+                                       + ", ".join(COLUNAS_MARCACAO) + ")", type=["csv", "xlsx"])
+    try:
+        if arquivo_abertas is not None:
+            abertas = ler_blotter(arquivo_abertas, colunas=COLUNAS_MARCACAO)
+        else:
+            abertas = st.data_editor(pd.DataFrame({
+                "Posição": ["Importador", "Exportador", "Importador"],
+                "Moeda": ["USD", "USD", "EUR"],
+                "Cotação Fechada": [5.45, 5.60, 6.40],
+                "Notional": [1_000_000.0, 500_000.0, 750_000.0],
+                "Vencimento": [data_base + timedelta(days=90), data_base + timedelta(days=180),
+                               data_base + timedelta(days=365)],
+            }), num_rows="dynamic", use_container_width=True, key="ndfs_abertas").dropna()
+        marcado = marcar_a_mercado(abertas, data_base, spots, curva_di, curvas_cupom)
+    except ValueError as erro:
+        st.error(str(erro))
+        st.stop()
+
+    st.metric("MtM da carteira para a empresa", format_currency(marcado["MtM (R$)"].sum(), "BRL", locale="pt_BR"))
+    st.dataframe(marcado, use_container_width=True, hide_index=True)
+
+    # Grade de cenários: choque relativo no spot × choque paralelo na curva DI, numa única conta vetorizada
+    st.subheader("Cenários de spot × DI")
+    col1, col2 = st.columns(2)
+    amplitude_spot = col1.slider("Choque máximo no spot (%)", min_value=1, max_value=50, value=20)
+    amplitude_di = col2.slider("Choque máximo no DI (p.p.)", min_value=0.5, max_value=10.0, value=3.0, step=0.5)
+    choques_spot = np.linspace(-amplitude_spot, amplitude_spot, 51) / 100
+    choques_di = np.linspace(-amplitude_di, amplitude_di, 51) / 100
+    grade = grade_cenarios(marcado, choques_spot, choques_di)
+    fig = go.Figure(go.Heatmap(z=grade.to_numpy(), x=choques_di * 100, y=choques_spot * 100,
+                               colorscale="RdYlGn", zmid=0, colorbar=dict(title="MtM (R$)")))
+    fig.update_layout(xaxis_title="Choque no DI (p.p.)", yaxis_title="Choque no spot (%)")
+    st.plotly_chart(fig, use_container_width=True)
+
+painel_depuracao()
 
 # Contato
 st.markdown("""
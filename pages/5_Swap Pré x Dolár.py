@@ -1,7 +1,12 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import plotly.graph_objects as go
 from io import BytesIO
+from datetime import date, timedelta
+
+from riscos.calendario import dias_uteis
+from riscos.swaps import avaliar_swap, grade_reavaliacao, sensibilidades
 
 # Título e explicação breve
 
@@ -19,7 +24,12 @@ valor_exportacao = st.number_input("💰 Digite o valor da exportação em dóla
 taxa_cambio_inicial = st.number_input("💱 Digite a taxa de câmbio inicial (D0)", min_value=0.0, format="%.4f")
 taxa_cambio_final = st.number_input("📊 Digite a taxa de câmbio final (DT)", min_value=0.0, format="%.4f")
 taxa_pre_anual = st.number_input("📈 Digite a taxa pré-fixada anual (%)", min_value=0.0, format="%.2f")
-prazo_dias = st.number_input("📆 Digite o prazo do swap (dias úteis)", min_value=1, format="%d")
+data_inicial = st.date_input("📅 Data de início do swap", value=date.today(), format="DD/MM/YYYY")
+data_vencimento = st.date_input("📆 Data de vencimento do swap", value=date.today() + timedelta(days=365),
+                                min_value=data_inicial + timedelta(days=1), format="DD/MM/YYYY")
+# Prazo em dias úteis pelo calendário de feriados ANBIMA
+prazo_dias = int(dias_uteis(data_inicial, data_vencimento))
+st.caption(f"Prazo do swap: {prazo_dias} dias úteis (calendário ANBIMA)")
 
 # Botão para calcular
 if st.button("🚀 Calcular"):
@@ -28,18 +38,22 @@ if st.button("🚀 Calcular"):
         nocional = valor_exportacao * taxa_cambio_inicial
         st.write(f"✅ **Valor nocional do contrato:** R$ {nocional:,.2f}")
 
-        # Cálculo do Valor Atualizado na ponta Dólar
-        valor_atualizado_dolar = valor_exportacao * taxa_cambio_final
+        # O exportador recebe a ponta pré-fixada e paga a variação cambial sobre o nocional em reais
+        pontas = {"Ativa": {"tipo": "pre", "dias_uteis": prazo_dias, "taxa": taxa_pre_anual / 100},
+                  "Passiva": {"tipo": "cambial", "cambio_inicial": taxa_cambio_inicial,
+                              "cambio_final": taxa_cambio_final}}
+        avaliacao = avaliar_swap(nocional, pontas)
+
+        # Valor Atualizado na ponta Dólar
+        valor_atualizado_dolar = avaliacao["valor_passiva"]
         st.write(f"💲 **Valor atualizado da ponta Dólar:** R$ {valor_atualizado_dolar:,.2f}")
 
-        # Cálculo do Valor Atualizado na ponta Pré-fixada
-        taxa_pre_decimal = taxa_pre_anual / 100
-        fator_prazo = (1 + taxa_pre_decimal) ** (prazo_dias / 252)
-        valor_atualizado_pre = nocional * fator_prazo
+        # Valor Atualizado na ponta Pré-fixada
+        valor_atualizado_pre = avaliacao["valor_ativa"]
         st.write(f"📈 **Valor atualizado da ponta Pré-fixada:** R$ {valor_atualizado_pre:,.2f}")
 
-        # Cálculo do Resultado do Exportador
-        resultado_exportador = valor_atualizado_pre - valor_atualizado_dolar
+        # Resultado do Exportador
+        resultado_exportador = avaliacao["resultado"]
         st.subheader("📊 Resultado da Operação")
 
         if resultado_exportador > 0:
@@ -59,6 +73,23 @@ if st.button("🚀 Calcular"):
         Se for negativo, significa que teria sido melhor manter a exposição cambial.
         """)
 
+        # Sensibilidades: DV01 da taxa pré e delta cambial, por choque e reavaliação de todos os cenários de uma vez.
+        # A ponta dólar é só a variação cambial, sem cupom: o câmbio final é o seu único fator de risco
+        st.subheader("📐 Sensibilidades")
+        tabela_sensibilidades = sensibilidades(nocional, pontas, fatores={"Passiva": ["cambio_final"]})
+        st.dataframe(tabela_sensibilidades.style.format({"Sensibilidade (R$)": "R$ {:,.2f}"}),
+                     use_container_width=True, hide_index=True)
+        st.caption("Variação do resultado do swap para +1 bp na taxa pré e +1% no câmbio final.")
+
+        # Grade de reavaliação completa: choque relativo no câmbio final × choque na taxa pré
+        choques_linhas = np.linspace(-20, 20, 41) / 100
+        choques_colunas = np.linspace(-3, 3, 41) / 100
+        grade = grade_reavaliacao(nocional, pontas, [("Passiva", "cambio_final")], choques_linhas, [("Ativa", "taxa")], choques_colunas)
+        fig = go.Figure(go.Heatmap(z=grade.to_numpy(), x=choques_colunas * 100, y=choques_linhas * 100,
+                                   colorscale="RdYlGn", zmid=0, colorbar=dict(title="Resultado (R$)")))
+        fig.update_layout(xaxis_title="Choque na taxa pré (p.p.)", yaxis_title="Choque no câmbio final (%)")
+        st.plotly_chart(fig, use_container_width=True)
+
         # Criar DataFrame para exportação
         df_resultado = pd.DataFrame({
             "Parâmetro": ["Valor da Exportação (US$)", "Taxa de Câmbio Inicial (D0)", "Taxa de Câmbio Final (DT)",
@@ -72,6 +103,7 @@ if st.button("🚀 Calcular"):
         output = BytesIO()
         with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
             df_resultado.to_excel(writer, index=False, sheet_name="Resultado_Swap")
+            tabela_sensibilidades.to_excel(writer, index=False, sheet_name="Sensibilidades")
             writer.close()
 
         excel_data = output.getvalue()
@@ -1,7 +1,13 @@
 import streamlit as st
 import pandas as pd
-from decimal import Decimal
+import numpy as np
+import plotly.graph_objects as go
 from io import BytesIO
+from datetime import date, timedelta
+
+from riscos.bcb import ERROS_CONSULTA, SERIE_SELIC, dias_projetados, fator_acumulado
+from riscos.calendario import dias_corridos, dias_uteis
+from riscos.swaps import avaliar_swap, grade_reavaliacao, sensibilidades
 
 # Configuração da página
 st.set_page_config(page_title="Swap Dólar x Selic: Simulação", layout="wide")
@@ -21,34 +27,45 @@ st.subheader("Insira os dados do swap")
 nocional = st.number_input("💰 Valor nocional (R$)", min_value=0.0, value=20000000.0, format="%.2f")
 taxa_cambio_inicial = st.number_input("💱 Taxa de câmbio inicial (D0)", min_value=0.0, value=3.1049, format="%.4f")
 taxa_cambio_final = st.number_input("📊 Taxa de câmbio final (DT)", min_value=0.0, value=3.1800, format="%.4f")
-taxa_selic_anual = st.number_input("📈 Taxa Selic anual (% a.a.)", min_value=0.0, value=13.25, format="%.2f")
+fonte_selic = st.radio("Selic da ponta", ["Taxa anual informada", "Selic diária realizada (SGS 11)"], horizontal=True)
+taxa_selic_anual = st.number_input("📈 Taxa Selic anual (% a.a.)", min_value=0.0, value=13.25, format="%.2f",
+                                   help="Com a Selic realizada, usada apenas nos dias úteis ainda sem taxa divulgada.")
 taxa_cupom_cambial = st.number_input("🌐 Taxa do cupom cambial (% a.a.)", min_value=0.0, value=1.50, format="%.2f")
-prazo_dias_uteis = st.number_input("📆 Prazo do swap (dias úteis)", min_value=1, value=150, format="%d")
-prazo_dias_corridos = st.number_input("📅 Prazo do swap (dias corridos)", min_value=1, value=218, format="%d")
+data_inicial = st.date_input("📅 Data de início do swap", value=date.today(), format="DD/MM/YYYY")
+data_vencimento = st.date_input("📆 Data de vencimento do swap", value=date.today() + timedelta(days=218),
+                                min_value=data_inicial + timedelta(days=1), format="DD/MM/YYYY")
+# Prazos em dias úteis (calendário de feriados ANBIMA) e corridos a partir das datas
+prazo_dias_uteis = int(dias_uteis(data_inicial, data_vencimento))
+prazo_dias_corridos = int(dias_corridos(data_inicial, data_vencimento))
+st.caption(f"Prazo do swap: {prazo_dias_uteis} dias úteis (calendário ANBIMA) e {prazo_dias_corridos} dias corridos")
 
 # Botão para calcular
 if st.button("🚀 Calcular"):
-    # Converter para Decimal sem perda de precisão
-    nocional_dec = Decimal(str(nocional))
-    taxa_cambio_inicial_dec = Decimal(str(taxa_cambio_inicial))
-    taxa_cambio_final_dec = Decimal(str(taxa_cambio_final))
-    taxa_selic_decimal = Decimal(str(taxa_selic_anual)) / Decimal('100')
-    taxa_cupom_decimal = Decimal(str(taxa_cupom_cambial)) / Decimal('100')
-    prazo_dias_uteis_dec = Decimal(str(prazo_dias_uteis))
-    prazo_dias_corridos_dec = Decimal(str(prazo_dias_corridos))
-
-    # Cálculo da ponta Selic
-    fator_selic = (Decimal('1') + taxa_selic_decimal) ** (prazo_dias_uteis_dec / Decimal('252'))
-    valor_atualizado_selic = nocional_dec * fator_selic
-    st.write(f"✅ **Valor atualizado da ponta Selic (pagamento):** R$ {float(valor_atualizado_selic):,.2f}")
-
-    # Cálculo da ponta Dólar + Cupom Cambial
-    valor_atualizado_dolar = (nocional_dec * (1 + taxa_cupom_decimal * prazo_dias_corridos / 360)
-                              * taxa_cambio_final_dec / taxa_cambio_inicial_dec)
-    st.write(f"💲 **Valor atualizado da ponta Dólar + Cupom (recebimento):** R$ {float(valor_atualizado_dolar):,.2f}")
+    # Cálculo da ponta Selic: taxa informada ou Selic diária acumulada entre as datas. No modo realizado, a
+    # ponta leva o fator das taxas já divulgadas e a taxa informada capitaliza só os dias ainda sem taxa
+    fator_divulgado, dias_sem_taxa = None, 0
+    if fonte_selic != "Taxa anual informada":
+        try:
+            fator_divulgado = fator_acumulado(SERIE_SELIC, data_inicial, data_vencimento, taxa_projecao=0.0)
+            dias_sem_taxa = dias_projetados(SERIE_SELIC, data_inicial, data_vencimento)
+        except ERROS_CONSULTA as erro:
+            st.error(f"Não foi possível acumular a Selic realizada: {erro}")
+            st.stop()
+    pontas = {"Ativa": {"tipo": "cambial", "dias_corridos": prazo_dias_corridos, "taxa": taxa_cupom_cambial / 100,
+                        "cambio_inicial": taxa_cambio_inicial, "cambio_final": taxa_cambio_final},
+              "Passiva": {"tipo": "selic", "dias_uteis": prazo_dias_uteis, "indexador": taxa_selic_anual / 100,
+                          "fator_indexador": fator_divulgado, "dias_projetados": dias_sem_taxa}}
+    avaliacao = avaliar_swap(nocional, pontas)
+    fator_selic = avaliacao["fator_passiva"]
+    valor_atualizado_selic = avaliacao["valor_passiva"]
+    st.write(f"✅ **Valor atualizado da ponta Selic (pagamento):** R$ {valor_atualizado_selic:,.2f}")
+
+    # Ponta Dólar + Cupom Cambial
+    valor_atualizado_dolar = avaliacao["valor_ativa"]
+    st.write(f"💲 **Valor atualizado da ponta Dólar + Cupom (recebimento):** R$ {valor_atualizado_dolar:,.2f}")
 
     # Resultado líquido do swap
-    resultado_swap = valor_atualizado_dolar - valor_atualizado_selic
+    resultado_swap = avaliacao["resultado"]
     st.subheader("📊 Resultado da Operação")
 
     if resultado_swap > 0:
@@ -67,7 +84,14 @@ if st.button("🚀 Calcular"):
     # Explicação detalhada do resultado
     variacao_cambio = ((taxa_cambio_final - taxa_cambio_inicial) / taxa_cambio_inicial) * 100
     rentabilidade_selic = (fator_selic - 1) * 100
-    rentabilidade_dolar = ((valor_atualizado_dolar / nocional_dec) - 1) * 100
+    rentabilidade_dolar = ((valor_atualizado_dolar / nocional) - 1) * 100
+    if fator_divulgado is None:
+        explicacao_selic = f"A taxa de {taxa_selic_anual:.2f}% a.a. sobre {prazo_dias_uteis} dias úteis gerou uma"
+    else:
+        # Selic realizada: fator acumulado da série diária, com a taxa informada só nos dias sem taxa divulgada
+        explicacao_selic = (f"A Selic diária realizada (SGS {SERIE_SELIC}) acumulou um fator de {fator_selic:.8f} "
+                            f"em {prazo_dias_uteis} dias úteis, dos quais {dias_sem_taxa} ainda sem taxa divulgada "
+                            f"foram projetados a {taxa_selic_anual:.2f}% a.a. O fator corresponde a uma")
 
     st.write("🔍 **Entenda o resultado:**")
     st.write(interpretacao)
@@ -75,13 +99,35 @@ if st.button("🚀 Calcular"):
     - **Ponta Dólar + Cupom:** O câmbio variou de {taxa_cambio_inicial:.4f} para {taxa_cambio_final:.4f} 
     ({variacao_cambio:.1f}%), e o cupom de {taxa_cupom_cambial:.2f}% a.a. rendeu ao todo {rentabilidade_dolar:.2f}% 
     sobre o nocional, totalizando R$ {float(valor_atualizado_dolar):,.2f}.
-    - **Ponta Selic:** A taxa de {taxa_selic_anual:.2f}% a.a. sobre {prazo_dias_uteis} dias úteis gerou uma 
+    - **Ponta Selic:** {explicacao_selic} 
     rentabilidade de {rentabilidade_selic:.2f}%, totalizando R$ {float(valor_atualizado_selic):,.2f}.
     - **Dinâmica:** {'O ganho veio da forte valorização do dólar e/ou do cupom superando a Selic.' if resultado_swap > 0 
     else 'A perda reflete uma Selic mais alta que o retorno combinado do câmbio e cupom.'} O resultado depende do 
     comportamento relativo dessas variáveis no prazo escolhido.
     """)
 
+    # Sensibilidades: DV01 de cada taxa e delta cambial, por choque e reavaliação de todos os cenários de uma vez
+    st.subheader("📐 Sensibilidades")
+    tabela_sensibilidades = sensibilidades(nocional, pontas)
+    st.dataframe(tabela_sensibilidades.style.format({"Sensibilidade (R$)": "R$ {:,.2f}"}),
+                 use_container_width=True, hide_index=True)
+    st.caption("Variação do resultado do swap para +1 bp em cada taxa e +1% no câmbio final, sobre a taxa Selic anual "
+               "informada." if fator_divulgado is None else
+               f"Variação do resultado do swap para +1 bp em cada taxa e +1% no câmbio final. Com a Selic realizada, o "
+               f"choque na Selic recai só sobre os {dias_sem_taxa} dias úteis ainda sem taxa divulgada.")
+
+    # Grade de reavaliação completa: choque relativo no câmbio final × choque na Selic
+    choques_linhas = np.linspace(-20, 20, 41) / 100
+    choques_colunas = np.linspace(-3, 3, 41) / 100
+    grade = grade_reavaliacao(nocional, pontas, [("Ativa", "cambio_final")], choques_linhas, [("Passiva", "indexador")], choques_colunas)
+    fig = go.Figure(go.Heatmap(z=grade.to_numpy(), x=choques_colunas * 100, y=choques_linhas * 100,
+                               colorscale="RdYlGn", zmid=0, colorbar=dict(title="Resultado (R$)")))
+    fig.update_layout(xaxis_title="Choque na Selic (p.p.)", yaxis_title="Choque no câmbio final (%)")
+    st.plotly_chart(fig, use_container_width=True)
+    if fator_divulgado is not None:
+        st.caption(f"Com a Selic realizada, o choque na Selic desloca a taxa de projeção dos {dias_sem_taxa} dias úteis "
+                   "ainda sem taxa divulgada; o centro da grade é o resultado acima.")
+
     # Criar DataFrame para exportação
     df_resultado = pd.DataFrame({
         "Parâmetro": ["Nocional (R$)", "Taxa de Câmbio Inicial (D0)", "Taxa de Câmbio Final (DT)",
@@ -96,6 +142,7 @@ if st.button("🚀 Calcular"):
     output = BytesIO()
     with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
         df_resultado.to_excel(writer, index=False, sheet_name="Resultado_Swap")
+        tabela_sensibilidades.to_excel(writer, index=False, sheet_name="Sensibilidades")
         writer.close()
 
     excel_data = output.getvalue()
@@ -1,7 +1,13 @@
 import streamlit as st
-from decimal import Decimal
 import pandas as pd
+import numpy as np
+import plotly.graph_objects as go
 from io import BytesIO
+from datetime import date, timedelta
+
+from riscos.bcb import ERROS_CONSULTA, SERIE_CDI, dias_projetados, fator_acumulado
+from riscos.calendario import dias_uteis
+from riscos.swaps import avaliar_swap, grade_reavaliacao, sensibilidades
 
 # Configuração da página
 st.set_page_config(page_title="Swap IGP-M x DI: Simulação", layout="wide")
@@ -18,39 +24,48 @@ de inflação e juros. Use esta ferramenta para simular o resultado do swap!
 # Entrada do usuário
 st.subheader("Insira os dados do swap")
 nocional = st.number_input("💰 Valor nocional (R$)", min_value=0.0, value=20000000.0, format="%.2f")
-prazo_dias_uteis = st.number_input("📆 Prazo do swap (dias úteis)", min_value=1, value=78, format="%d")
+data_inicial = st.date_input("📅 Data de início do swap", value=date.today(), format="DD/MM/YYYY")
+data_vencimento = st.date_input("📆 Data de vencimento do swap", value=date.today() + timedelta(days=113),
+                                min_value=data_inicial + timedelta(days=1), format="DD/MM/YYYY")
+# Prazo em dias úteis pelo calendário de feriados ANBIMA
+prazo_dias_uteis = int(dias_uteis(data_inicial, data_vencimento))
+st.caption(f"Prazo do swap: {prazo_dias_uteis} dias úteis (calendário ANBIMA)")
 cupom_igpm = st.number_input("📈 Cupom IGP-M (% a.a.)", min_value=0.0, value=8.50, format="%.2f")
 igpm_variacao = st.number_input("📊 Variação IGP-M (% a.a.)", min_value=0.0, value=5.85, format="%.2f")
-taxa_di = st.number_input("🌐 Taxa DI (% a.a.)", min_value=0.0, value=13.40, format="%.2f")
+fonte_di = st.radio("DI da ponta", ["Taxa anual informada", "CDI diário realizado (SGS 12)"], horizontal=True)
+taxa_di = st.number_input("🌐 Taxa DI (% a.a.)", min_value=0.0, value=13.40, format="%.2f",
+                          help="Com o CDI realizado, usada apenas nos dias úteis ainda sem taxa divulgada.")
 
 # Botão para calcular
 if st.button("🚀 Calcular"):
-    # Converter para Decimal sem perda de precisão
-    nocional_dec = Decimal(str(nocional))
-    prazo_dias_uteis_dec = Decimal(str(prazo_dias_uteis))
-    cupom_igpm_dec = Decimal(str(cupom_igpm)) / Decimal('100')
-    igpm_variacao_dec = Decimal(str(igpm_variacao)) / Decimal('100')
-    taxa_di_dec = Decimal(str(taxa_di)) / Decimal('100')
-
-    # Cálculo da ponta IGP-M + Cupom
-    # A fórmula considera a soma da variação do IGP-M com o cupom, anualizada em 252 dias úteis
-
-
-
-    taxa_total_igpm = igpm_variacao_dec + cupom_igpm_dec
-    fator_igpm = (Decimal('1') + taxa_total_igpm) ** (prazo_dias_uteis_dec / Decimal('252'))
-
-    valor_atualizado_igpm = nocional_dec*(1+igpm_variacao_dec)**(prazo_dias_uteis_dec/252)*(1+cupom_igpm_dec)**(prazo_dias_uteis_dec/252)
-    #valor_atualizado_igpm = nocional_dec * fator_igpm
-    st.write(f"✅ **Valor atualizado da ponta IGP-M + Cupom (recebimento):** R$ {float(valor_atualizado_igpm):,.2f}")
-
-    # Cálculo da ponta DI
-    fator_di = (Decimal('1') + taxa_di_dec) ** (prazo_dias_uteis_dec / Decimal('252'))
-    valor_atualizado_di = nocional_dec * fator_di
-    st.write(f"💲 **Valor atualizado da ponta DI (pagamento):** R$ {float(valor_atualizado_di):,.2f}")
+    # Ponta DI: taxa informada ou CDI diário acumulado entre as datas. No modo realizado, a ponta leva o fator
+    # das taxas já divulgadas e a taxa informada capitaliza só os dias ainda sem taxa
+    fator_divulgado, dias_sem_taxa = None, 0
+    if fonte_di != "Taxa anual informada":
+        try:
+            fator_divulgado = fator_acumulado(SERIE_CDI, data_inicial, data_vencimento, taxa_projecao=0.0)
+            dias_sem_taxa = dias_projetados(SERIE_CDI, data_inicial, data_vencimento)
+        except ERROS_CONSULTA as erro:
+            st.error(f"Não foi possível acumular o CDI realizado: {erro}")
+            st.stop()
+    # A variação anualizada do IGP-M e o cupom são capitalizados em 252 dias úteis e compostos entre si
+    pontas = {"Ativa": {"tipo": "igpm", "dias_uteis": prazo_dias_uteis, "taxa": cupom_igpm / 100,
+                        "indexador": igpm_variacao / 100},
+              "Passiva": {"tipo": "di", "dias_uteis": prazo_dias_uteis, "indexador": taxa_di / 100,
+                          "fator_indexador": fator_divulgado, "dias_projetados": dias_sem_taxa}}
+    avaliacao = avaliar_swap(nocional, pontas)
+
+    # Ponta IGP-M + Cupom
+    fator_igpm = avaliacao["fator_ativa"]
+    valor_atualizado_igpm = avaliacao["valor_ativa"]
+    st.write(f"✅ **Valor atualizado da ponta IGP-M + Cupom (recebimento):** R$ {valor_atualizado_igpm:,.2f}")
+
+    fator_di = avaliacao["fator_passiva"]
+    valor_atualizado_di = avaliacao["valor_passiva"]
+    st.write(f"💲 **Valor atualizado da ponta DI (pagamento):** R$ {valor_atualizado_di:,.2f}")
 
     # Resultado líquido do swap
-    resultado_swap = valor_atualizado_igpm - valor_atualizado_di
+    resultado_swap = avaliacao["resultado"]
     st.subheader("📊 Resultado da Operação")
 
     if resultado_swap > 0:
@@ -69,20 +84,49 @@ if st.button("🚀 Calcular"):
     # Explicação detalhada do resultado
     rentabilidade_igpm = (fator_igpm - 1) * 100
     rentabilidade_di = (fator_di - 1) * 100
+    if fator_divulgado is None:
+        explicacao_di = (f"A taxa DI de {taxa_di:.2f}% a.a. gerou uma rentabilidade de {float(rentabilidade_di):,.2f}% "
+                         f"em {prazo_dias_uteis} dias úteis")
+    else:
+        # CDI realizado: fator acumulado da série diária, com a taxa informada só nos dias sem taxa divulgada
+        explicacao_di = (f"O CDI diário realizado (SGS {SERIE_CDI}) acumulou um fator de {fator_di:.8f} "
+                         f"({float(rentabilidade_di):,.2f}%) em {prazo_dias_uteis} dias úteis, dos quais {dias_sem_taxa} "
+                         f"ainda sem taxa divulgada foram projetados a {taxa_di:.2f}% a.a.")
 
     st.write("🔍 **Entenda o resultado:**")
     st.write(interpretacao)
     st.write(f"""
-    - **Ponta IGP-M + Cupom:** A variação do IGP-M de {igpm_variacao:.2f}% a.a. somada ao cupom de {cupom_igpm:.2f}% a.a. 
+    - **Ponta IGP-M + Cupom:** A variação do IGP-M de {igpm_variacao:.2f}% a.a. composta com o cupom de {cupom_igpm:.2f}% a.a. 
     rendeu ao todo {float(rentabilidade_igpm):,.2f}% sobre o nocional em {prazo_dias_uteis} dias úteis, 
     totalizando R$ {float(valor_atualizado_igpm):,.2f}.
-    - **Ponta DI:** A taxa DI de {taxa_di:.2f}% a.a. gerou uma rentabilidade de {float(rentabilidade_di):,.2f}% 
-    em {prazo_dias_uteis} dias úteis, totalizando R$ {float(valor_atualizado_di):,.2f}.
+    - **Ponta DI:** {explicacao_di}, totalizando R$ {float(valor_atualizado_di):,.2f}.
     - **Dinâmica:** {'O ganho veio da forte valorização do IGP-M e/ou do cupom superando a DI.' if resultado_swap > 0 
     else 'A perda reflete uma DI mais alta que o retorno combinado do IGP-M e cupom.'} O resultado depende do 
     comportamento relativo dessas variáveis no prazo escolhido.
     """)
 
+    # Sensibilidades: DV01 da variação do IGP-M, do cupom e do DI, por choque e reavaliação de todos os cenários de uma vez
+    st.subheader("📐 Sensibilidades")
+    tabela_sensibilidades = sensibilidades(nocional, pontas)
+    st.dataframe(tabela_sensibilidades.style.format({"Sensibilidade (R$)": "R$ {:,.2f}"}),
+                 use_container_width=True, hide_index=True)
+    st.caption("Variação do resultado do swap para +1 bp na variação anual do IGP-M, no cupom da ponta IGP-M, na "
+               "taxa DI e no spread sobre o DI (DV01 de cada fator)" + (", sobre a taxa DI anual informada." if
+               fator_divulgado is None else f". Com o CDI realizado, o choque no DI recai só sobre os {dias_sem_taxa} "
+               "dias úteis ainda sem taxa divulgada."))
+
+    # Grade de reavaliação completa: choque na variação do IGP-M × choque no DI
+    choques_linhas = np.linspace(-3, 3, 41) / 100
+    choques_colunas = np.linspace(-3, 3, 41) / 100
+    grade = grade_reavaliacao(nocional, pontas, [("Ativa", "indexador")], choques_linhas, [("Passiva", "indexador")], choques_colunas)
+    fig = go.Figure(go.Heatmap(z=grade.to_numpy(), x=choques_colunas * 100, y=choques_linhas * 100,
+                               colorscale="RdYlGn", zmid=0, colorbar=dict(title="Resultado (R$)")))
+    fig.update_layout(xaxis_title="Choque no DI (p.p.)", yaxis_title="Choque no IGP-M (p.p.)")
+    st.plotly_chart(fig, use_container_width=True)
+    if fator_divulgado is not None:
+        st.caption(f"Com o CDI realizado, o choque no DI desloca a taxa de projeção dos {dias_sem_taxa} dias úteis "
+                   "ainda sem taxa divulgada; o centro da grade é o resultado acima.")
+
     # Criar DataFrame para exportação
     df_resultado = pd.DataFrame({
         "Parâmetro": ["Nocional (R$)", "Prazo (dias úteis)", "Cupom IGP-M (% a.a.)",
@@ -97,6 +141,7 @@ if st.button("🚀 Calcular"):
     output = BytesIO()
     with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
         df_resultado.to_excel(writer, index=False, sheet_name="Resultado_Swap")
+        tabela_sensibilidades.to_excel(writer, index=False, sheet_name="Sensibilidades")
         writer.close()
 
     excel_data = output.getvalue()
@@ -110,7 +155,7 @@ if st.button("🚀 Calcular"):
 st.write("""
 ### Notas:
 - Os cálculos utilizam 252 dias úteis como convenção de mercado no Brasil.
-- A ponta IGP-M + Cupom soma a variação do IGP-M ao cupom antes de aplicar o fator de capitalização.
+- A ponta IGP-M + Cupom compõe a variação do IGP-M com o cupom: (1 + IGP-M)^(du/252) × (1 + cupom)^(du/252).
 - O resultado reflete a diferença entre o recebimento (IGP-M + Cupom) e o pagamento (DI).
 """)
 
@@ -1,6 +1,30 @@
+from datetime import date, timedelta
+
 import streamlit as st
 import pandas as pd
-from io import BytesIO
+
+from cache_paginas import MAX_ENTRADAS_ARQUIVOS, cache_dados, painel_depuracao
+from riscos.bcb import ERROS_CONSULTA
+from riscos.exposicao import (MOEDAS, adicionar, ler_arquivo, ler_exposicoes, limpar, remover, totais_por_moeda,
+                              totais_por_prazo, versao)
+from riscos.hedge import INSTRUMENTOS_HEDGE, OBJETIVOS, otimizar_hedge
+from riscos.parametrico import ESTIMADORES
+from riscos.planilhas import gerar_excel
+from riscos.var_cambial import var_exposicao
+
+# Linhas exibidas na tabela de exposições (o Excel traz todas)
+LIMITE_TABELA = 1000
+
+
+# A carteira e a sua versão identificam o arquivo; os totais, derivados delas, ficam fora da chave do cache
+@cache_dados(max_entries=MAX_ENTRADAS_ARQUIVOS)
+def excel_exposicao(carteira, versao_carteira, _total_moeda, _total_prazo):
+    return gerar_excel({
+        "Exposicao_Completa": ler_exposicoes(carteira),
+        "Total_Por_Moeda": _total_moeda,
+        "Total_Por_Prazo": _total_prazo,
+    })
+
 
 # Configuração da página
 st.set_page_config(page_title="Mapa de Exposição Cambial", layout="wide")
@@ -9,20 +33,22 @@ st.set_page_config(page_title="Mapa de Exposição Cambial", layout="wide")
 st.title("📊 Mapa de Exposição Cambial")
 
 st.write("""
-Este aplicativo permite mapear a exposição cambial de uma empresa em diferentes moedas e prazos.  
+Este aplicativo permite mapear a exposição cambial de uma empresa em diferentes moedas e prazos.
 O objetivo é entender o risco cambial total e ajudar na definição da estratégia de hedge.
 """)
 
-# Criando uma sessão para armazenar os dados inseridos pelo usuário
-if "exposicao_data" not in st.session_state:
-    st.session_state.exposicao_data = []
+# As exposições ficam num banco local persistente, separadas por carteira
+carteira = st.text_input("Carteira", value="Principal",
+                         help="As exposições ficam gravadas e continuam disponíveis em novas sessões.").strip()
+if not carteira:
+    st.stop()
 
 # Formulário para inserir nova exposição
 st.subheader("📝 Inserir Nova Exposição Cambial")
 col1, col2, col3 = st.columns(3)
 
 with col1:
-    moeda = st.selectbox("Moeda", ["USD", "EUR", "GBP", "JPY", "BRL", "CNY", "ARS"])
+    moeda = st.selectbox("Moeda", MOEDAS)
 
 with col2:
     montante = st.number_input("Montante na Moeda Selecionada", min_value=0.0, format="%.2f")
@@ -33,38 +59,135 @@ with col3:
 # Botão para adicionar exposição
 if st.button("Adicionar Exposição"):
     if montante > 0:
-        st.session_state.exposicao_data.append({"Moeda": moeda, "Montante": montante, "Prazo": prazo})
+        adicionar(pd.DataFrame([{"Moeda": moeda, "Montante": montante, "Prazo": prazo}]), carteira)
         st.success("Exposição adicionada com sucesso!")
 
-# Criando DataFrame com as exposições inseridas
-if st.session_state.exposicao_data:
-    df_exposicao = pd.DataFrame(st.session_state.exposicao_data)
+# Importação em lote: todas as linhas do arquivo entram numa única transação
+with st.expander("📂 Importar exposições de um arquivo CSV ou Excel"):
+    arquivo = st.file_uploader("Arquivo com as colunas Moeda, Montante e Prazo (dias)", type=["csv", "xlsx"])
+    if arquivo is not None and st.button("Importar"):
+        try:
+            quantidade = adicionar(ler_arquivo(arquivo), carteira)
+        except ValueError as erro:
+            st.error(str(erro))
+        else:
+            st.success(f"{quantidade:,} exposições importadas.")
 
-    # Exibir DataFrame completo
+# Totais mantidos incrementalmente no banco: a leitura não depende do tamanho da carteira
+df_total_moeda = totais_por_moeda(carteira)
+if not df_total_moeda.empty:
+    quantidade_total = int(df_total_moeda["Quantidade"].sum())
+
+    # Exibir as exposições mais recentes
     st.subheader("📋 Exposição Cambial Registrada")
-    st.dataframe(df_exposicao)
+    st.dataframe(ler_exposicoes(carteira, limite=LIMITE_TABELA), hide_index=True)
+    if quantidade_total > LIMITE_TABELA:
+        st.caption(f"Exibindo as {LIMITE_TABELA:,} exposições mais recentes de {quantidade_total:,}; "
+                   "o arquivo Excel traz todas.")
+
+    col_remover, col_limpar = st.columns(2)
+    with col_remover:
+        id_remover = st.number_input("ID da exposição a remover", min_value=1, step=1, format="%d")
+        if st.button("Remover Exposição"):
+            if remover([id_remover], carteira):
+                st.rerun()
+            st.warning(f"Exposição {id_remover} não encontrada na carteira.")
+    with col_limpar:
+        if st.button("🗑️ Limpar Carteira"):
+            limpar(carteira)
+            st.rerun()
 
     # Exposição total por moeda
     st.subheader("🔍 Exposição Total por Moeda")
-    df_total_moeda = df_exposicao.groupby("Moeda")["Montante"].sum().reset_index()
-    st.dataframe(df_total_moeda)
+    st.dataframe(df_total_moeda, hide_index=True)
 
-    # Exposição total por prazo
+    # Exposição total por faixa de prazo
     st.subheader("⏳ Exposição Total por Prazo")
-    df_total_prazo = df_exposicao.groupby("Prazo")["Montante"].sum().reset_index()
-    st.dataframe(df_total_prazo)
-
-    # Exportação dos dados para Excel
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df_exposicao.to_excel(writer, sheet_name="Exposicao_Completa", index=False)
-        df_total_moeda.to_excel(writer, sheet_name="Total_Por_Moeda", index=False)
-        df_total_prazo.to_excel(writer, sheet_name="Total_Por_Prazo", index=False)
-        writer.close()
-
-    st.download_button(
-        label="📥 Baixar Mapa de Exposição em Excel",
-        data=output.getvalue(),
-        file_name="mapa_exposicao_cambial.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+    df_total_prazo = totais_por_prazo(carteira)
+    st.dataframe(df_total_prazo, hide_index=True)
+
+    # VaR cambial: a carteira chega como a matriz moedas × faixas, convertida em reais pela PTAX
+    st.subheader("📉 VaR Cambial da Carteira (em R$)")
+    col_confianca, col_horizonte, col_estimador, col_historico = st.columns(4)
+    with col_confianca:
+        nivel_confianca = st.selectbox("🔍 Nível de confiança", options=[0.90, 0.95, 0.99], index=1)
+    with col_horizonte:
+        horizonte_tempo = st.number_input("📅 Horizonte de tempo (dias)", min_value=1, value=1, format="%d")
+    with col_estimador:
+        estimador = st.selectbox("🧮 Estimador da covariância", list(ESTIMADORES), format_func=ESTIMADORES.get)
+    with col_historico:
+        dias_historico = st.number_input("🗓️ Histórico da PTAX (dias corridos)", min_value=30, value=365)
+
+    try:
+        with st.spinner("Obtendo a PTAX e estimando a covariância cambial..."):
+            resultado_var = var_exposicao(carteira, nivel_confianca, horizonte_tempo,
+                                          date.today() - timedelta(days=int(dias_historico)), estimador)
+    except ERROS_CONSULTA as erro:
+        st.error(f"Não foi possível calcular o VaR cambial: {erro}")
+    else:
+        if resultado_var["moedas_sem_ptax"]:
+            st.warning(f"Sem PTAX para {', '.join(resultado_var['moedas_sem_ptax'])}: "
+                       "essas exposições não entram no VaR.")
+        st.success(f"✅ **VaR ({nivel_confianca*100:.0f}% de confiança, {horizonte_tempo} dia(s)):** "
+                   f"R$ {resultado_var['var']:,.2f}")
+        if resultado_var["data_ptax"] is not None:
+            st.caption(f"Conversão pela PTAX de venda de {resultado_var['data_ptax']:%d/%m/%Y}. "
+                       "Exposições em BRL não têm risco cambial.")
+
+        st.write("**Exposição por moeda e prazo (R$)**")
+        st.dataframe(resultado_var["matriz_brl"], use_container_width=True)
+        col_moeda, col_faixa = st.columns(2)
+        with col_moeda:
+            st.write("**VaR por moeda**")
+            st.dataframe(resultado_var["por_moeda"], hide_index=True)
+        with col_faixa:
+            st.write("**VaR por faixa de prazo**")
+            st.dataframe(resultado_var["por_faixa"], hide_index=True)
+        st.write("""
+        - **VaR isolado:** VaR da moeda (ou da faixa) considerada sozinha.  
+        - **VaR componente:** parcela do VaR total atribuída à moeda; os componentes somam o VaR total.  
+        - **VaR incremental:** redução do VaR se a exposição na moeda fosse zerada.
+        """)
+
+        # Hedge ótimo: notionais por moeda, faixa e instrumento, recalculados a cada ajuste dos parâmetros
+        st.subheader("🛡️ Hedge Ótimo")
+        col_objetivo, col_instrumentos, col_limite = st.columns(3)
+        with col_objetivo:
+            objetivo = st.selectbox("🎯 Objetivo", list(OBJETIVOS), format_func=OBJETIVOS.get)
+        with col_instrumentos:
+            instrumentos = st.multiselect("🧰 Instrumentos", list(INSTRUMENTOS_HEDGE),
+                                          default=list(INSTRUMENTOS_HEDGE),
+                                          format_func=lambda nome: INSTRUMENTOS_HEDGE[nome]["nome"])
+        with col_limite:
+            limite_var = st.number_input("📏 Limite de VaR (R$)", min_value=0.0, format="%.2f",
+                                         value=round(resultado_var["var"] / 2, 2), disabled=objetivo != "var_limitado")
+
+        if instrumentos and resultado_var["var"] > 0:
+            try:
+                hedge = otimizar_hedge(carteira, date.today() - timedelta(days=int(dias_historico)), objetivo,
+                                       nivel_confianca, horizonte_tempo, limite_var, instrumentos, estimador)
+            except ValueError as erro:
+                st.error(str(erro))
+            else:
+                col_antes, col_depois, col_custo = st.columns(3)
+                col_antes.metric("VaR sem hedge", f"R$ {hedge['var_antes']:,.2f}")
+                col_depois.metric("VaR com hedge", f"R$ {hedge['var_depois']:,.2f}")
+                col_custo.metric("Custo de carregamento", f"R$ {hedge['custo']:,.2f}")
+                st.dataframe(hedge["hedges"], hide_index=True, use_container_width=True)
+                st.caption("Notional negativo = venda da moeda. O custo é o custo anual de cada instrumento "
+                           "proporcional ao prazo representativo da faixa. O VaR aqui inclui o risco de prazo "
+                           "das faixas e o risco de base dos instrumentos.")
+
+    # Exportação para Excel: gerada só quando pedida e mantida em cache até a carteira mudar
+    chave_excel = (carteira, versao(carteira))
+    if st.session_state.get("exposicao_excel_chave") != chave_excel and st.button("📄 Gerar Excel"):
+        st.session_state.exposicao_excel_chave = chave_excel
+    if st.session_state.get("exposicao_excel_chave") == chave_excel:
+        st.download_button(
+            label="📥 Baixar Mapa de Exposição em Excel",
+            data=excel_exposicao(carteira, chave_excel[1], df_total_moeda, df_total_prazo),
+            file_name="mapa_exposicao_cambial.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+painel_depuracao()
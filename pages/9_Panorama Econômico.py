@@ -1,8 +1,14 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import requests
-from statsmodels.tsa.holtwinters import ExponentialSmoothing
+import numpy as np
+from datetime import date
+
+from cache_paginas import TTL_DADOS_REMOTOS, cache_dados, cache_recurso, painel_depuracao
+from riscos.bcb import ERROS_CONSULTA, obter_series, serie_para_grafico
+from riscos.calendario import somar_dias_uteis
+from riscos.reducao import reduzir
+from riscos.previsao import prever_em_segundo_plano
 
 # Configuração inicial do Streamlit
 st.set_page_config(page_title="Dashboard Câmbio", layout="wide")
@@ -21,21 +27,50 @@ moeda_selecionada = st.sidebar.selectbox("Selecione a moeda", list(moedas.keys()
 codigo_cambio = moedas[moeda_selecionada]
 
 
-# Função para buscar dados do Banco Central do Brasil
-def get_bacen_data(endpoint):
-    url = f"https://api.bcb.gov.br/dados/serie/bcdata.sgs.{endpoint}/dados?formato=json"
-    response = requests.get(url)
-    if response.status_code == 200:
-        return pd.DataFrame(response.json())
-    return None
+# Séries do SGS: câmbio, reservas internacionais, meta Selic e IPCA mensal
+SERIE_RESERVAS = 13621
+SERIE_SELIC_META = 432
+SERIE_IPCA = 433
+
+
+# Consultas e gráficos em cache no processo do Streamlit: uma interação com os filtros reaproveita as séries
+# e as figuras já montadas para os mesmos dados, em vez de consultar o cache local e refazer o Plotly
+@cache_dados(ttl=TTL_DADOS_REMOTOS)
+def series_bcb(codigos, inicio):
+    return obter_series(list(codigos), inicio)
+
+
+@cache_dados(ttl=TTL_DADOS_REMOTOS)
+def serie_reduzida(codigo, inicio, fim):
+    return serie_para_grafico(codigo, inicio, fim)
+
+
+@cache_recurso()
+def grafico_linha(df, **opcoes):
+    return px.line(df, **opcoes)
+
 
+# Busca as quatro séries em paralelo, só a partir de 2020; o cache local guarda o que já foi baixado
+# e, nas próximas execuções, apenas as observações novas são consultadas no Banco Central
+try:
+    series = series_bcb((codigo_cambio, SERIE_RESERVAS, SERIE_SELIC_META, SERIE_IPCA), date(2020, 1, 1))
+except ERROS_CONSULTA as erro:
+    st.error(f"Não foi possível obter as séries do Banco Central: {erro}")
+    st.stop()
 
-# Buscar dados do câmbio
-df = get_bacen_data(codigo_cambio)
-if df is not None:
-    df["data"] = pd.to_datetime(df["data"], dayfirst=True)
-    df["valor"] = pd.to_numeric(df["valor"], errors='coerce')
-    df = df[df["data"] >= "2020-01-01"]
+
+def serie_para_df(codigo):
+    return series[codigo].rename("valor").rename_axis("data").reset_index()
+
+
+def grafico_para_df(codigo):
+    # Pontos enviados ao gráfico: limitados, qualquer que seja o intervalo; num intervalo curto, todos os diários
+    return serie_reduzida(codigo, data_inicio, data_fim).rename("valor").rename_axis("data").reset_index()
+
+
+# Dados do câmbio
+df = serie_para_df(codigo_cambio)
+if not df.empty:
 
     # Criar filtro de data
     st.sidebar.header("Filtro de Data")
@@ -44,77 +79,82 @@ if df is not None:
 
     df_filtrado = df[(df["data"] >= pd.to_datetime(data_inicio)) & (df["data"] <= pd.to_datetime(data_fim))]
 
-    df_filtrado = df_filtrado.set_index("data")
-    modelo = ExponentialSmoothing(df_filtrado["valor"], trend="add", seasonal=None).fit()
-    previsao_periodo = 6 * 30
-    previsao = modelo.forecast(steps=previsao_periodo)
-
-    ult_data = df_filtrado.index[-1]
-    datas_futuras = pd.date_range(start=ult_data + pd.Timedelta(days=1), periods=previsao_periodo, freq='D')
-    df_previsao = pd.DataFrame({"data": datas_futuras, "valor": previsao})
-
-    df_filtrado = df_filtrado.reset_index()
-    df_previsao = df_previsao.reset_index(drop=True)
-    df_completo = pd.concat([df_filtrado, df_previsao])
-    df_completo["tipo"] = ["Histórico"] * len(df_filtrado) + ["Previsão"] * len(df_previsao)
+    # Previsão de Holt calculada em segundo plano (modelos ajustados ficam em cache por série e período),
+    # um passo por dia útil, como as observações: 6 meses são 126 dias úteis
+    previsao_periodo = 6 * 21
+    previsao_futura = prever_em_segundo_plano(codigo_cambio, df_filtrado.set_index("data")["valor"],
+                                              previsao_periodo)
 
     col1, col2 = st.columns(2)
     with col1:
         st.subheader(f"{moeda_selecionada} e Previsão para os Próximos 6 Meses")
-        fig = px.line(df_completo, x="data", y="valor", color="tipo",
-                      labels={"valor": "Cotação", "tipo": "Legenda"},
-                      title=f"Variação do {moeda_selecionada} e Projeção para os Próximos 6 Meses")
-        st.plotly_chart(fig, use_container_width=True)
-
-# Buscar dados das reservas internacionais
-df_reservas = get_bacen_data(13621)
-if df_reservas is not None:
-    df_reservas["data"] = pd.to_datetime(df_reservas["data"], dayfirst=True)
-    df_reservas["valor"] = pd.to_numeric(df_reservas["valor"], errors='coerce')
-    df_reservas = df_reservas[df_reservas["data"] >= "2020-01-01"]
-    df_reservas_filtrado = df_reservas[
-        (df_reservas["data"] >= pd.to_datetime(data_inicio)) & (df_reservas["data"] <= pd.to_datetime(data_fim))]
+        # Enquanto o modelo é ajustado, o espaço do gráfico mostra só o histórico
+        grafico_cambio = st.empty()
+        df_grafico = grafico_para_df(codigo_cambio)
+        fig_cambio = grafico_linha(df_grafico, x="data", y="valor", labels={"valor": "Cotação"},
+                                   title=f"Variação do {moeda_selecionada} (calculando a projeção...)")
+        grafico_cambio.plotly_chart(fig_cambio, use_container_width=True)
+
+# Dados das reservas internacionais
+df_reservas = serie_para_df(SERIE_RESERVAS)
+if not df_reservas.empty:
+    df_reservas_filtrado = grafico_para_df(SERIE_RESERVAS)
     with col2:
         st.subheader("Reservas Internacionais")
-        fig_reservas = px.line(df_reservas_filtrado, x="data", y="valor",
-                               labels={"valor": "Reservas (USD Milhões)"},
-                               title="Evolução das Reservas Internacionais")
+        fig_reservas = grafico_linha(df_reservas_filtrado, x="data", y="valor",
+                                     labels={"valor": "Reservas (USD Milhões)"},
+                                     title="Evolução das Reservas Internacionais")
         st.plotly_chart(fig_reservas, use_container_width=True)
 
 # Criar gráficos adicionais para Taxa SELIC e Inflação Acumulada
 col3, col4 = st.columns(2)
 
-# Buscar dados da Taxa SELIC
-df_selic = get_bacen_data(432)
-if df_selic is not None:
-    df_selic["data"] = pd.to_datetime(df_selic["data"], dayfirst=True)
-    df_selic["valor"] = pd.to_numeric(df_selic["valor"], errors='coerce')
-    df_selic = df_selic[df_selic["data"] >= "2020-01-01"]
-    df_selic_filtrado = df_selic[
-        (df_selic["data"] >= pd.to_datetime(data_inicio)) & (df_selic["data"] <= pd.to_datetime(data_fim))]
+# Dados da Taxa SELIC
+df_selic = serie_para_df(SERIE_SELIC_META)
+if not df_selic.empty:
+    df_selic_filtrado = grafico_para_df(SERIE_SELIC_META)
     with col3:
         st.subheader("Taxa SELIC")
-        fig_selic = px.line(df_selic_filtrado, x="data", y="valor",
-                            labels={"valor": "Taxa (%)"},
-                            title="Evolução da Taxa SELIC")
+        fig_selic = grafico_linha(df_selic_filtrado, x="data", y="valor",
+                                  labels={"valor": "Taxa (%)"},
+                                  title="Evolução da Taxa SELIC")
         st.plotly_chart(fig_selic, use_container_width=True)
 
-# Buscar dados da Inflação Acumulada dos Últimos 12 Meses
-df_ipca = get_bacen_data(433)
-if df_ipca is not None:
-    df_ipca["data"] = pd.to_datetime(df_ipca["data"], dayfirst=True)
-    df_ipca["valor"] = pd.to_numeric(df_ipca["valor"], errors='coerce')
-    df_ipca = df_ipca[df_ipca["data"] >= "2020-01-01"]
+# Dados da Inflação Acumulada dos Últimos 12 Meses
+df_ipca = serie_para_df(SERIE_IPCA)
+if not df_ipca.empty:
     df_ipca["acumulado_12m"] = df_ipca["valor"].rolling(window=12).sum()
     df_ipca_filtrado = df_ipca[
         (df_ipca["data"] >= pd.to_datetime(data_inicio)) & (df_ipca["data"] <= pd.to_datetime(data_fim))]
+    df_ipca_filtrado = reduzir(df_ipca_filtrado.set_index("data")["acumulado_12m"]).reset_index()
     with col4:
         st.subheader("Inflação Acumulada (Últimos 12 Meses)")
-        fig_ipca = px.line(df_ipca_filtrado, x="data", y="acumulado_12m",
-                           labels={"acumulado_12m": "Inflação (%)"},
-                           title="Evolução da Inflação Acumulada 12M")
+        fig_ipca = grafico_linha(df_ipca_filtrado, x="data", y="acumulado_12m",
+                                 labels={"acumulado_12m": "Inflação (%)"},
+                                 title="Evolução da Inflação Acumulada 12M")
         st.plotly_chart(fig_ipca, use_container_width=True)
 
+# Completa o gráfico do câmbio com a previsão, depois de desenhados os demais
+if not df.empty:
+    try:
+        previsao, _ = previsao_futura.result()
+    except ValueError as erro:
+        st.warning(f"Previsão indisponível: {erro}")
+    else:
+        # Datas da previsão nos próximos dias úteis ANBIMA após a última cotação
+        ult_data = df_filtrado["data"].iloc[-1]
+        datas_futuras = pd.DatetimeIndex(somar_dias_uteis(ult_data + pd.Timedelta(days=1),
+                                                          np.arange(previsao_periodo)))
+        df_previsao = pd.DataFrame({"data": datas_futuras, "valor": previsao})
+        df_completo = pd.concat([df_grafico, df_previsao])
+        df_completo["tipo"] = ["Histórico"] * len(df_grafico) + ["Previsão"] * len(df_previsao)
+        fig = grafico_linha(df_completo, x="data", y="valor", color="tipo",
+                            labels={"valor": "Cotação", "tipo": "Legenda"},
+                            title=f"Variação do {moeda_selecionada} e Projeção para os Próximos 6 Meses")
+        grafico_cambio.plotly_chart(fig, use_container_width=True)
+
+painel_depuracao()
+
 st.write(
     "📌 Dados atualizados em tempo real via API do Banco Central do Brasil, incluindo previsão baseada no modelo Holt-Winters.")
 
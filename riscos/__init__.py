@@ -0,0 +1 @@
+"""Motores de cálculo da Plataforma de Riscos e Hedge, independentes do Streamlit."""
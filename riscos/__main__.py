@@ -0,0 +1,3 @@
+from riscos.cli import main
+
+main()
@@ -0,0 +1,100 @@
+"""Servidor HTTP local (Tornado) que expõe as calculadoras de `riscos.calculadoras`.
+
+Rotas:
+
+- `GET /calculadoras`: nome e descrição de cada calculadora;
+- `POST /calcular/<nome>`: corpo JSON com os parâmetros; responde com o resultado;
+- `POST /lote`: corpo JSON com uma lista de pedidos {"id", "calculadora", "parametros"};
+  responde com a lista de resultados (ou erros), na mesma ordem.
+
+Os cálculos rodam num pool de threads, fora do laço de eventos, e compartilham os
+caches do processo; os pedidos de um lote são submetidos juntos e calculados em
+paralelo. Uma falha inesperada responde 500 com a mesma mensagem "Falha inesperada"
+que o pedido receberia num lote. Para subir o servidor:
+
+    python -m riscos servidor --porta 8000
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import tornado.ioloop
+import tornado.web
+
+from riscos.calculadoras import CALCULADORAS, calcular, mensagem_falha_inesperada, processar_pedido
+
+PORTA_PADRAO = 8000
+
+_executor = ThreadPoolExecutor(thread_name_prefix="api")
+
+
+class _Base(tornado.web.RequestHandler):
+    def responder(self, status, corpo):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json; charset=utf-8")
+        self.finish(json.dumps(corpo, ensure_ascii=False))
+
+    def corpo_json(self):
+        try:
+            return json.loads(self.request.body or b"{}")
+        except ValueError as erro:
+            raise tornado.web.HTTPError(400, reason=f"JSON inválido: {erro}")
+
+    def write_error(self, status_code, **kwargs):
+        self.responder(status_code, {"erro": self._reason})
+
+
+class _Calculadoras(_Base):
+    def get(self):
+        self.responder(200, {nome: (funcao.__doc__ or "").splitlines()[0] for nome, funcao in CALCULADORAS.items()})
+
+
+class _Calcular(_Base):
+    async def post(self, nome):
+        if nome not in CALCULADORAS:
+            self.responder(404, {"erro": f"Calculadora desconhecida: {nome}."})
+            return
+        parametros = self.corpo_json()
+        try:
+            resultado = await tornado.ioloop.IOLoop.current().run_in_executor(_executor, calcular, nome, parametros)
+        except (ValueError, TypeError, KeyError) as erro:
+            self.responder(400, {"erro": str(erro)})
+        except requests.RequestException as erro:
+            self.responder(502, {"erro": f"Falha ao obter dados de mercado: {erro}"})
+        except Exception as erro:
+            self.responder(500, {"erro": mensagem_falha_inesperada(erro)})
+        else:
+            self.responder(200, resultado)
+
+
+class _Lote(_Base):
+    async def post(self):
+        pedidos = self.corpo_json()
+        if not isinstance(pedidos, list):
+            self.responder(400, {"erro": "O corpo deve ser uma lista de pedidos."})
+            return
+        laco = tornado.ioloop.IOLoop.current()
+        # Todos os pedidos vão ao pool antes de esperar qualquer um; gather devolve na ordem do lote
+        respostas = await asyncio.gather(*[laco.run_in_executor(_executor, processar_pedido, pedido)
+                                           for pedido in pedidos])
+        self.responder(200, list(respostas))
+
+
+def criar_aplicacao():
+    return tornado.web.Application([
+        (r"/calculadoras", _Calculadoras),
+        (r"/calcular/([a-z_]+)", _Calcular),
+        (r"/lote", _Lote),
+    ])
+
+
+def servir(porta=PORTA_PADRAO, endereco="127.0.0.1"):
+    """Sobe o servidor e bloqueia até Ctrl+C."""
+    aplicacao = criar_aplicacao()
+    aplicacao.listen(porta, address=endereco)
+    print(f"Calculadoras disponíveis em http://{endereco}:{porta}/calculadoras")
+    try:
+        tornado.ioloop.IOLoop.current().start()
+    except KeyboardInterrupt:
+        pass
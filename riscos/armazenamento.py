@@ -0,0 +1,89 @@
+"""Armazenamento local (Parquet/JSON) compartilhado pelos caches de dados de mercado.
+
+O diretório raiz é definido pela variável de ambiente `RISCOS_CACHE_DIR`
+(padrão: `~/.cache/riscos`). As gravações são atômicas (arquivo temporário +
+`os.replace`), de modo que sessões concorrentes do Streamlit nunca leem um
+arquivo pela metade.
+"""
+import json
+import os
+import re
+import tempfile
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+
+def diretorio_cache(*partes):
+    """Retorna (criando se necessário) um subdiretório do cache local."""
+    raiz = Path(os.environ.get("RISCOS_CACHE_DIR", Path.home() / ".cache" / "riscos"))
+    diretorio = raiz.joinpath(*partes)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    return diretorio
+
+
+def nome_seguro(nome):
+    """Converte um identificador (ex.: `^BVSP`, `USDBRL=X`) num nome de arquivo válido."""
+    return re.sub(r"[^A-Za-z0-9._-]", "_", str(nome))
+
+
+def _gravar_atomicamente(caminho, gravar):
+    caminho = Path(caminho)
+    descritor, temporario = tempfile.mkstemp(dir=caminho.parent, prefix=f".{caminho.name}.", suffix=".tmp")
+    os.close(descritor)
+    try:
+        gravar(temporario)
+        os.replace(temporario, caminho)
+    except BaseException:
+        Path(temporario).unlink(missing_ok=True)
+        raise
+
+
+def salvar_parquet(df, caminho):
+    _gravar_atomicamente(caminho, lambda destino: df.to_parquet(destino))
+
+
+def ler_parquet(caminho):
+    """Lê um Parquet do cache, ou retorna None se ele não existir."""
+    caminho = Path(caminho)
+    return pd.read_parquet(caminho) if caminho.exists() else None
+
+
+def salvar_json(dados, caminho):
+    def gravar(destino):
+        with open(destino, "w", encoding="utf-8") as arquivo:
+            json.dump(dados, arquivo, ensure_ascii=False, default=str)
+
+    _gravar_atomicamente(caminho, gravar)
+
+
+def ler_json(caminho):
+    """Lê um JSON do cache, ou retorna None se ele não existir ou estiver corrompido."""
+    try:
+        with open(caminho, encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def trechos_faltantes(meta, inicio, fim, agora, ttl):
+    """Intervalos [início, fim] ainda não consultados ou vencidos pelo TTL.
+
+    `meta` é o dicionário gravado junto de cada série (`inicio`, `fim` e
+    `atualizado_em` em ISO) ou None se a série ainda não estiver no cache.
+    """
+    if meta is None:
+        return [(inicio, fim)]
+    coberto_inicio = date.fromisoformat(meta["inicio"])
+    coberto_fim = date.fromisoformat(meta["fim"])
+    atualizado_em = datetime.fromisoformat(meta["atualizado_em"])
+    trechos = []
+    if inicio < coberto_inicio:
+        trechos.append((inicio, coberto_inicio - timedelta(days=1)))
+    if fim > coberto_fim:
+        trechos.append((coberto_fim + timedelta(days=1), fim))
+    elif coberto_fim >= agora.date() - timedelta(days=1) and agora - atualizado_em > ttl:
+        # O último dia pode ter sido gravado ainda em andamento (ou sem divulgação): renova o trecho final
+        trechos.append((max(coberto_fim - timedelta(days=3), inicio), fim))
+    return trechos
@@ -0,0 +1,136 @@
+"""Backtest de VaR histórico em janela móvel com os testes de Kupiec e Christoffersen.
+
+A janela móvel não é reordenada a cada dia: os retornos da série recebem um posto
+(rank) global uma única vez e uma árvore de Fenwick sobre os postos mantém a
+contagem dos elementos da janela. Inserir, remover e obter a k-ésima estatística de
+ordem custam O(log n) cada, e o backtest inteiro O(n log n).
+"""
+import numpy as np
+import pandas as pd
+
+
+class JanelaOrdenada:
+    """Multiconjunto de postos 0..n-1 com inserção, remoção e k-ésimo menor em O(log n)."""
+
+    def __init__(self, tamanho):
+        self.arvore = [0] * (tamanho + 1)
+        self.maior_potencia = 1 << (tamanho.bit_length() - 1) if tamanho else 0
+
+    def adicionar(self, posto, quantidade=1):
+        indice = posto + 1
+        arvore = self.arvore
+        while indice < len(arvore):
+            arvore[indice] += quantidade
+            indice += indice & -indice
+
+    def remover(self, posto):
+        self.adicionar(posto, -1)
+
+    def k_esimo(self, k):
+        """Posto do k-ésimo menor elemento (k começa em 0)."""
+        indice, restante, passo, arvore = 0, k + 1, self.maior_potencia, self.arvore
+        while passo:
+            proximo = indice + passo
+            if proximo < len(arvore) and arvore[proximo] < restante:
+                indice = proximo
+                restante -= arvore[proximo]
+            passo >>= 1
+        return indice
+
+
+def var_janela_movel(retornos, janela, nivel_confianca):
+    """VaR histórico de cada dia estimado com os `janela` retornos anteriores a ele.
+
+    Usa a mesma estatística de ordem da página de VaR histórico (posição
+    ceil((1 - confiança) × janela)). Os primeiros `janela` dias ficam como NaN.
+    """
+    valores = np.asarray(retornos, dtype=float)
+    n = valores.size
+    var = np.full(n, np.nan)
+    if n <= janela:
+        return var
+    ordem = np.argsort(valores, kind="stable")
+    postos = np.empty(n, dtype=np.intp)
+    postos[ordem] = np.arange(n)
+    posicao = max(int(np.ceil((1 - nivel_confianca) * janela)) - 1, 0)
+
+    estrutura = JanelaOrdenada(n)
+    for posto in postos[:janela]:
+        estrutura.adicionar(int(posto))
+    for dia in range(janela, n):
+        var[dia] = valores[ordem[estrutura.k_esimo(posicao)]]
+        estrutura.adicionar(int(postos[dia]))
+        estrutura.remover(int(postos[dia - janela]))
+    return var
+
+
+def teste_kupiec(num_excecoes, num_observacoes, nivel_confianca):
+    """Teste POF de Kupiec: a frequência de exceções é compatível com 1 - confiança?"""
+    from scipy.special import chdtrc, xlogy
+
+    p = 1 - nivel_confianca
+    x, n = num_excecoes, num_observacoes
+    frequencia = x / n if n else 0.0
+    log_nula = xlogy(n - x, 1 - p) + xlogy(x, p)
+    log_alternativa = xlogy(n - x, 1 - frequencia) + xlogy(x, frequencia)
+    estatistica = max(-2 * (log_nula - log_alternativa), 0.0)
+    return estatistica, chdtrc(1, estatistica)
+
+
+def teste_christoffersen(excecoes):
+    """Teste de independência de Christoffersen: exceções ocorrem agrupadas no tempo?"""
+    from scipy.special import chdtrc, xlogy
+
+    excecoes = np.asarray(excecoes, dtype=bool)
+    anterior, atual = excecoes[:-1], excecoes[1:]
+    n00 = np.sum(~anterior & ~atual)
+    n01 = np.sum(~anterior & atual)
+    n10 = np.sum(anterior & ~atual)
+    n11 = np.sum(anterior & atual)
+    pi01 = n01 / (n00 + n01) if n00 + n01 else 0.0
+    pi11 = n11 / (n10 + n11) if n10 + n11 else 0.0
+    pi = (n01 + n11) / (n00 + n01 + n10 + n11) if excecoes.size > 1 else 0.0
+    log_nula = xlogy(n00 + n10, 1 - pi) + xlogy(n01 + n11, pi)
+    log_alternativa = xlogy(n00, 1 - pi01) + xlogy(n01, pi01) + xlogy(n10, 1 - pi11) + xlogy(n11, pi11)
+    estatistica = max(-2 * (log_nula - log_alternativa), 0.0)
+    return estatistica, chdtrc(1, estatistica)
+
+
+def backtest_var(retornos, janela, nivel_confianca):
+    """Série diária do backtest (retorno, VaR previsto e exceção) e resumo dos testes."""
+    from scipy.special import chdtrc
+
+    retornos = retornos.dropna()
+    var = var_janela_movel(retornos.to_numpy(), janela, nivel_confianca)
+    serie = pd.DataFrame({"Retorno": retornos, "VaR": var}, index=retornos.index).dropna()
+    serie["Exceção"] = serie["Retorno"] < serie["VaR"]
+
+    num_observacoes = len(serie)
+    num_excecoes = int(serie["Exceção"].sum())
+    lr_kupiec, p_kupiec = teste_kupiec(num_excecoes, num_observacoes, nivel_confianca)
+    lr_independencia, p_independencia = teste_christoffersen(serie["Exceção"].to_numpy())
+    lr_cobertura = lr_kupiec + lr_independencia
+    resumo = {
+        "Observações": num_observacoes,
+        "Exceções": num_excecoes,
+        "Exceções Esperadas": (1 - nivel_confianca) * num_observacoes,
+        "Taxa de Exceções (%)": num_excecoes / num_observacoes * 100 if num_observacoes else np.nan,
+        "LR Kupiec": lr_kupiec,
+        "p-valor Kupiec": p_kupiec,
+        "LR Independência": lr_independencia,
+        "p-valor Independência": p_independencia,
+        "LR Cobertura Condicional": lr_cobertura,
+        "p-valor Cobertura Condicional": chdtrc(2, lr_cobertura),
+    }
+    return serie, resumo
+
+
+def backtest_universo(retornos, janela, nivel_confianca, significancia=0.05):
+    """Resumo do backtest para cada coluna (ativo) de uma matriz de retornos."""
+    linhas = []
+    for ativo in retornos.columns:
+        _, resumo = backtest_var(retornos[ativo], janela, nivel_confianca)
+        resumo["Modelo"] = ("Rejeitado" if min(resumo["p-valor Kupiec"], resumo["p-valor Independência"]) < significancia
+                            else "Aprovado")
+        linhas.append({"Ativo": ativo, **resumo})
+    return pd.DataFrame(linhas)
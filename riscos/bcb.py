@@ -0,0 +1,299 @@
+"""Séries diárias de juros do Banco Central (SGS) e fatores acumulados de DI e Selic.
+
+As taxas diárias (% ao dia) ficam num cache local em Parquet, atualizado apenas nos
+trechos ainda não consultados. Sobre a série, o log do fator diário é acumulado uma
+única vez; o fator entre duas datas quaisquer passa a ser a exponencial de uma
+subtração, e arrays com milhares de pares de datas são resolvidos com
+`np.searchsorted`, sem laço por dia.
+
+A fonte padrão é a API do SGS, consultada por uma `requests.Session` compartilhada
+(conexões reaproveitadas) com timeout; `obter_series` busca várias séries em paralelo.
+O endereço pode ser trocado por `RISCOS_URL_SGS`, por exemplo para o servidor local
+de `riscos.servidor_sgs`; com `RISCOS_BUSCADOR_SGS=sintetico` usa-se uma série
+determinística local, sem HTTP, útil para testes e uso offline.
+
+Junto de cada série ficam gravados agregados semanais e mensais, recalculados a cada
+atualização; `serie_para_grafico` usa o nível de detalhe adequado ao intervalo pedido
+e reduz o resultado a um número limitado de pontos.
+"""
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from riscos.armazenamento import diretorio_cache, ler_json, ler_parquet, salvar_json, salvar_parquet, trechos_faltantes
+from riscos.calendario import datas_uteis, dias_uteis
+from riscos.reducao import FREQUENCIAS, MAX_PONTOS_GRAFICO, agregar, reduzir
+
+URL_SGS = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.{codigo}/dados"
+
+SERIE_CDI = 12
+SERIE_SELIC = 11
+
+# Série diária de taxa de cada indexador de ponta de swap
+SERIES_INDEXADOR = {"di": SERIE_CDI, "selic": SERIE_SELIC}
+
+# O SGS limita consultas de séries diárias a janelas de 10 anos
+ANOS_POR_CONSULTA = 10
+
+TTL_PADRAO = timedelta(hours=6)
+
+# (conexão, leitura) em segundos
+TIMEOUT = (5, 30)
+
+# Conexões simultâneas com o SGS (tamanho do pool da sessão e threads de `obter_series`)
+MAX_CONEXOES = 8
+
+# Erros esperados numa consulta: validação (ValueError) e rede. `requests.RequestException`
+# é subclasse de OSError, então quem trata os erros não precisa importar o `requests`
+ERROS_CONSULTA = (ValueError, OSError)
+
+_memoria = {}
+_armazenados = {}
+_agregados = {}
+_travas = {}
+_trava_global = threading.Lock()
+_sessao_compartilhada = None
+
+
+def url_sgs():
+    return os.environ.get("RISCOS_URL_SGS", URL_SGS)
+
+
+def sessao_http():
+    """Sessão HTTP única do processo (SGS e PTAX), com pool de conexões para consultas em paralelo."""
+    global _sessao_compartilhada
+    with _trava_global:
+        if _sessao_compartilhada is None:
+            import requests
+
+            sessao = requests.Session()
+            adaptador = requests.adapters.HTTPAdapter(pool_connections=MAX_CONEXOES, pool_maxsize=MAX_CONEXOES)
+            sessao.mount("https://", adaptador)
+            sessao.mount("http://", adaptador)
+            _sessao_compartilhada = sessao
+        return _sessao_compartilhada
+
+
+def buscar_sgs(codigo, inicio, fim):
+    """Baixa uma série do SGS entre `inicio` e `fim`, em janelas de até 10 anos."""
+    sessao = sessao_http()
+    partes = []
+    while inicio <= fim:
+        fim_janela = min(fim, date(inicio.year + ANOS_POR_CONSULTA, inicio.month, 1) - timedelta(days=1))
+        resposta = sessao.get(url_sgs().format(codigo=codigo), timeout=TIMEOUT, params={
+            "formato": "json",
+            "dataInicial": inicio.strftime("%d/%m/%Y"),
+            "dataFinal": fim_janela.strftime("%d/%m/%Y"),
+        })
+        # O SGS responde 404 quando não há observações no intervalo
+        if resposta.status_code != 404:
+            resposta.raise_for_status()
+            partes.append(pd.DataFrame(resposta.json()))
+        inicio = fim_janela + timedelta(days=1)
+
+    dados = pd.concat(partes) if partes else pd.DataFrame(columns=["data", "valor"])
+    serie = pd.Series(pd.to_numeric(dados["valor"], errors="coerce").to_numpy(dtype=float),
+                      index=pd.to_datetime(dados["data"], dayfirst=True), name="valor")
+    return serie.dropna()
+
+
+def buscar_sintetico(codigo, inicio, fim):
+    """Taxa diária determinística (% ao dia) nos dias úteis ANBIMA, sem acesso à rede."""
+    datas = datas_uteis(inicio, fim)
+    fase = zlib.crc32(str(codigo).encode()) % 365
+    dias = (datas - pd.Timestamp("2000-01-01")).days.to_numpy()
+    taxa_anual = 0.10 + 0.04 * np.sin(2 * np.pi * (dias + fase) / 2000)
+    return pd.Series(((1 + taxa_anual) ** (1 / 252) - 1) * 100, index=datas, name="valor")
+
+
+BUSCADORES = {"sgs": buscar_sgs, "sintetico": buscar_sintetico}
+
+
+def buscador_padrao():
+    return BUSCADORES[os.environ.get("RISCOS_BUSCADOR_SGS", "sgs")]
+
+
+def _trava(codigo):
+    with _trava_global:
+        return _travas.setdefault(int(codigo), threading.Lock())
+
+
+def _caminhos(codigo):
+    diretorio = diretorio_cache("sgs")
+    return diretorio / f"{int(codigo)}.parquet", diretorio / f"{int(codigo)}.json"
+
+
+def _caminho_agregado(codigo, frequencia):
+    return diretorio_cache("sgs") / f"{int(codigo)}_{frequencia}.parquet"
+
+
+def _salvar_agregados(codigo, serie):
+    for frequencia in FREQUENCIAS:
+        salvar_parquet(agregar(serie, frequencia), _caminho_agregado(codigo, frequencia))
+
+
+def _ler_armazenado(codigo):
+    """Série e metadados gravados (lidos da memória se o arquivo não mudou)."""
+    arquivo, arquivo_meta = _caminhos(codigo)
+    if not arquivo.exists():
+        return None, ler_json(arquivo_meta)
+    modificado = arquivo.stat().st_mtime_ns
+    em_memoria = _armazenados.get(int(codigo))
+    if em_memoria is None or em_memoria[0] != modificado:
+        em_memoria = (modificado, ler_parquet(arquivo)["valor"], ler_json(arquivo_meta))
+        _armazenados[int(codigo)] = em_memoria
+    return em_memoria[1], em_memoria[2]
+
+
+def obter_serie(codigo, inicio, fim=None, ttl=TTL_PADRAO, buscador=None):
+    """Série diária do SGS entre `inicio` e `fim`, buscando na fonte só os trechos faltantes."""
+    buscador = buscador or buscador_padrao()
+    # Não há taxas futuras: o intervalo gravado nunca passa de hoje
+    inicio, fim = pd.Timestamp(inicio).date(), min(pd.Timestamp(fim or date.today()).date(), date.today())
+    agora = datetime.now()
+    arquivo, arquivo_meta = _caminhos(codigo)
+
+    with _trava(codigo):
+        serie, meta = _ler_armazenado(codigo)
+        trechos = trechos_faltantes(meta, inicio, fim, agora, ttl)
+        if trechos:
+            partes = ([] if serie is None else [serie]) + [buscador(codigo, *trecho) for trecho in trechos]
+            serie = pd.concat(partes)
+            serie = serie[~serie.index.duplicated(keep="last")].sort_index()
+            meta = {
+                "inicio": min(inicio, date.fromisoformat(meta["inicio"])).isoformat() if meta else inicio.isoformat(),
+                "fim": max(fim, date.fromisoformat(meta["fim"])).isoformat() if meta else fim.isoformat(),
+                "atualizado_em": agora.isoformat(),
+            }
+            salvar_json(meta, arquivo_meta)
+            salvar_parquet(serie.rename("valor").to_frame(), arquivo)
+            _salvar_agregados(codigo, serie)
+            _armazenados[int(codigo)] = (arquivo.stat().st_mtime_ns, serie, meta)
+            _memoria.pop(int(codigo), None)
+    return serie.loc[pd.Timestamp(inicio):pd.Timestamp(fim)].copy()
+
+
+def obter_agregado(codigo, frequencia):
+    """Agregados semanais ou mensais (último, mínimo, máximo, média) da série gravada no cache."""
+    if frequencia not in FREQUENCIAS:
+        raise ValueError(f"Frequência desconhecida: {frequencia}. Opções: {', '.join(FREQUENCIAS)}.")
+    caminho = _caminho_agregado(codigo, frequencia)
+    with _trava(codigo):
+        if not caminho.exists():
+            # Cache anterior aos agregados: calcula a partir da série gravada
+            serie, _ = _ler_armazenado(codigo)
+            if serie is None:
+                raise ValueError(f"Série SGS {codigo} ainda não está no cache.")
+            _salvar_agregados(codigo, serie)
+        modificado = caminho.stat().st_mtime_ns
+        em_memoria = _agregados.get((int(codigo), frequencia))
+        if em_memoria is None or em_memoria[0] != modificado:
+            em_memoria = (modificado, ler_parquet(caminho))
+            _agregados[(int(codigo), frequencia)] = em_memoria
+    return em_memoria[1]
+
+
+def serie_para_grafico(codigo, inicio, fim=None, pontos=MAX_PONTOS_GRAFICO, metodo="lttb"):
+    """Série para desenho entre `inicio` e `fim`, com no máximo `pontos` pontos.
+
+    Usa a série diária quando o intervalo tem poucas observações; em intervalos
+    longos, parte dos agregados semanais ou mensais (último valor de cada período),
+    de modo que o custo não cresce com o histórico. O resultado passa por `reduzir`.
+    Num intervalo curto, todos os pontos diários são mantidos.
+    """
+    inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim or date.today())
+    serie = obter_serie(codigo, inicio, fim)
+    # Até 8 observações por ponto a reduzir: acima disso, passa ao nível agregado seguinte
+    for frequencia in FREQUENCIAS:
+        if len(serie) <= 8 * pontos:
+            break
+        serie = obter_agregado(codigo, frequencia)["valor"].loc[inicio:fim]
+    return reduzir(serie, pontos, metodo)
+
+
+def obter_series(codigos, inicio, fim=None, ttl=TTL_PADRAO, buscador=None):
+    """{código: série} de várias séries do SGS, buscadas em paralelo (cada uma com seu cache)."""
+    codigos = list(dict.fromkeys(codigos))
+    with ThreadPoolExecutor(max_workers=min(MAX_CONEXOES, len(codigos) or 1)) as executor:
+        futuros = {codigo: executor.submit(obter_serie, codigo, inicio, fim, ttl, buscador) for codigo in codigos}
+        return {codigo: futuro.result() for codigo, futuro in futuros.items()}
+
+
+def log_fatores_acumulados(serie):
+    """(datas, log acumulado) de uma série de taxas diárias em % ao dia.
+
+    `log_acumulado[k]` é a soma de log(1 + taxa) das k primeiras datas, de modo que o
+    fator de [datas[i], datas[j]) é exp(log_acumulado[j] - log_acumulado[i]).
+    """
+    datas = serie.index.to_numpy().astype("datetime64[D]")
+    log_acumulado = np.concatenate([[0.0], np.cumsum(np.log1p(serie.to_numpy(dtype=float) / 100))])
+    return datas, log_acumulado
+
+
+def _indice(codigo, inicio, fim, ttl=TTL_PADRAO):
+    """Log-fatores acumulados da série, reaproveitados enquanto cobrirem o intervalo e estiverem no TTL."""
+    inicio, fim = pd.Timestamp(inicio).date(), pd.Timestamp(fim).date()
+    agora = datetime.now()
+    em_memoria = _memoria.get(int(codigo))
+    if em_memoria is None or em_memoria[0] > inicio or em_memoria[1] < fim or agora - em_memoria[2] > ttl:
+        serie = obter_serie(codigo, inicio, fim, ttl)
+        em_memoria = (inicio, fim, agora, *log_fatores_acumulados(serie))
+        _memoria[int(codigo)] = em_memoria
+    return em_memoria[3], em_memoria[4]
+
+
+def _fixacoes(codigo, inicio, fim):
+    """(datas, log acumulado) das taxas divulgadas de `inicio` a `fim` (nunca depois de hoje); vazio se não houver."""
+    inicio, fim = np.datetime64(inicio, "D"), min(np.datetime64(fim, "D"), np.datetime64(date.today(), "D"))
+    if inicio > fim:
+        return np.array([], dtype="datetime64[D]"), np.zeros(1)
+    return _indice(codigo, inicio, fim)
+
+
+def fator_acumulado(codigo, inicio, fim, taxa_projecao=None):
+    """Fator acumulado da série diária de `inicio` (inclusive) a `fim` (exclusive).
+
+    Aceita datas isoladas ou arrays. Dias úteis posteriores à última taxa divulgada
+    são capitalizados por `taxa_projecao` (fração ao ano, base 252), inclusive todo o
+    prazo de um intervalo que começa depois dela; sem taxa de projeção, ou com dias
+    úteis antes da primeira taxa da série, gera ValueError.
+    """
+    datas_inicio = np.atleast_1d(pd.to_datetime(np.atleast_1d(inicio)).values.astype("datetime64[D]"))
+    datas_fim = np.atleast_1d(pd.to_datetime(np.atleast_1d(fim)).values.astype("datetime64[D]"))
+    datas, log_acumulado = _fixacoes(codigo, datas_inicio.min(), datas_fim.max())
+    if len(datas):
+        if np.any(dias_uteis(datas_inicio, np.minimum(datas_fim, datas[0])) > 0):
+            raise ValueError(f"Série SGS {codigo} sem taxas para todo o período pedido.")
+        log_fator = (log_acumulado[np.searchsorted(datas, datas_fim)]
+                     - log_acumulado[np.searchsorted(datas, datas_inicio)])
+        proximo_dia = datas[-1] + 1
+    else:
+        # Nenhuma taxa divulgada desde o início: todos os dias úteis do intervalo são projetados
+        log_fator = np.zeros(np.broadcast(datas_inicio, datas_fim).shape)
+        proximo_dia = datas_inicio.min()
+    # Dias úteis do intervalo que ficaram depois da última taxa divulgada
+    sem_taxa = np.maximum(dias_uteis(np.maximum(datas_inicio, proximo_dia), np.maximum(datas_fim, proximo_dia)), 0)
+    if np.any(sem_taxa > 0):
+        if taxa_projecao is None:
+            raise ValueError(f"Série SGS {codigo} só tem taxas até {pd.Timestamp(datas[-1]):%d/%m/%Y}; "
+                             "informe uma taxa de projeção." if len(datas) else
+                             f"Série SGS {codigo} sem taxas para todo o período pedido; informe uma taxa de projeção.")
+        log_fator = log_fator + sem_taxa * np.log1p(taxa_projecao) / 252
+    fator = np.exp(log_fator)
+    return fator if np.ndim(inicio) or np.ndim(fim) else fator[0]
+
+
+def dias_projetados(codigo, inicio, fim):
+    """Dias úteis de `inicio` a `fim` (exclusive) posteriores à última taxa divulgada da série.
+
+    São os dias que `fator_acumulado` capitaliza pela taxa de projeção.
+    """
+    inicio, fim = np.datetime64(pd.Timestamp(inicio).date(), "D"), np.datetime64(pd.Timestamp(fim).date(), "D")
+    datas, _ = _fixacoes(codigo, inicio, fim)
+    proximo_dia = datas[-1] + 1 if len(datas) else inicio
+    return int(max(dias_uteis(max(inicio, proximo_dia), max(fim, proximo_dia)), 0))
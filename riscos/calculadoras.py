@@ -0,0 +1,197 @@
+"""Calculadoras da plataforma com entrada e saída em JSON, para uso fora do Streamlit.
+
+Cada calculadora recebe parâmetros simples (números, textos, listas e dicionários,
+como chegam de um arquivo JSON ou de uma requisição HTTP) e devolve um dicionário
+serializável. Taxas, volatilidades e níveis de confiança são frações (0,15 para
+15%), como nos módulos de cálculo; tabelas voltam como listas de registros.
+
+`calcular(nome, parametros)` é o ponto de entrada usado pela linha de comando
+(`python -m riscos`) e pelo servidor HTTP (`riscos.api`). Como tudo roda num único
+processo, os caches em memória (covariâncias, modelos, séries) são aproveitados
+entre os cálculos de um lote.
+"""
+import inspect
+import math
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from riscos.cotacoes import obter_cotacoes_lote
+from riscos.hedge import otimizar_hedge
+from riscos.historico import matriz_retornos, tabela_var_historico
+from riscos.monte_carlo import covariancia_correlacao, var_monte_carlo
+from riscos.ndf import agregar_blotter, calcular_ajuste, calcular_blotter
+from riscos.parametrico import covariancia_historica, decompor_var, var_parametrico
+from riscos.swaps import avaliar_carteira, avaliar_swap, sensibilidades
+from riscos.var_cambial import var_exposicao
+
+
+def serializar(valor):
+    """Converte resultados (arrays, DataFrames, datas, escalares NumPy) em tipos JSON."""
+    if isinstance(valor, pd.DataFrame):
+        return [serializar(registro) for registro in valor.to_dict("records")]
+    if isinstance(valor, pd.Series):
+        return {str(chave): serializar(item) for chave, item in valor.items()}
+    if isinstance(valor, dict):
+        return {str(chave): serializar(item) for chave, item in valor.items()}
+    if isinstance(valor, (list, tuple, np.ndarray)):
+        return [serializar(item) for item in valor]
+    if isinstance(valor, (pd.Timestamp, datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and not math.isfinite(valor):
+        return None
+    return valor
+
+
+def _inicio_historico(dias_historico):
+    return date.today() - timedelta(days=int(dias_historico))
+
+
+def calcular_var_parametrico(valor, volatilidade_diaria, nivel_confianca=0.95, horizonte=1):
+    """VaR paramétrico de uma posição com volatilidade diária informada."""
+    var = var_parametrico(valor, volatilidade_diaria, nivel_confianca, horizonte)
+    return {"var": var, "var_percentual": var / valor if valor else None}
+
+
+def calcular_var_carteira(posicoes, nivel_confianca=0.95, horizonte=1, estimador="amostral", dias_historico=365):
+    """VaR delta-normal de uma carteira {ativo: exposição em R$}, com covariância do histórico."""
+    posicoes = pd.Series(posicoes, dtype=float)
+    covariancia, retornos = covariancia_historica(posicoes.index, _inicio_historico(dias_historico), estimador)
+    resultado = decompor_var(posicoes.to_numpy(), covariancia, nivel_confianca, horizonte)
+    return {
+        "var": resultado["var"],
+        "volatilidade": resultado["volatilidade"],
+        "dias": len(retornos),
+        "posicoes": pd.DataFrame({
+            "ativo": posicoes.index,
+            "exposicao": posicoes.to_numpy(),
+            "var_marginal": resultado["var_marginal"],
+            "var_componente": resultado["var_componentes"],
+            "var_incremental": resultado["var_incremental"],
+        }),
+    }
+
+
+def calcular_var_monte_carlo(exposicoes, volatilidades, correlacao=0.0, medias=None, nivel_confianca=0.95,
+                             num_simulacoes=100_000, semente=None, amostragem="pseudo", processos=1,
+                             streaming=False):
+    """VaR e ES Monte Carlo de posições com volatilidades diárias e correlação (matriz ou valor único)."""
+    covariancia = covariancia_correlacao(volatilidades, correlacao)
+    return var_monte_carlo(np.asarray(exposicoes, dtype=float), covariancia, nivel_confianca, int(num_simulacoes),
+                           medias=medias, semente=semente, componentes=len(exposicoes) > 1,
+                           processos=int(processos), streaming=streaming, amostragem=amostragem)
+
+
+def calcular_var_historico(tickers, nivel_confianca=0.95, dias_historico=365):
+    """VaR e ES históricos de cada ativo de um universo, com as cotações do cache local."""
+    cotacoes = obter_cotacoes_lote(list(tickers), _inicio_historico(dias_historico))
+    tabela = tabela_var_historico(matriz_retornos(cotacoes), nivel_confianca)
+    return {"ativos": tabela}
+
+
+def calcular_ndf(cotacao_fechada, notional, cotacao_fechamento):
+    """Ajuste, pagamento e valor líquido de uma NDF."""
+    ajuste, pagamento, valor_liquido = calcular_ajuste(cotacao_fechada, notional, cotacao_fechamento)
+    return {"ajuste": ajuste, "pagamento": pagamento, "valor_liquido": valor_liquido}
+
+
+def calcular_ndf_blotter(operacoes):
+    """Ajustes de uma lista de NDFs (registros com as colunas do blotter) e o consolidado."""
+    blotter = calcular_blotter(pd.DataFrame(operacoes))
+    return {"operacoes": blotter, "consolidado": agregar_blotter(blotter)}
+
+
+def calcular_swap(nocional, ativa, passiva, com_sensibilidades=False):
+    """Fatores, valores e resultado de um swap; `ativa`/`passiva` são os argumentos de `fator_ponta`."""
+    pontas = {"Ativa": ativa, "Passiva": passiva}
+    resultado = avaliar_swap(nocional, pontas)
+    if com_sensibilidades:
+        resultado["sensibilidades"] = sensibilidades(nocional, pontas)
+    return resultado
+
+
+def calcular_swaps_carteira(operacoes, realizado=False):
+    """Valor de cada ponta e resultado de uma carteira de swaps (registros no formato de `avaliar_carteira`)."""
+    return {"operacoes": avaliar_carteira(pd.DataFrame(operacoes), realizado=realizado)}
+
+
+def calcular_var_cambial(carteira, nivel_confianca=0.95, horizonte=1, estimador="amostral", dias_historico=365):
+    """VaR cambial, em reais, de uma carteira do mapa de exposição."""
+    resultado = var_exposicao(carteira, nivel_confianca, horizonte, _inicio_historico(dias_historico), estimador)
+    for tabela in ("matriz_brl", "em_reais"):
+        resultado[tabela] = resultado[tabela].reset_index()
+    resultado.pop("covariancia")
+    return resultado
+
+
+def calcular_hedge(carteira, objetivo="minima_variancia", nivel_confianca=0.95, horizonte=1, limite_var=None,
+                   instrumentos=None, estimador="amostral", dias_historico=365):
+    """Hedge ótimo de uma carteira do mapa de exposição."""
+    return otimizar_hedge(carteira, _inicio_historico(dias_historico), objetivo, nivel_confianca, horizonte,
+                          limite_var, instrumentos, estimador)
+
+
+CALCULADORAS = {
+    "var_parametrico": calcular_var_parametrico,
+    "var_carteira": calcular_var_carteira,
+    "var_monte_carlo": calcular_var_monte_carlo,
+    "var_historico": calcular_var_historico,
+    "ndf": calcular_ndf,
+    "ndf_blotter": calcular_ndf_blotter,
+    "swap": calcular_swap,
+    "swaps_carteira": calcular_swaps_carteira,
+    "var_cambial": calcular_var_cambial,
+    "hedge": calcular_hedge,
+}
+
+
+def calcular(nome, parametros=None):
+    """Executa a calculadora `nome` com `parametros` e devolve o resultado já serializável.
+
+    Parâmetros inválidos ou ausentes geram ValueError, como os erros de validação dos cálculos;
+    isso inclui valores de tipo errado e chaves faltando nos dicionários aninhados (TypeError
+    e KeyError levantados pela própria calculadora).
+    """
+    if nome not in CALCULADORAS:
+        raise ValueError(f"Calculadora desconhecida: {nome!r}. Opções: {', '.join(CALCULADORAS)}.")
+    parametros = parametros or {}
+    if not isinstance(parametros, dict):
+        raise ValueError("Os parâmetros devem ser um objeto JSON (nome: valor).")
+    try:
+        inspect.signature(CALCULADORAS[nome]).bind(**parametros)
+    except TypeError as erro:
+        raise ValueError(f"Parâmetros inválidos para {nome}: {erro}.") from erro
+    try:
+        resultado = CALCULADORAS[nome](**parametros)
+    except (TypeError, KeyError) as erro:
+        raise ValueError(f"Parâmetros inválidos para {nome}: {type(erro).__name__}: {erro}.") from erro
+    return serializar(resultado)
+
+
+def mensagem_falha_inesperada(erro):
+    """Mensagem de erro de uma falha do cálculo que não é de validação nem de acesso aos dados."""
+    return f"Falha inesperada: {type(erro).__name__}: {erro}"
+
+
+def processar_pedido(pedido):
+    """Resposta a um pedido {"id", "calculadora", "parametros"} de um lote.
+
+    Erros de validação (ValueError), de acesso às fontes de dados e qualquer outra falha
+    do cálculo viram {"id", "erro"}, para que um pedido não interrompa o restante do lote.
+    """
+    import requests
+
+    identificador = pedido.get("id") if isinstance(pedido, dict) else None
+    try:
+        if not isinstance(pedido, dict) or "calculadora" not in pedido:
+            raise ValueError('Cada pedido deve ser um objeto com "calculadora" e "parametros".')
+        return {"id": identificador, "resultado": calcular(pedido["calculadora"], pedido.get("parametros"))}
+    except ValueError as erro:
+        return {"id": identificador, "erro": str(erro)}
+    except requests.RequestException as erro:
+        return {"id": identificador, "erro": f"Falha ao obter dados de mercado: {erro}"}
+    except Exception as erro:
+        return {"id": identificador, "erro": mensagem_falha_inesperada(erro)}
@@ -0,0 +1,116 @@
+"""Calendário de dias úteis ANBIMA com contagem de dias úteis em O(1).
+
+Os feriados nacionais (fixos e móveis, a partir da Páscoa) de 2000 a 2099 geram,
+uma única vez, um array com o número acumulado de dias úteis desde o início do
+calendário. A quantidade de dias úteis entre duas datas é a diferença de duas
+posições desse array, o que vale também para arrays com milhões de pares de datas.
+Como na convenção de mercado, a contagem inclui a data inicial e exclui a final.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+ANO_INICIAL = 2000
+ANO_FINAL = 2099
+
+# (mês, dia) dos feriados nacionais de data fixa
+FERIADOS_FIXOS = [(1, 1), (4, 21), (5, 1), (9, 7), (10, 12), (11, 2), (11, 15), (12, 25)]
+
+# Dia Nacional de Zumbi e da Consciência Negra, feriado nacional a partir de 2024 (Lei 14.759/2023)
+ANO_CONSCIENCIA_NEGRA = 2024
+
+# Deslocamento, em dias, dos feriados móveis em relação ao domingo de Páscoa
+FERIADOS_MOVEIS = {"Carnaval (segunda)": -48, "Carnaval (terça)": -47, "Sexta-feira Santa": -2,
+                   "Corpus Christi": 60}
+
+
+def pascoa(ano):
+    """Domingo de Páscoa (algoritmo de Meeus/Jones/Butcher para o calendário gregoriano)."""
+    a, b, c = ano % 19, ano // 100, ano % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes = (h + l - 7 * m + 114) // 31
+    dia = (h + l - 7 * m + 114) % 31 + 1
+    return np.datetime64(f"{ano:04d}-{mes:02d}-{dia:02d}", "D")
+
+
+def feriados(ano_inicial=ANO_INICIAL, ano_final=ANO_FINAL):
+    """Feriados nacionais ANBIMA entre os anos indicados (array ordenado de datetime64[D])."""
+    datas = []
+    for ano in range(ano_inicial, ano_final + 1):
+        fixos = FERIADOS_FIXOS + ([(11, 20)] if ano >= ANO_CONSCIENCIA_NEGRA else [])
+        datas += [np.datetime64(f"{ano:04d}-{mes:02d}-{dia:02d}", "D") for mes, dia in fixos]
+        domingo_pascoa = pascoa(ano)
+        datas += [domingo_pascoa + deslocamento for deslocamento in FERIADOS_MOVEIS.values()]
+    return np.unique(np.array(datas, dtype="datetime64[D]"))
+
+
+@lru_cache(maxsize=1)
+def _calendario():
+    """(primeira data, acumulado de dias úteis, dias úteis em ordem) do calendário inteiro."""
+    inicio = np.datetime64(f"{ANO_INICIAL}-01-01", "D")
+    fim = np.datetime64(f"{ANO_FINAL + 1}-01-01", "D")
+    datas = np.arange(inicio, fim)
+    uteis = np.is_busday(datas, holidays=feriados())
+    # acumulado[i] = dias úteis em [inicio, inicio + i); uma posição a mais para a data final exclusiva
+    acumulado = np.concatenate([[0], np.cumsum(uteis, dtype=np.int32)])
+    return inicio, acumulado, datas[uteis]
+
+
+def _datas(datas):
+    """Converte datas (date, Timestamp, string ou arrays/Series delas) para datetime64[D]."""
+    if isinstance(datas, np.ndarray) and np.issubdtype(datas.dtype, np.datetime64):
+        return datas.astype("datetime64[D]")
+    if np.ndim(datas) == 0:
+        return np.datetime64(pd.Timestamp(datas).date(), "D")
+    return pd.to_datetime(np.asarray(datas)).values.astype("datetime64[D]")
+
+
+def _posicoes(datas):
+    inicio, acumulado, _ = _calendario()
+    posicoes = (_datas(datas) - inicio).astype(np.int64)
+    if np.any((posicoes < 0) | (posicoes >= len(acumulado))):
+        raise ValueError(f"Datas fora do calendário ({ANO_INICIAL} a {ANO_FINAL}).")
+    return posicoes
+
+
+def dias_uteis(inicio, fim):
+    """Dias úteis de `inicio` (inclusive) a `fim` (exclusive); negativos se `fim` < `inicio`.
+
+    Aceita datas isoladas ou arrays; cada par custa duas leituras do array acumulado.
+    """
+    _, acumulado, _ = _calendario()
+    return acumulado[_posicoes(fim)] - acumulado[_posicoes(inicio)]
+
+
+def dias_corridos(inicio, fim):
+    """Dias corridos de `inicio` a `fim` (datas isoladas ou arrays)."""
+    return (_datas(fim) - _datas(inicio)).astype(np.int64)
+
+
+def eh_dia_util(datas):
+    """True para as datas que são dias úteis."""
+    _, acumulado, _ = _calendario()
+    posicoes = _posicoes(datas)
+    return acumulado[posicoes + 1] > acumulado[posicoes]
+
+
+def somar_dias_uteis(datas, quantidade):
+    """Data `quantidade` dias úteis após cada data (partindo do próximo dia útil, se não for útil)."""
+    _, _, uteis = _calendario()
+    indices = np.searchsorted(uteis, _datas(datas)) + np.asarray(quantidade)
+    if np.any((indices < 0) | (indices >= len(uteis))):
+        raise ValueError(f"Datas fora do calendário ({ANO_INICIAL} a {ANO_FINAL}).")
+    return uteis[indices]
+
+
+def datas_uteis(inicio, fim):
+    """Dias úteis de `inicio` (inclusive) a `fim` (inclusive), como DatetimeIndex."""
+    _, _, uteis = _calendario()
+    return pd.DatetimeIndex(uteis[(uteis >= _datas(inicio)) & (uteis <= _datas(fim))])
@@ -0,0 +1,130 @@
+"""Linha de comando das calculadoras de risco, sem Streamlit.
+
+    python -m riscos listar
+    python -m riscos calcular var_parametrico --parametros '{"valor": 1e6, "volatilidade_diaria": 0.0126}'
+    python -m riscos lote pedidos.jsonl --saida resultados.jsonl
+    python -m riscos swaps carteira.csv --saida avaliada.csv [--realizado]
+    python -m riscos servidor --porta 8000
+
+`lote` lê um pedido JSON por linha ({"id", "calculadora", "parametros"}) e grava uma
+resposta por linha, na mesma ordem, com "resultado" ou "erro". `swaps` avalia de uma
+vez uma carteira de swaps em CSV ou XLSX, nas colunas de `riscos.swaps.avaliar_carteira`.
+"""
+import argparse
+import json
+import sys
+import time
+from contextlib import nullcontext
+
+import pandas as pd
+
+from riscos.calculadoras import CALCULADORAS, calcular, processar_pedido
+
+
+def _abrir(caminho, modo):
+    if caminho in (None, "-"):
+        return nullcontext(sys.stdin if "r" in modo else sys.stdout)
+    return open(caminho, modo, encoding="utf-8")
+
+
+def _ler_tabela(caminho):
+    return pd.read_excel(caminho) if caminho.lower().endswith((".xlsx", ".xls")) else pd.read_csv(caminho)
+
+
+def _gravar_tabela(df, caminho):
+    if caminho is None or caminho == "-":
+        df.to_csv(sys.stdout, index=False)
+    elif caminho.lower().endswith(".xlsx"):
+        df.to_excel(caminho, index=False)
+    else:
+        df.to_csv(caminho, index=False)
+
+
+def comando_listar(argumentos):
+    for nome, funcao in CALCULADORAS.items():
+        print(f"{nome:18} {(funcao.__doc__ or '').splitlines()[0]}")
+
+
+def comando_calcular(argumentos):
+    parametros = json.loads(argumentos.parametros)
+    print(json.dumps(calcular(argumentos.calculadora, parametros), ensure_ascii=False, indent=2))
+
+
+def comando_lote(argumentos):
+    inicio = time.perf_counter()
+    quantidade = erros = 0
+    with _abrir(argumentos.entrada, "r") as entrada, _abrir(argumentos.saida, "w") as saida:
+        for numero, linha in enumerate(entrada, start=1):
+            if not linha.strip():
+                continue
+            try:
+                pedido = json.loads(linha)
+            except ValueError as erro:
+                resposta = {"id": None, "erro": f"Linha {numero}: JSON inválido ({erro})."}
+            else:
+                resposta = processar_pedido(pedido)
+            quantidade += 1
+            erros += "erro" in resposta
+            saida.write(json.dumps(resposta, ensure_ascii=False) + "\n")
+    print(f"{quantidade} pedidos processados ({erros} com erro) em {time.perf_counter() - inicio:.2f} s.",
+          file=sys.stderr)
+
+
+def comando_swaps(argumentos):
+    from riscos.ndf import converter_datas
+    from riscos.swaps import avaliar_carteira
+
+    carteira = _ler_tabela(argumentos.entrada)
+    carteira.columns = carteira.columns.astype(str).str.strip()
+    for coluna in ("Data Inicial", "Vencimento"):
+        if coluna in carteira:
+            carteira[coluna] = converter_datas(carteira[coluna])
+    inicio = time.perf_counter()
+    avaliada = avaliar_carteira(carteira, realizado=argumentos.realizado)
+    _gravar_tabela(avaliada, argumentos.saida)
+    print(f"{len(avaliada)} swaps avaliados em {time.perf_counter() - inicio:.2f} s; "
+          f"resultado total R$ {avaliada['Resultado (R$)'].sum():,.2f}.", file=sys.stderr)
+
+
+def comando_servidor(argumentos):
+    from riscos.api import servir
+
+    servir(argumentos.porta, argumentos.endereco)
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(prog="python -m riscos", description=__doc__.splitlines()[0])
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    subcomandos.add_parser("listar", help="lista as calculadoras disponíveis").set_defaults(funcao=comando_listar)
+
+    calculo = subcomandos.add_parser("calcular", help="executa uma calculadora e imprime o resultado em JSON")
+    calculo.add_argument("calculadora", choices=list(CALCULADORAS))
+    calculo.add_argument("--parametros", default="{}", help="parâmetros em JSON")
+    calculo.set_defaults(funcao=comando_calcular)
+
+    lote = subcomandos.add_parser("lote", help="processa pedidos JSON, um por linha")
+    lote.add_argument("entrada", nargs="?", default="-", help="arquivo JSONL (padrão: entrada padrão)")
+    lote.add_argument("--saida", default="-", help="arquivo JSONL de respostas (padrão: saída padrão)")
+    lote.set_defaults(funcao=comando_lote)
+
+    swaps = subcomandos.add_parser("swaps", help="avalia uma carteira de swaps em CSV ou XLSX")
+    swaps.add_argument("entrada")
+    swaps.add_argument("--saida", default="-", help="CSV ou XLSX de saída (padrão: CSV na saída padrão)")
+    swaps.add_argument("--realizado", action="store_true", help="acumula CDI/Selic realizados do SGS")
+    swaps.set_defaults(funcao=comando_swaps)
+
+    servidor = subcomandos.add_parser("servidor", help="sobe o servidor HTTP das calculadoras")
+    servidor.add_argument("--porta", type=int, default=8000)
+    servidor.add_argument("--endereco", default="127.0.0.1")
+    servidor.set_defaults(funcao=comando_servidor)
+
+    argumentos = parser.parse_args(argumentos)
+    try:
+        argumentos.funcao(argumentos)
+    except ValueError as erro:
+        parser.exit(1, f"Erro: {erro}\n")
+
+
+if __name__ == "__main__":
+    main()
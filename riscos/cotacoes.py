@@ -0,0 +1,167 @@
+"""Cache local de cotações diárias (Parquet por ativo) com atualização incremental.
+
+Cada ativo tem um arquivo `<ticker>.parquet` com as cotações e um `<ticker>.json`
+com o intervalo de datas já consultado e o horário da última atualização. Uma
+consulta busca na fonte apenas os trechos do intervalo ainda não cobertos; o trecho
+mais recente é renovado quando passa do TTL. Leituras repetidas são servidas de uma
+cópia em memória, validada pela data de modificação do arquivo.
+
+A fonte padrão é o Yahoo Finance; com `RISCOS_BUSCADOR_COTACOES=sintetico` usa-se
+um gerador determinístico local, útil para testes e uso offline.
+"""
+import os
+import threading
+import zlib
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from riscos.armazenamento import (diretorio_cache, ler_json, ler_parquet, nome_seguro, salvar_json, salvar_parquet,
+                                  trechos_faltantes)
+
+TTL_PADRAO = timedelta(hours=1)
+
+COLUNAS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+_memoria = {}
+_travas = {}
+_trava_global = threading.Lock()
+
+
+def buscar_yfinance(tickers, inicio, fim):
+    """Baixa cotações diárias de vários ativos numa única chamada (com threads) ao Yahoo Finance."""
+    import yfinance as yf
+
+    dados = yf.download(list(tickers), start=inicio, end=fim + timedelta(days=1), interval="1d",
+                        group_by="ticker", auto_adjust=False, threads=True, progress=False)
+    cotacoes = {}
+    for ticker in tickers:
+        if isinstance(dados.columns, pd.MultiIndex):
+            if ticker not in dados.columns.get_level_values(0):
+                continue
+            df = dados[ticker]
+        else:
+            df = dados
+        cotacoes[ticker] = df.dropna(how="all")
+    return cotacoes
+
+
+def buscar_sintetico(tickers, inicio, fim):
+    """Gera cotações determinísticas (passeio aleatório log-normal em dias úteis) sem acesso à rede.
+
+    O preço de cada dia depende só do ativo e da data, de modo que buscas incrementais
+    de trechos diferentes são consistentes entre si.
+    """
+    cotacoes = {}
+    base = pd.bdate_range("2000-01-03", fim)
+    datas = base[base >= pd.Timestamp(inicio)]
+    for ticker in tickers:
+        semente = zlib.crc32(str(ticker).encode())
+        retornos = np.random.default_rng(semente).normal(0.0003, 0.02, base.size)
+        fechamento = pd.Series(50 * np.exp(np.cumsum(retornos)), index=base).reindex(datas)
+        df = pd.DataFrame({coluna: fechamento for coluna in COLUNAS[:-1]}).dropna()
+        df["Volume"] = 1_000_000
+        df.index.name = "Date"
+        cotacoes[ticker] = df
+    return cotacoes
+
+
+BUSCADORES = {"yfinance": buscar_yfinance, "sintetico": buscar_sintetico}
+
+
+def buscador_padrao():
+    return BUSCADORES[os.environ.get("RISCOS_BUSCADOR_COTACOES", "yfinance")]
+
+
+def _trava(ticker):
+    with _trava_global:
+        return _travas.setdefault(ticker, threading.Lock())
+
+
+def _caminhos(ticker):
+    diretorio = diretorio_cache("cotacoes")
+    nome = nome_seguro(ticker)
+    return diretorio / f"{nome}.parquet", diretorio / f"{nome}.json"
+
+
+def _ler_armazenado(ticker):
+    """Cotações e metadados gravados do ativo (lidos da memória se o arquivo não mudou)."""
+    arquivo, arquivo_meta = _caminhos(ticker)
+    if not arquivo.exists():
+        return None, None
+    modificado = arquivo.stat().st_mtime_ns
+    em_memoria = _memoria.get(ticker)
+    if em_memoria is None or em_memoria[0] != modificado:
+        em_memoria = (modificado, ler_parquet(arquivo), ler_json(arquivo_meta))
+        _memoria[ticker] = em_memoria
+    return em_memoria[1], em_memoria[2]
+
+
+def _normalizar(df):
+    df = df.copy()
+    df.index = pd.to_datetime(df.index).tz_localize(None).normalize()
+    df.index.name = "Date"
+    return df[[coluna for coluna in COLUNAS if coluna in df.columns]].astype(float)
+
+
+def obter_cotacoes_lote(tickers, inicio, fim=None, ttl=TTL_PADRAO, buscador=None):
+    """Retorna {ticker: DataFrame de cotações diárias entre `inicio` e `fim`}.
+
+    Os trechos faltantes de todos os ativos são agrupados e buscados na fonte com uma
+    única chamada por intervalo; o restante vem do cache local.
+    """
+    buscador = buscador or buscador_padrao()
+    fim = fim or date.today()
+    inicio, fim = pd.Timestamp(inicio).date(), pd.Timestamp(fim).date()
+    agora = datetime.now()
+    tickers = list(dict.fromkeys(tickers))
+
+    travas = [_trava(ticker) for ticker in sorted(tickers)]
+    for trava in travas:
+        trava.acquire()
+    try:
+        armazenados = {ticker: _ler_armazenado(ticker) for ticker in tickers}
+
+        # Agrupa os ativos por trecho faltante para buscá-los juntos
+        pendentes = {}
+        for ticker, (_, meta) in armazenados.items():
+            for trecho in trechos_faltantes(meta, inicio, fim, agora, ttl):
+                pendentes.setdefault(trecho, []).append(ticker)
+
+        novos = {}
+        for (trecho_inicio, trecho_fim), grupo in pendentes.items():
+            for ticker, df in buscador(grupo, trecho_inicio, trecho_fim).items():
+                if not df.empty:
+                    novos.setdefault(ticker, []).append(_normalizar(df))
+
+        for ticker in {ticker for grupo in pendentes.values() for ticker in grupo}:
+            df, meta = armazenados[ticker]
+            partes = ([] if df is None else [df]) + novos.get(ticker, [])
+            if not partes:
+                # Ativo inexistente na fonte: nada a gravar, a próxima consulta tenta de novo
+                continue
+            df = pd.concat(partes)
+            df = df[~df.index.duplicated(keep="last")].sort_index()
+            meta = {
+                "inicio": min(inicio, date.fromisoformat(meta["inicio"])).isoformat() if meta else inicio.isoformat(),
+                "fim": max(fim, date.fromisoformat(meta["fim"])).isoformat() if meta else fim.isoformat(),
+                "atualizado_em": agora.isoformat(),
+            }
+            arquivo, arquivo_meta = _caminhos(ticker)
+            salvar_json(meta, arquivo_meta)
+            salvar_parquet(df, arquivo)
+            _memoria[ticker] = (arquivo.stat().st_mtime_ns, df, meta)
+            armazenados[ticker] = (df, meta)
+    finally:
+        for trava in travas:
+            trava.release()
+
+    inicio_ts, fim_ts = pd.Timestamp(inicio), pd.Timestamp(fim)
+    return {ticker: df.loc[inicio_ts:fim_ts].copy() for ticker, (df, _) in armazenados.items() if df is not None}
+
+
+def obter_cotacoes(ticker, inicio, fim=None, ttl=TTL_PADRAO, buscador=None):
+    """Cotações diárias de um ativo entre `inicio` e `fim` (DataFrame vazio se não houver dados)."""
+    cotacoes = obter_cotacoes_lote([ticker], inicio, fim, ttl, buscador)
+    return cotacoes.get(ticker, pd.DataFrame(columns=COLUNAS, dtype=float))
@@ -0,0 +1,76 @@
+"""Curvas de juros (DI e cupom cambial) e curvas forward de câmbio.
+
+A curva DI segue a convenção exponencial em dias úteis ((1 + taxa)^(du/252)) e o
+cupom cambial a convenção linear em dias corridos (1 + taxa × dc/360). Entre os
+vértices, a interpolação é flat-forward (log do fator linear no prazo), o que dá um
+fator para cada dia útil sem saltos na taxa a termo. O forward é
+spot × fator DI / fator cupom, com os dias úteis do calendário ANBIMA.
+"""
+import numpy as np
+import pandas as pd
+
+from riscos.calendario import dias_corridos, dias_uteis
+
+
+def fator_di(taxa, du):
+    """Fator de capitalização DI: (1 + taxa)^(du/252)."""
+    return (1 + np.asarray(taxa, dtype=float)) ** (np.asarray(du, dtype=float) / 252)
+
+
+def fator_cupom(taxa, dc):
+    """Fator do cupom cambial (linear 360): 1 + taxa × dc/360."""
+    return 1 + np.asarray(taxa, dtype=float) * np.asarray(dc, dtype=float) / 360
+
+
+def interpolar_flat_forward(prazos, fatores, prazo):
+    """Fator no `prazo` interpolando o log dos fatores dos vértices linearmente.
+
+    A origem (prazo 0, fator 1) entra como vértice; após o último vértice a taxa a
+    termo do último trecho é mantida. Exige ao menos dois vértices, com prazos
+    positivos e crescentes; do contrário, ValueError.
+    """
+    prazos = np.asarray(prazos, dtype=float)
+    if len(prazos) < 2:
+        raise ValueError(f"A curva precisa de pelo menos dois vértices; recebeu {len(prazos)}.")
+    if prazos[0] <= 0 or np.any(np.diff(prazos) <= 0):
+        raise ValueError("Os prazos dos vértices da curva devem ser positivos, distintos e em ordem crescente.")
+    prazos = np.concatenate([[0.0], prazos])
+    logs = np.concatenate([[0.0], np.log(np.asarray(fatores, dtype=float))])
+    prazo = np.asarray(prazo, dtype=float)
+    resultado = np.interp(prazo, prazos, logs)
+    # Extrapolação flat-forward além do último vértice
+    inclinacao = (logs[-1] - logs[-2]) / (prazos[-1] - prazos[-2])
+    resultado = np.where(prazo > prazos[-1], logs[-1] + inclinacao * (prazo - prazos[-1]), resultado)
+    return np.exp(resultado)
+
+
+def fatores_curva_di(prazos_du, taxas, du):
+    """Fator DI interpolado em `du` dias úteis a partir dos vértices (du, taxa a.a.)."""
+    return interpolar_flat_forward(prazos_du, fator_di(taxas, prazos_du), du)
+
+
+def fatores_curva_cupom(prazos_dc, taxas, dc):
+    """Fator de cupom cambial interpolado em `dc` dias corridos a partir dos vértices (dc, taxa a.a.)."""
+    return interpolar_flat_forward(prazos_dc, fator_cupom(taxas, prazos_dc), dc)
+
+
+def curva_forward(spot, curva_di, curva_cupom, data_base, vencimentos):
+    """Forward de câmbio e pontos forward em cada vencimento.
+
+    `curva_di` é um par (prazos em du, taxas) e `curva_cupom` um par (prazos em dc,
+    taxas), com taxas em fração ao ano.
+    """
+    du = dias_uteis(data_base, vencimentos)
+    dc = dias_corridos(data_base, vencimentos)
+    fatores_di = fatores_curva_di(*curva_di, du)
+    fatores_cupom = fatores_curva_cupom(*curva_cupom, dc)
+    forward = spot * fatores_di / fatores_cupom
+    return pd.DataFrame({
+        "Vencimento": pd.to_datetime(np.atleast_1d(vencimentos)).date,
+        "Dias Úteis": du,
+        "Dias Corridos": dc,
+        "Fator DI": fatores_di,
+        "Fator Cupom": fatores_cupom,
+        "Forward": forward,
+        "Pontos Forward": forward - spot,
+    })
@@ -0,0 +1,220 @@
+"""Cadastro persistente de exposições cambiais em SQLite, com totais mantidos incrementalmente.
+
+Cada exposição (moeda, montante, prazo em dias) é uma linha da tabela `exposicoes`,
+indexada por carteira + moeda e carteira + prazo. Os totais por moeda, por faixa de
+prazo e por moeda × faixa ficam em tabelas próprias: cada inclusão ou remoção agrupa
+as linhas alteradas e soma (ou subtrai) os totais dos grupos, na mesma transação.
+Incluir ou excluir k linhas custa O(k), e ler os totais custa O(número de
+moedas/faixas), qualquer que seja o tamanho da carteira. Um contador de versão por carteira indica quando os
+dados mudaram.
+
+O banco fica no cache local (`RISCOS_CACHE_DIR/exposicao/exposicoes.sqlite`); cada
+função abre e fecha a própria conexão, o que é seguro entre sessões do Streamlit.
+"""
+import sqlite3
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from riscos.armazenamento import diretorio_cache
+
+MOEDAS = ["USD", "EUR", "GBP", "JPY", "BRL", "CNY", "ARS"]
+
+COLUNAS_OBRIGATORIAS = ["Moeda", "Montante", "Prazo"]
+
+# Limites superiores (em dias, inclusive) das faixas de prazo; a última faixa é aberta
+LIMITES_FAIXAS = [30, 90, 180, 360, 720]
+FAIXAS_PRAZO = ["Até 30 dias", "31 a 90 dias", "91 a 180 dias", "181 a 360 dias", "361 a 720 dias",
+                "Acima de 720 dias"]
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS exposicoes (
+    id INTEGER PRIMARY KEY,
+    carteira TEXT NOT NULL,
+    moeda TEXT NOT NULL,
+    montante REAL NOT NULL,
+    prazo INTEGER NOT NULL,
+    faixa INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS exposicoes_moeda ON exposicoes (carteira, moeda);
+CREATE INDEX IF NOT EXISTS exposicoes_prazo ON exposicoes (carteira, prazo);
+
+CREATE TABLE IF NOT EXISTS totais_moeda (
+    carteira TEXT NOT NULL, moeda TEXT NOT NULL, montante REAL NOT NULL, quantidade INTEGER NOT NULL,
+    PRIMARY KEY (carteira, moeda)
+);
+CREATE TABLE IF NOT EXISTS totais_faixa (
+    carteira TEXT NOT NULL, faixa INTEGER NOT NULL, montante REAL NOT NULL, quantidade INTEGER NOT NULL,
+    PRIMARY KEY (carteira, faixa)
+);
+CREATE TABLE IF NOT EXISTS totais_moeda_faixa (
+    carteira TEXT NOT NULL, moeda TEXT NOT NULL, faixa INTEGER NOT NULL, montante REAL NOT NULL,
+    quantidade INTEGER NOT NULL,
+    PRIMARY KEY (carteira, moeda, faixa)
+);
+CREATE TABLE IF NOT EXISTS versoes (carteira TEXT PRIMARY KEY, versao INTEGER NOT NULL);
+"""
+
+
+def caminho_padrao():
+    return diretorio_cache("exposicao") / "exposicoes.sqlite"
+
+
+# Versão do esquema gravada em PRAGMA user_version
+VERSAO_ESQUEMA = 1
+
+
+def conectar(caminho=None):
+    """Conexão com o banco de exposições (o esquema é criado ou atualizado na primeira vez)."""
+    conexao = sqlite3.connect(caminho or caminho_padrao(), timeout=30)
+    conexao.execute("PRAGMA journal_mode=WAL")
+    conexao.executescript(_ESQUEMA)
+    if conexao.execute("PRAGMA user_version").fetchone()[0] < VERSAO_ESQUEMA:
+        with conexao:
+            # Bancos anteriores aos totais por moeda × faixa: calcula-os uma vez a partir das exposições
+            conexao.execute("DELETE FROM totais_moeda_faixa")
+            conexao.execute("INSERT INTO totais_moeda_faixa SELECT carteira, moeda, faixa, SUM(montante), COUNT(*) "
+                            "FROM exposicoes GROUP BY carteira, moeda, faixa")
+            conexao.execute(f"PRAGMA user_version = {VERSAO_ESQUEMA}")
+    return conexao
+
+
+def faixa_prazo(prazos):
+    """Índice da faixa de prazo (posição em `FAIXAS_PRAZO`) de cada prazo em dias."""
+    return np.searchsorted(LIMITES_FAIXAS, np.asarray(prazos), side="left")
+
+
+def validar(df):
+    """Padroniza as colunas Moeda, Montante e Prazo e rejeita linhas inválidas com ValueError."""
+    df = df.copy()
+    df.columns = df.columns.astype(str).str.strip()
+    faltantes = [coluna for coluna in COLUNAS_OBRIGATORIAS if coluna not in df.columns]
+    if faltantes:
+        raise ValueError(f"Colunas ausentes: {', '.join(faltantes)}.")
+    df = df[COLUNAS_OBRIGATORIAS]
+    df["Moeda"] = df["Moeda"].astype(str).str.strip().str.upper()
+    df["Montante"] = pd.to_numeric(df["Montante"], errors="coerce")
+    df["Prazo"] = pd.to_numeric(df["Prazo"], errors="coerce")
+    invalidas = df["Montante"].isna() | df["Prazo"].isna() | (df["Montante"] <= 0) | (df["Prazo"] < 1)
+    if invalidas.any():
+        linhas = ", ".join(str(linha + 2) for linha in np.flatnonzero(invalidas.to_numpy())[:10])
+        raise ValueError(f"Montante deve ser positivo e prazo de ao menos 1 dia (linhas {linhas}).")
+    df["Prazo"] = df["Prazo"].astype(np.int64)
+    return df
+
+
+def ler_arquivo(arquivo, nome=None):
+    """Lê exposições de um CSV ou XLSX com as colunas Moeda, Montante e Prazo."""
+    nome = (nome or getattr(arquivo, "name", "") or "").lower()
+    df = pd.read_excel(arquivo) if nome.endswith((".xlsx", ".xls")) else pd.read_csv(arquivo)
+    return validar(df)
+
+
+def _atualizar_totais(conexao, carteira, moedas, faixas, montantes, sinal):
+    """Soma (sinal +1) ou subtrai (sinal -1) dos totais os montantes das linhas alteradas, agrupados."""
+    alteradas = pd.DataFrame({"moeda": moedas, "faixa": faixas, "montante": montantes})
+    for tabela, grupo in (("totais_moeda", ["moeda"]), ("totais_faixa", ["faixa"]),
+                          ("totais_moeda_faixa", ["moeda", "faixa"])):
+        deltas = alteradas.groupby(grupo)["montante"].agg(["sum", "size"]).reset_index()
+        colunas = ", ".join(grupo)
+        conexao.executemany(
+            f"INSERT INTO {tabela} VALUES (?, {', '.join('?' * len(grupo))}, ?, ?) ON CONFLICT (carteira, {colunas}) "
+            f"DO UPDATE SET montante = montante + excluded.montante, quantidade = quantidade + excluded.quantidade",
+            [(carteira, *chaves, sinal * soma, sinal * tamanho)
+             for *chaves, soma, tamanho in deltas.itertuples(index=False, name=None)])
+        conexao.execute(f"DELETE FROM {tabela} WHERE carteira = ? AND quantidade <= 0", (carteira,))
+    _nova_versao(conexao, carteira)
+
+
+def _nova_versao(conexao, carteira):
+    conexao.execute("INSERT INTO versoes VALUES (?, 1) ON CONFLICT (carteira) DO UPDATE SET versao = versao + 1",
+                    (carteira,))
+
+
+def adicionar(df, carteira, caminho=None):
+    """Inclui as exposições de `df` (Moeda, Montante, Prazo) numa única transação; retorna a quantidade."""
+    df = validar(df)
+    faixas = faixa_prazo(df["Prazo"].to_numpy())
+    registros = zip([carteira] * len(df), df["Moeda"].tolist(), df["Montante"].astype(float).tolist(),
+                    df["Prazo"].tolist(), faixas.tolist())
+    with closing(conectar(caminho)) as conexao, conexao:
+        conexao.executemany(
+            "INSERT INTO exposicoes (carteira, moeda, montante, prazo, faixa) VALUES (?, ?, ?, ?, ?)", registros)
+        _atualizar_totais(conexao, carteira, df["Moeda"].to_numpy(), faixas, df["Montante"].to_numpy(dtype=float), 1)
+    return len(df)
+
+
+def remover(ids, carteira, caminho=None):
+    """Remove as exposições com os `ids` informados; retorna quantas foram removidas."""
+    with closing(conectar(caminho)) as conexao, conexao:
+        # RETURNING devolve moeda, faixa e montante das linhas apagadas, para descontá-los dos totais
+        removidas = []
+        for id_ in ids:
+            removidas += conexao.execute(
+                "DELETE FROM exposicoes WHERE carteira = ? AND id = ? RETURNING moeda, faixa, montante",
+                (carteira, int(id_))).fetchall()
+        if removidas:
+            moedas, faixas, montantes = zip(*removidas)
+            _atualizar_totais(conexao, carteira, moedas, faixas, montantes, -1)
+        return len(removidas)
+
+
+def limpar(carteira, caminho=None):
+    """Remove todas as exposições da carteira."""
+    with closing(conectar(caminho)) as conexao, conexao:
+        for tabela in ("exposicoes", "totais_moeda", "totais_faixa", "totais_moeda_faixa"):
+            conexao.execute(f"DELETE FROM {tabela} WHERE carteira = ?", (carteira,))
+        _nova_versao(conexao, carteira)
+
+
+def versao(carteira, caminho=None):
+    """Contador que muda a cada inclusão ou remoção na carteira (0 se ela nunca teve dados)."""
+    with closing(conectar(caminho)) as conexao:
+        linha = conexao.execute("SELECT versao FROM versoes WHERE carteira = ?", (carteira,)).fetchone()
+    return 0 if linha is None else linha[0]
+
+
+def ler_exposicoes(carteira, moeda=None, limite=None, caminho=None):
+    """Exposições da carteira (as mais recentes primeiro), opcionalmente de uma moeda e limitadas."""
+    consulta = "SELECT id AS ID, moeda AS Moeda, montante AS Montante, prazo AS Prazo FROM exposicoes WHERE carteira = ?"
+    parametros = [carteira]
+    if moeda:
+        consulta += " AND moeda = ?"
+        parametros.append(moeda)
+    consulta += " ORDER BY id DESC"
+    if limite:
+        consulta += " LIMIT ?"
+        parametros.append(int(limite))
+    with closing(conectar(caminho)) as conexao:
+        return pd.read_sql_query(consulta, conexao, params=parametros)
+
+
+def totais_por_moeda(carteira, caminho=None):
+    """Montante total e quantidade de exposições por moeda, lidos da tabela de totais."""
+    with closing(conectar(caminho)) as conexao:
+        return pd.read_sql_query(
+            "SELECT moeda AS Moeda, montante AS Montante, quantidade AS Quantidade FROM totais_moeda "
+            "WHERE carteira = ? ORDER BY moeda", conexao, params=[carteira])
+
+
+def totais_por_prazo(carteira, caminho=None):
+    """Montante total e quantidade de exposições por faixa de prazo, em ordem de prazo."""
+    with closing(conectar(caminho)) as conexao:
+        totais = pd.read_sql_query(
+            "SELECT faixa, montante AS Montante, quantidade AS Quantidade FROM totais_faixa "
+            "WHERE carteira = ? ORDER BY faixa", conexao, params=[carteira])
+    totais.insert(0, "Faixa de Prazo", [FAIXAS_PRAZO[faixa] for faixa in totais.pop("faixa")])
+    return totais
+
+
+def matriz_exposicao(carteira, caminho=None):
+    """Montante total de cada moeda (linhas) em cada faixa de prazo (colunas), na moeda de origem."""
+    with closing(conectar(caminho)) as conexao:
+        totais = pd.read_sql_query("SELECT moeda, faixa, montante FROM totais_moeda_faixa WHERE carteira = ?",
+                                   conexao, params=[carteira])
+    matriz = totais.pivot_table(index="moeda", columns="faixa", values="montante", aggfunc="sum", fill_value=0.0)
+    matriz = matriz.reindex(columns=range(len(FAIXAS_PRAZO)), fill_value=0.0)
+    matriz.columns = FAIXAS_PRAZO
+    matriz.index.name = "Moeda"
+    return matriz
@@ -0,0 +1,194 @@
+"""Hedge ótimo do mapa de exposição: notionais por moeda, faixa de prazo e instrumento.
+
+Cada candidato é um instrumento (NDF, swap pré × dólar, futuro) numa moeda e numa
+faixa de prazo; o notional x (em R$, negativo = venda da moeda) é a variável. O
+resultado diário da carteira com hedge é modelado como
+
+    Σ_c (E_c + Σ x_i)·r_c + Σ_cf (e_cf + Σ x_i)·ν_cf + Σ_i x_i·η_i,
+
+com r_c o retorno cambial (covariância em cache de `var_cambial`), ν_cf o risco de
+prazo da faixa (variação do diferencial de juros, proporcional ao prazo) e η_i o
+risco de base do instrumento, (1 - efetividade²)·σ_c². A variância e o seu
+gradiente saem em forma fechada, em O(candidatos + moedas²).
+
+Os dois objetivos são resolvidos por SLSQP, com os gradientes analíticos da
+variância e das restrições:
+
+- `minima_variancia`: minimiza a variância;
+- `var_limitado`: minimiza o custo de carregamento (custo anual × prazo da faixa)
+  sujeito a VaR ≤ limite.
+
+A soma dos hedges de cada faixa fica limitada à exposição da faixa (sem sobre-hedge).
+"""
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from riscos.exposicao import FAIXAS_PRAZO
+from riscos.ptax import MOEDAS_PTAX
+from riscos.var_cambial import carteira_em_reais
+
+# Prazo representativo (dias corridos) de cada faixa de `FAIXAS_PRAZO`
+PRAZOS_FAIXAS = [15, 60, 135, 270, 540, 1080]
+
+# Volatilidade diária do diferencial de juros (em taxa ao ano) que dá o risco de prazo
+VOL_DIFERENCIAL_JUROS = 0.0005
+
+INSTRUMENTOS_HEDGE = {
+    "ndf": {"nome": "NDF", "moedas": MOEDAS_PTAX, "prazo_maximo": None, "efetividade": 0.98,
+            "custo_anual": 0.0030},
+    "swap_pre_dolar": {"nome": "Swap Pré x Dólar", "moedas": ["USD"], "prazo_maximo": None, "efetividade": 0.99,
+                       "custo_anual": 0.0040},
+    "futuro": {"nome": "Futuro de câmbio (B3)", "moedas": ["USD", "EUR"], "prazo_maximo": 360, "efetividade": 0.995,
+               "custo_anual": 0.0015},
+}
+
+OBJETIVOS = {
+    "minima_variancia": "Mínima variância",
+    "var_limitado": "Menor custo com VaR limitado",
+}
+
+# Folga relativa aceita sobre o limite de VaR na verificação final (arredondamento dos notionais)
+TOLERANCIA_LIMITE_VAR = 1e-4
+
+
+def candidatos(em_reais, instrumentos=None):
+    """Um candidato por (moeda, faixa, instrumento) disponível onde a exposição não é nula."""
+    instrumentos = list(instrumentos or INSTRUMENTOS_HEDGE)
+    desconhecidos = [instrumento for instrumento in instrumentos if instrumento not in INSTRUMENTOS_HEDGE]
+    if desconhecidos:
+        raise ValueError(f"Instrumento desconhecido: {', '.join(desconhecidos)}. "
+                         f"Opções: {', '.join(INSTRUMENTOS_HEDGE)}.")
+    linhas = []
+    for i_moeda, moeda in enumerate(em_reais.index):
+        for i_faixa, exposicao in enumerate(em_reais.loc[moeda].to_numpy()):
+            if exposicao == 0:
+                continue
+            for instrumento in instrumentos:
+                dados = INSTRUMENTOS_HEDGE[instrumento]
+                prazo_maximo = dados["prazo_maximo"]
+                if moeda in dados["moedas"] and (prazo_maximo is None or PRAZOS_FAIXAS[i_faixa] <= prazo_maximo):
+                    linhas.append((i_moeda, i_faixa, instrumento, exposicao))
+    return pd.DataFrame(linhas, columns=["moeda", "faixa", "instrumento", "exposicao"]).astype(
+        {"moeda": int, "faixa": int, "exposicao": float})
+
+
+def _problema(em_reais, covariancia, tabela):
+    """Função variância (com gradiente) e vetor de custos do problema de hedge."""
+    num_moedas, num_faixas = em_reais.shape
+    exposicao_moeda = em_reais.to_numpy().sum(axis=1)
+    exposicao_celula = em_reais.to_numpy().ravel()
+    moeda = tabela["moeda"].to_numpy()
+    celula = moeda * num_faixas + tabela["faixa"].to_numpy()
+
+    prazos = np.array(PRAZOS_FAIXAS, dtype=float) / 360
+    variancia_prazo = np.tile((VOL_DIFERENCIAL_JUROS * prazos) ** 2, num_moedas)
+    efetividade = tabela["instrumento"].map(lambda nome: INSTRUMENTOS_HEDGE[nome]["efetividade"]).to_numpy()
+    variancia_base = (1 - efetividade ** 2) * np.diag(covariancia)[moeda]
+    custo_anual = tabela["instrumento"].map(lambda nome: INSTRUMENTOS_HEDGE[nome]["custo_anual"]).to_numpy()
+    custos = custo_anual * prazos[tabela["faixa"].to_numpy()]
+
+    def variancia(x):
+        liquida_moeda = exposicao_moeda + np.bincount(moeda, x, minlength=num_moedas)
+        liquida_celula = exposicao_celula + np.bincount(celula, x, minlength=num_moedas * num_faixas)
+        sigma_y = covariancia @ liquida_moeda
+        valor = liquida_moeda @ sigma_y + liquida_celula ** 2 @ variancia_prazo + x ** 2 @ variancia_base
+        gradiente = 2 * (sigma_y[moeda] + variancia_prazo[celula] * liquida_celula[celula] + variancia_base * x)
+        return valor, gradiente
+
+    return variancia, custos
+
+
+def _resolver(funcao, inicio, limites, restricoes):
+    """Roda o SLSQP e devolve a solução; `ValueError` com a mensagem do otimizador se ele não convergir."""
+    from scipy.optimize import minimize
+
+    resolucao = minimize(funcao, inicio, jac=True, method="SLSQP", bounds=limites, constraints=restricoes,
+                         options={"ftol": 1e-12, "maxiter": 500})
+    if not resolucao.success:
+        raise ValueError(f"O otimizador do hedge não convergiu: {resolucao.message} (status {resolucao.status}).")
+    return resolucao.x
+
+
+def otimizar_hedge(carteira, inicio, objetivo="minima_variancia", nivel_confianca=0.95, horizonte_tempo=1,
+                   limite_var=None, instrumentos=None, metodo="amostral", caminho=None):
+    """Notionais de hedge ótimos para a carteira de exposições.
+
+    Retorna um dicionário com a tabela de hedges (uma linha por candidato usado),
+    o VaR antes e depois do hedge, o custo de carregamento e as moedas sem PTAX.
+    `ValueError` se o otimizador não convergir ou se o hedge encontrado não respeitar
+    o limite de VaR.
+    """
+    if objetivo not in OBJETIVOS:
+        raise ValueError(f"Objetivo desconhecido: {objetivo!r}. Opções: {', '.join(OBJETIVOS)}.")
+    if objetivo == "var_limitado" and (limite_var is None or limite_var <= 0):
+        raise ValueError("Informe um limite de VaR positivo.")
+    carteira_brl = carteira_em_reais(carteira, inicio, metodo, caminho)
+    em_reais, covariancia = carteira_brl["em_reais"], carteira_brl["covariancia"]
+    tabela = candidatos(em_reais, instrumentos)
+
+    escala_var = NormalDist().inv_cdf(nivel_confianca) * np.sqrt(horizonte_tempo)
+    variancia, custos = _problema(em_reais, covariancia, tabela)
+    variancia_inicial = variancia(np.zeros(len(tabela)))[0]
+    var_inicial = escala_var * np.sqrt(variancia_inicial)
+    resultado = {"var_antes": var_inicial, "var_depois": var_inicial, "custo": 0.0,
+                 "moedas_sem_ptax": carteira_brl["moedas_sem_ptax"], "hedges": pd.DataFrame()}
+    if tabela.empty or variancia_inicial <= 0:
+        return resultado
+
+    # Variáveis em unidades da maior exposição e funções normalizadas pelos valores sem hedge
+    exposicao = tabela["exposicao"].to_numpy()
+    unidade = np.abs(exposicao).max()
+    limites = list(zip(np.minimum(-exposicao, 0) / unidade, np.maximum(-exposicao, 0) / unidade))
+    sinal = -np.sign(exposicao)
+    custo = sinal * custos * unidade / var_inicial
+
+    # Soma dos hedges de cada faixa ≤ exposição da faixa: A·u ≤ b, com uma linha por célula moeda × faixa
+    celulas, celula = np.unique(tabela[["moeda", "faixa"]].to_numpy(), axis=0, return_inverse=True)
+    matriz_celulas = np.zeros((len(celulas), len(tabela)))
+    matriz_celulas[celula.ravel(), np.arange(len(tabela))] = sinal
+    cobertura_maxima = np.abs(em_reais.to_numpy()[celulas[:, 0], celulas[:, 1]]) / unidade
+    restricoes = [{"type": "ineq", "fun": lambda u: cobertura_maxima - matriz_celulas @ u,
+                   "jac": lambda u: -matriz_celulas}]
+
+    def variancia_normalizada(u):
+        valor, gradiente = variancia(u * unidade)
+        return valor / variancia_inicial, gradiente * unidade / variancia_inicial
+
+    u = _resolver(variancia_normalizada, np.zeros(len(tabela)), limites, restricoes)
+    if objetivo == "var_limitado":
+        var_minimo = escala_var * np.sqrt(variancia(u * unidade)[0])
+        if var_minimo > limite_var:
+            raise ValueError(f"Limite de VaR inviável: o menor VaR alcançável com esses instrumentos é "
+                             f"R$ {var_minimo:,.2f}.")
+        if var_inicial <= limite_var:
+            u = np.zeros(len(tabela))
+        else:
+            # Menor custo com variância ≤ (limite / escala)², partindo do hedge de mínima variância (viável)
+            limite_variancia = (limite_var / escala_var) ** 2 / variancia_inicial
+            restricoes.append({"type": "ineq", "fun": lambda u: limite_variancia - variancia_normalizada(u)[0],
+                               "jac": lambda u: -variancia_normalizada(u)[1]})
+            u = _resolver(lambda u: (custo @ u, custo), u, limites, restricoes)
+
+    x = u * unidade
+    x[np.abs(x) < 1e-6 * unidade] = 0.0
+    usados = x != 0
+    moedas = em_reais.index.to_numpy()
+    ptax = carteira_brl["ptax"].reindex(moedas).to_numpy()
+    hedges = pd.DataFrame({
+        "Moeda": moedas[tabela["moeda"].to_numpy()],
+        "Faixa de Prazo": np.array(FAIXAS_PRAZO)[tabela["faixa"].to_numpy()],
+        "Instrumento": tabela["instrumento"].map(lambda nome: INSTRUMENTOS_HEDGE[nome]["nome"]).to_numpy(),
+        "Exposição (R$)": exposicao,
+        "Notional Hedge (R$)": x,
+        "Notional Hedge (moeda)": x / ptax[tabela["moeda"].to_numpy()],
+        "Cobertura (%)": -x / exposicao * 100,
+        "Custo (R$)": np.abs(x) * custos,
+    })[usados].reset_index(drop=True)
+    var_depois = escala_var * np.sqrt(variancia(x)[0])
+    if objetivo == "var_limitado" and var_depois > limite_var * (1 + TOLERANCIA_LIMITE_VAR):
+        raise ValueError(f"O hedge encontrado não respeita o limite de VaR: R$ {var_depois:,.2f} "
+                         f"> R$ {limite_var:,.2f}.")
+    resultado.update(var_depois=var_depois, custo=float(np.abs(x) @ custos), hedges=hedges)
+    return resultado
@@ -0,0 +1,65 @@
+"""VaR histórico vetorizado para um ou vários ativos."""
+import numpy as np
+import pandas as pd
+
+
+def retornos_logaritmicos(precos):
+    """Retornos logarítmicos diários de uma série ou de um DataFrame de preços (uma coluna por ativo)."""
+    return np.log(precos / precos.shift(1)).iloc[1:]
+
+
+def matriz_retornos(cotacoes, coluna="Close"):
+    """Alinha os retornos de vários ativos num DataFrame largo (datas × ativos).
+
+    Os retornos são calculados na série de cada ativo antes do alinhamento, de modo
+    que feriados locais de um mercado não geram retornos de dois dias nos demais;
+    datas sem negociação de um ativo ficam como NaN.
+    """
+    series = {ticker: retornos_logaritmicos(df[coluna].dropna()) for ticker, df in cotacoes.items()
+              if coluna in df and df[coluna].notna().sum() > 1}
+    return pd.DataFrame(series).sort_index()
+
+
+def var_historico(retornos, nivel_confianca):
+    """VaR e Expected Shortfall históricos de cada coluna de `retornos`.
+
+    Segue a convenção da página de VaR histórico: o VaR é o retorno na posição
+    ceil((1 - confiança) × n) da amostra ordenada (um retorno negativo) e o ES é a
+    média dos retornos até essa posição. Cada coluna usa apenas suas observações
+    válidas; em vez de ordenar cada série, um único `np.partition` sobre a matriz
+    posiciona as estatísticas de ordem necessárias.
+    """
+    valores = np.asarray(retornos, dtype=float)
+    unidimensional = valores.ndim == 1
+    if unidimensional:
+        valores = valores[:, None]
+
+    num_validos = (~np.isnan(valores)).sum(axis=0)
+    posicoes = np.maximum(np.ceil((1 - nivel_confianca) * num_validos).astype(int) - 1, 0)
+    # NaN vira +inf para ir ao fim da partição sem afetar as estatísticas de ordem inferiores
+    valores = np.where(np.isnan(valores), np.inf, valores)
+    particionado = np.partition(valores, np.unique(posicoes), axis=0)
+
+    colunas = np.arange(valores.shape[1])
+    var = particionado[posicoes, colunas]
+    na_cauda = np.arange(valores.shape[0])[:, None] <= posicoes[None, :]
+    es = np.where(na_cauda, particionado, 0.0).sum(axis=0) / (posicoes + 1)
+    sem_dados = num_validos == 0
+    var[sem_dados] = np.nan
+    es[sem_dados] = np.nan
+
+    if unidimensional:
+        return var[0], es[0]
+    return var, es
+
+
+def tabela_var_historico(retornos, nivel_confianca):
+    """Tabela (um ativo por linha) com observações, VaR, ES e volatilidade diária."""
+    var, es = var_historico(retornos, nivel_confianca)
+    return pd.DataFrame({
+        "Ativo": retornos.columns,
+        "Observações": retornos.notna().sum().to_numpy(),
+        "VaR Histórico (%)": var * 100,
+        "Expected Shortfall (%)": es * 100,
+        "Volatilidade Diária (%)": retornos.std().to_numpy() * 100,
+    })
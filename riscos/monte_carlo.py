@@ -0,0 +1,327 @@
+"""Motor de simulação Monte Carlo para VaR de carteiras com múltiplos ativos.
+
+Os cenários são gerados em lotes de tamanho fixo a partir do fator de Cholesky da
+matriz de covariância, de modo que o consumo de memória depende do tamanho do lote
+e não do número total de simulações.
+
+Cada lote recebe sua própria semente (`np.random.SeedSequence.spawn`), independente de
+qual processo o executa: com uma semente fixa, o resultado é idêntico bit a bit
+qualquer que seja o número de processos usados.
+
+No modo `streaming`, o vetor completo de resultados não é materializado: cada lote
+alimenta um `HistogramaCauda` de tamanho fixo e VaR/ES são reportados com o erro
+máximo de discretização.
+
+Para reduzir o número de cenários necessários, a amostragem pode ser feita com
+variáveis antitéticas, sequências quase-aleatórias embaralhadas (Sobol/Halton, via
+`scipy.stats.qmc`) ou amostragem por importância deslocada para a cauda de perdas.
+Cada lote é uma réplica independente, e a dispersão das estimativas entre lotes
+fornece o erro padrão do VaR e do ES.
+"""
+import multiprocessing
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from statistics import NormalDist
+
+import numpy as np
+
+from riscos.quantis import NUM_FAIXAS_PADRAO, HistogramaCauda, quantil_cauda
+
+# Cenários por lote: 50 mil cenários × 200 ativos ocupam ~80 MB em float64
+TAMANHO_LOTE_PADRAO = 50_000
+
+# Número mínimo de lotes (réplicas independentes) para estimar o erro padrão
+NUM_REPLICAS_MINIMO = 10
+
+AMOSTRAGENS = {
+    "pseudo": "Pseudoaleatória",
+    "antitetica": "Variáveis antitéticas",
+    "sobol": "Quase-aleatória (Sobol)",
+    "halton": "Quase-aleatória (Halton)",
+    "importancia": "Amostragem por importância",
+}
+
+
+def fatorar_covariancia(covariancia):
+    """Retorna L tal que L @ L.T == covariancia (Cholesky, ou espectral se semidefinida)."""
+    covariancia = np.atleast_2d(np.asarray(covariancia, dtype=float))
+    try:
+        return np.linalg.cholesky(covariancia)
+    except np.linalg.LinAlgError:
+        # Matriz apenas semidefinida positiva (ex.: ativos perfeitamente correlacionados):
+        # usa a decomposição espectral, truncando autovalores negativos de arredondamento
+        autovalores, autovetores = np.linalg.eigh(covariancia)
+        return autovetores * np.sqrt(np.clip(autovalores, 0.0, None))
+
+
+def covariancia_correlacao(volatilidades, correlacao):
+    """Covariância a partir das volatilidades e de uma matriz de correlação (ou de um valor uniforme)."""
+    volatilidades = np.asarray(volatilidades, dtype=float)
+    correlacao = np.asarray(correlacao, dtype=float)
+    if correlacao.ndim == 0:
+        correlacao = np.full((volatilidades.size, volatilidades.size), float(correlacao))
+        np.fill_diagonal(correlacao, 1.0)
+    if correlacao.shape != (volatilidades.size, volatilidades.size):
+        raise ValueError(f"A matriz de correlação deve ser {volatilidades.size} x {volatilidades.size}, "
+                         f"na ordem das posições.")
+    return correlacao * np.outer(volatilidades, volatilidades)
+
+
+def tamanhos_lotes(num_simulacoes, tamanho_lote=TAMANHO_LOTE_PADRAO):
+    """Divide o número de simulações em lotes de no máximo `tamanho_lote` cenários."""
+    num_lotes, resto = divmod(int(num_simulacoes), int(tamanho_lote))
+    return [int(tamanho_lote)] * num_lotes + ([resto] if resto else [])
+
+
+def _gerar_choques(rng, tamanho, dimensao, amostragem):
+    """Choques normais padrão (tamanho × dimensão) conforme o método de amostragem."""
+    if amostragem == "antitetica":
+        metade = rng.standard_normal(((tamanho + 1) // 2, dimensao))
+        return np.vstack([metade, -metade])[:tamanho]
+    if amostragem in ("sobol", "halton"):
+        from scipy.stats import norm, qmc
+
+        gerador = qmc.Sobol if amostragem == "sobol" else qmc.Halton
+        # Semente inteira derivada do lote: o embaralhamento fica reproduzível e independente entre lotes
+        semente_qmc = int(rng.integers(np.iinfo(np.int64).max))
+        with warnings.catch_warnings():
+            # Sobol prefere potências de 2; lotes de outros tamanhos seguem válidos
+            warnings.simplefilter("ignore", UserWarning)
+            uniformes = gerador(d=dimensao, scramble=True, rng=semente_qmc).random(tamanho)
+        return norm.ppf(np.clip(uniformes, 1e-12, 1 - 1e-12))
+    return rng.standard_normal((tamanho, dimensao))
+
+
+def gerar_retornos(semente_lote, tamanho, fator, medias, amostragem="pseudo", deslocamento=None):
+    """Gera `tamanho` cenários de retornos correlacionados (tamanho × ativos).
+
+    Retorna também os pesos de razão de verossimilhança de cada cenário quando há
+    `deslocamento` (amostragem por importância), ou None caso contrário.
+    """
+    rng = np.random.default_rng(semente_lote)
+    choques = _gerar_choques(rng, tamanho, fator.shape[1], amostragem)
+    pesos = None
+    if deslocamento is not None:
+        # Desloca a média dos choques para a cauda e compensa com φ(z) / φ(z - μ)
+        choques += deslocamento
+        pesos = np.exp(-choques @ deslocamento + 0.5 * deslocamento @ deslocamento)
+    return medias + choques @ fator.T, pesos
+
+
+def _preparar_entradas(exposicoes, covariancia, medias):
+    exposicoes = np.atleast_1d(np.asarray(exposicoes, dtype=float))
+    num_ativos = exposicoes.size
+    fator = fatorar_covariancia(covariancia)
+    if fator.shape[0] != num_ativos:
+        raise ValueError(
+            f"A matriz de covariância ({fator.shape[0]}×{fator.shape[0]}) não corresponde "
+            f"ao número de exposições ({num_ativos})."
+        )
+    if medias is None:
+        medias = np.zeros(num_ativos)
+    medias = np.broadcast_to(np.asarray(medias, dtype=float), (num_ativos,))
+    return exposicoes, fator, medias
+
+
+def _resultado_lote(contexto, tarefa):
+    """P&L da carteira em cada cenário de um lote, pesos e estimativas (VaR, ES) do lote."""
+    fator, medias, exposicoes, amostragem, deslocamento, alfa = contexto
+    semente_lote, tamanho = tarefa
+    retornos, pesos = gerar_retornos(semente_lote, tamanho, fator, medias, amostragem, deslocamento)
+    resultados = retornos @ exposicoes
+    return resultados, pesos, quantil_cauda(resultados, alfa, pesos)
+
+
+def _histograma_lote(contexto, tarefa):
+    """Histograma de cauda (sobre a grade recebida) e estimativas (VaR, ES) de um lote."""
+    semente_lote, tamanho, grade = tarefa
+    resultados, pesos, estimativas = _resultado_lote(contexto, (semente_lote, tamanho))
+    histograma = HistogramaCauda(grade[0], grade[-1], grade.size - 1)
+    return histograma.atualizar(resultados, pesos), estimativas
+
+
+def _contribuicoes_lote(contexto, tarefa):
+    """Somas (ponderadas) das contribuições por posição na cauda e na vizinhança do VaR de um lote."""
+    fator, medias, exposicoes, amostragem, deslocamento, _ = contexto
+    semente_lote, tamanho, limiar, limite_inferior, limite_superior = tarefa
+    retornos, pesos = gerar_retornos(semente_lote, tamanho, fator, medias, amostragem, deslocamento)
+    # Mesma operação da 1ª passada, para classificar cada cenário de forma idêntica
+    resultado_lote = retornos @ exposicoes
+    contribuicoes = retornos * exposicoes
+    if pesos is None:
+        pesos = np.ones(tamanho)
+    cauda = resultado_lote <= limiar
+    perto = (resultado_lote >= limite_inferior) & (resultado_lote <= limite_superior)
+    return (pesos[cauda] @ contribuicoes[cauda], pesos[cauda].sum(),
+            pesos[perto] @ contribuicoes[perto], pesos[perto].sum())
+
+
+_CONTEXTO_TRABALHADOR = None
+
+
+def _inicializar_trabalhador(contexto):
+    # Envia fator de Cholesky, médias e exposições uma única vez por processo
+    global _CONTEXTO_TRABALHADOR
+    _CONTEXTO_TRABALHADOR = contexto
+
+
+def _executar_no_trabalhador(funcao, tarefa):
+    return funcao(_CONTEXTO_TRABALHADOR, tarefa)
+
+
+def _iterar_lotes(funcao, tarefas, contexto, processos):
+    """Aplica `funcao` a cada lote, em série ou num pool de processos, preservando a ordem.
+
+    Os resultados são produzidos à medida que ficam prontos, para que o chamador possa
+    combiná-los sem acumular todos em memória.
+    """
+    if not processos or processos <= 1 or len(tarefas) <= 1:
+        for tarefa in tarefas:
+            yield funcao(contexto, tarefa)
+        return
+    # "spawn" evita herdar por fork as threads do servidor do Streamlit
+    with ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_inicializar_trabalhador, initargs=(contexto,)) as executor:
+        yield from executor.map(partial(_executar_no_trabalhador, funcao), tarefas,
+                                chunksize=max(1, len(tarefas) // (4 * processos)))
+
+
+def _erros_padrao(estimativas):
+    """Erros padrão de VaR e ES pela dispersão das estimativas entre lotes independentes."""
+    estimativas = np.asarray(estimativas)
+    if len(estimativas) < 2:
+        return np.nan, np.nan
+    return tuple(estimativas.std(axis=0, ddof=1) / np.sqrt(len(estimativas)))
+
+
+def _quantis_exatos(contexto, sementes, tamanhos, alfa, vizinhanca, processos):
+    """VaR, ES e faixa de vizinhança a partir do vetor completo de resultados."""
+    lotes = list(_iterar_lotes(_resultado_lote, list(zip(sementes, tamanhos)), contexto, processos))
+    resultados = np.concatenate([resultados_lote for resultados_lote, _, _ in lotes])
+    pesos = None if lotes[0][1] is None else np.concatenate([pesos_lote for _, pesos_lote, _ in lotes])
+    estimativas = [estimativas_lote for _, _, estimativas_lote in lotes]
+    del lotes
+
+    limiar, media_cauda = quantil_cauda(resultados, alfa, pesos)
+    faixa = vizinhanca / resultados.size
+    limites = [quantil_cauda(resultados, max(alfa - faixa, 0.0), pesos)[0],
+               quantil_cauda(resultados, min(alfa + faixa, 1.0), pesos)[0]]
+    erro_padrao_var, erro_padrao_es = _erros_padrao(estimativas)
+    return {
+        "limiar": limiar,
+        "es": -media_cauda,
+        "limites": limites,
+        "erro_var": 0.0,
+        "erro_es": 0.0,
+        "erro_padrao_var": erro_padrao_var,
+        "erro_padrao_es": erro_padrao_es,
+    }
+
+
+def _quantis_streaming(contexto, sementes, tamanhos, alfa, vizinhanca, processos, num_faixas):
+    """VaR, ES e faixa de vizinhança em memória constante, via `HistogramaCauda`."""
+    # O primeiro lote serve de amostra piloto para definir a grade do histograma
+    piloto, pesos, estimativas_piloto = _resultado_lote(contexto, (sementes[0], tamanhos[0]))
+    histograma = HistogramaCauda.a_partir_de_amostra(piloto, alfa, num_faixas, pesos).atualizar(piloto, pesos)
+    del piloto, pesos
+
+    estimativas = [estimativas_piloto]
+    tarefas = [(semente_lote, tamanho, histograma.bordas)
+               for semente_lote, tamanho in zip(sementes[1:], tamanhos[1:])]
+    for histograma_lote, estimativas_lote in _iterar_lotes(_histograma_lote, tarefas, contexto, processos):
+        histograma.combinar(histograma_lote)
+        estimativas.append(estimativas_lote)
+
+    total = histograma.num_observacoes
+    limiar, erro_var = histograma.quantil(alfa)
+    es, erro_es = histograma.media_cauda(alfa)
+    limites = [histograma.quantil(max(alfa - vizinhanca / total, 0.0))[0],
+               histograma.quantil(min(alfa + vizinhanca / total, 1.0))[0]]
+    erro_padrao_var, erro_padrao_es = _erros_padrao(estimativas)
+    return {
+        "limiar": limiar,
+        "es": -es,
+        "limites": limites,
+        "erro_var": erro_var,
+        "erro_es": erro_es,
+        "erro_padrao_var": erro_padrao_var,
+        "erro_padrao_es": erro_padrao_es,
+    }
+
+
+def var_monte_carlo(exposicoes, covariancia, nivel_confianca=0.95, num_simulacoes=100_000,
+                    medias=None, tamanho_lote=TAMANHO_LOTE_PADRAO, semente=None, componentes=True,
+                    processos=None, streaming=False, num_faixas=NUM_FAIXAS_PADRAO, amostragem="pseudo"):
+    """Calcula VaR e Expected Shortfall de uma carteira por simulação Monte Carlo.
+
+    `exposicoes` são os valores (R$) de cada posição e `covariancia` a matriz de
+    covariância dos retornos no horizonte desejado. VaR e ES são devolvidos como perdas
+    positivas. Com `componentes=True`, os lotes são regerados a partir das mesmas
+    sementes para decompor VaR e ES por posição (alocação de Euler), sem guardar a
+    matriz completa de cenários. Com `processos` > 1, os lotes são distribuídos entre
+    processos e os resultados parciais são combinados na ordem dos lotes. Com
+    `streaming=True`, a memória usada não depende de `num_simulacoes` e `erro_var` /
+    `erro_es` informam o erro máximo de discretização (em R$). `amostragem` escolhe o
+    método de redução de variância (chaves de `AMOSTRAGENS`); `erro_padrao_var` e
+    `erro_padrao_es` trazem o erro padrão de simulação das estimativas.
+    """
+    if amostragem not in AMOSTRAGENS:
+        raise ValueError(f"Amostragem desconhecida: {amostragem!r}. Opções: {', '.join(AMOSTRAGENS)}.")
+    exposicoes, fator, medias = _preparar_entradas(exposicoes, covariancia, medias)
+    alfa = 1 - nivel_confianca
+    deslocamento = None
+    if amostragem == "importancia":
+        # Desloca os choques na direção de maior perda até o quantil da confiança desejada
+        sensibilidade = fator.T @ exposicoes
+        norma = np.linalg.norm(sensibilidade)
+        if norma > 0:
+            deslocamento = -NormalDist().inv_cdf(nivel_confianca) * sensibilidade / norma
+    contexto = (fator, medias, exposicoes, amostragem, deslocamento, alfa)
+
+    # Lotes menores quando necessário para haver réplicas suficientes para o erro padrão
+    tamanho_lote = max(1, min(int(tamanho_lote), -(-int(num_simulacoes) // NUM_REPLICAS_MINIMO)))
+    tamanhos = tamanhos_lotes(num_simulacoes, tamanho_lote)
+    sementes = np.random.SeedSequence(semente).spawn(len(tamanhos))
+    # Cenários vizinhos ao quantil (±√N estatísticas de ordem) estimam E[posição | P&L = VaR]
+    vizinhanca = max(1, int(np.sqrt(sum(tamanhos))))
+
+    # 1ª passada: distribuição do resultado (P&L) da carteira
+    if streaming:
+        quantis = _quantis_streaming(contexto, sementes, tamanhos, alfa, vizinhanca, processos, num_faixas)
+    else:
+        quantis = _quantis_exatos(contexto, sementes, tamanhos, alfa, vizinhanca, processos)
+    limiar = quantis["limiar"]
+    resultado = {
+        "var": -limiar,
+        "es": quantis["es"],
+        "erro_var": quantis["erro_var"],
+        "erro_es": quantis["erro_es"],
+        "erro_padrao_var": quantis["erro_padrao_var"],
+        "erro_padrao_es": quantis["erro_padrao_es"],
+        "num_simulacoes": sum(tamanhos),
+    }
+    if not componentes:
+        return resultado
+
+    # 2ª passada: regera os mesmos lotes e acumula as contribuições por posição
+    limite_inferior, limite_superior = quantis["limites"]
+    tarefas = [(semente_lote, tamanho, limiar, limite_inferior, limite_superior)
+               for semente_lote, tamanho in zip(sementes, tamanhos)]
+    soma_cauda = np.zeros(exposicoes.size)
+    soma_vizinhanca = np.zeros(exposicoes.size)
+    peso_cauda = peso_vizinhanca = 0.0
+    for cauda_lote, peso_cauda_lote, vizinhanca_lote, peso_vizinhanca_lote in _iterar_lotes(
+            _contribuicoes_lote, tarefas, contexto, processos):
+        soma_cauda += cauda_lote
+        peso_cauda += peso_cauda_lote
+        soma_vizinhanca += vizinhanca_lote
+        peso_vizinhanca += peso_vizinhanca_lote
+
+    var_componentes = -soma_vizinhanca / peso_vizinhanca if peso_vizinhanca else np.zeros(exposicoes.size)
+    # Reescala para que as componentes somem exatamente o VaR da carteira
+    if var_componentes.sum() != 0:
+        var_componentes *= resultado["var"] / var_componentes.sum()
+    resultado["var_componentes"] = var_componentes
+    resultado["es_componentes"] = -soma_cauda / peso_cauda if peso_cauda else np.zeros(exposicoes.size)
+    return resultado
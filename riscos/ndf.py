@@ -0,0 +1,149 @@
+"""Ajuste, liquidação e marcação a mercado de NDFs, de uma operação ou de um blotter inteiro.
+
+As fórmulas operam sobre arrays, de modo que milhares de operações são liquidadas
+numa única passada vetorizada. O ajuste segue a convenção da página de NDF:
+(cotação de fechamento - cotação fechada) × notional. Antes do vencimento, a
+cotação de fechamento é substituída pelo forward da curva e o ajuste é trazido a
+valor presente pela curva DI.
+"""
+import numpy as np
+import pandas as pd
+
+from riscos.calendario import dias_corridos, dias_uteis
+from riscos.curvas import fatores_curva_cupom, fatores_curva_di
+
+POSICOES = ["Importador", "Exportador"]
+
+COLUNAS_OBRIGATORIAS = ["Posição", "Moeda", "Cotação Fechada", "Notional", "Cotação de Fechamento"]
+
+COLUNAS_MARCACAO = ["Posição", "Moeda", "Cotação Fechada", "Notional", "Vencimento"]
+
+COLUNAS_AGRUPAMENTO = ["Moeda", "Posição", "Vencimento"]
+
+COLUNAS_VALORES = ["Notional", "Ajuste", "Ajuste para a Empresa", "Pagamento", "Valor Líquido"]
+
+
+def calcular_ajuste(cotacao_fechada, notional, cotacao_fechamento):
+    """Ajuste, pagamento e valor líquido (escalares ou arrays)."""
+    ajuste = (cotacao_fechamento - cotacao_fechada) * notional
+    pagamento = cotacao_fechamento * notional
+    return ajuste, pagamento, pagamento - ajuste
+
+
+def converter_datas(valores):
+    """Converte datas em ISO (AAAA-MM-DD) ou no formato brasileiro (DD/MM/AAAA)."""
+    try:
+        return pd.to_datetime(valores, format="ISO8601")
+    except ValueError:
+        return pd.to_datetime(valores, dayfirst=True)
+
+
+def ler_blotter(arquivo, nome=None, colunas=COLUNAS_OBRIGATORIAS):
+    """Lê um blotter de NDFs em CSV ou XLSX e valida as colunas e posições."""
+    nome = (nome or getattr(arquivo, "name", "") or "").lower()
+    df = pd.read_excel(arquivo) if nome.endswith((".xlsx", ".xls")) else pd.read_csv(arquivo)
+    df.columns = df.columns.astype(str).str.strip()
+
+    faltantes = [coluna for coluna in colunas if coluna not in df.columns]
+    if faltantes:
+        raise ValueError(f"Colunas ausentes no blotter: {', '.join(faltantes)}.")
+    df["Posição"] = df["Posição"].astype(str).str.strip().str.capitalize()
+    invalidas = sorted(set(df["Posição"]) - set(POSICOES))
+    if invalidas:
+        raise ValueError(f"Posições inválidas: {', '.join(invalidas)} (use {' ou '.join(POSICOES)}).")
+    df["Moeda"] = df["Moeda"].astype(str).str.strip().str.upper()
+    if "Vencimento" in df.columns:
+        df["Vencimento"] = converter_datas(df["Vencimento"]).dt.date
+    return df
+
+
+def _sinal(df):
+    """+1 para importador (comprado na moeda estrangeira) e -1 para exportador."""
+    return np.where(df["Posição"].to_numpy() == "Importador", 1.0, -1.0)
+
+
+def calcular_blotter(df):
+    """Acrescenta ao blotter as colunas de ajuste, pagamento e valor líquido de cada operação.
+
+    "Ajuste para a Empresa" tem sinal do ponto de vista da empresa: positivo quando
+    ela recebe o ajuste (importador com fechamento acima da cotação fechada ou
+    exportador com fechamento abaixo) e negativo quando paga.
+    """
+    df = df.copy()
+    ajuste, pagamento, valor_liquido = calcular_ajuste(
+        df["Cotação Fechada"].to_numpy(dtype=float),
+        df["Notional"].to_numpy(dtype=float),
+        df["Cotação de Fechamento"].to_numpy(dtype=float),
+    )
+    sinal = _sinal(df)
+    df["Ajuste"] = ajuste
+    df["Ajuste para a Empresa"] = sinal * ajuste
+    df["Pagamento"] = pagamento
+    df["Valor Líquido"] = valor_liquido
+    return df
+
+
+def agregar_blotter(df):
+    """Totais por moeda, posição e vencimento (quando houver a coluna) do blotter calculado."""
+    grupos = [coluna for coluna in COLUNAS_AGRUPAMENTO if coluna in df.columns]
+    agregado = df.groupby(grupos, sort=True)[COLUNAS_VALORES].sum()
+    agregado.insert(0, "Operações", df.groupby(grupos, sort=True).size())
+    return agregado.reset_index()
+
+
+def marcar_a_mercado(df, data_base, spots, curva_di, curvas_cupom):
+    """Marcação a mercado das NDFs em aberto na data-base.
+
+    `spots` e `curvas_cupom` são dicionários por moeda; as curvas são pares (prazos,
+    taxas) como em `riscos.curvas`. O valor presente para a empresa é
+    sinal × notional × (forward - cotação fechada) / fator DI, que se simplifica em
+    sinal × notional × (spot / fator cupom - cotação fechada / fator DI). As colunas
+    auxiliares ficam no resultado para a grade de cenários.
+    """
+    df = df.copy()
+    df["Vencimento"] = pd.to_datetime(df["Vencimento"]).dt.date
+    df = df[df["Vencimento"] > pd.Timestamp(data_base).date()].reset_index(drop=True)
+    sem_curva = sorted(set(df["Moeda"]) - (set(spots) & set(curvas_cupom)))
+    if sem_curva:
+        raise ValueError(f"Sem spot ou curva de cupom para: {', '.join(sem_curva)}.")
+
+    du = dias_uteis(data_base, df["Vencimento"])
+    dc = dias_corridos(data_base, df["Vencimento"])
+    moedas = df["Moeda"].to_numpy()
+    spot = np.zeros(len(df))
+    fator_cupom = np.ones(len(df))
+    for moeda in np.unique(moedas):
+        linhas = moedas == moeda
+        spot[linhas] = spots[moeda]
+        fator_cupom[linhas] = fatores_curva_cupom(*curvas_cupom[moeda], dc[linhas])
+    fator_di = fatores_curva_di(*curva_di, du)
+
+    df["Dias Úteis"] = du
+    df["Dias Corridos"] = dc
+    df["Spot"] = spot
+    df["Taxa DI"] = np.where(du > 0, fator_di ** (252 / np.maximum(du, 1)) - 1, 0.0)
+    df["Fator DI"] = fator_di
+    df["Fator Cupom"] = fator_cupom
+    df["Forward"] = spot * fator_di / fator_cupom
+    df["MtM (R$)"] = _sinal(df) * df["Notional"].to_numpy(dtype=float) * (
+        spot / fator_cupom - df["Cotação Fechada"].to_numpy(dtype=float) / fator_di)
+    return df
+
+
+def grade_cenarios(marcado, choques_spot, choques_di):
+    """MtM total da carteira para cada par (choque relativo no spot, choque paralelo no DI).
+
+    Como o MtM é separável em uma parte linear no spot e outra que depende só do DI,
+    a grade inteira sai de um produto externo e de uma matriz (choques DI × operações):
+    com 50 × 50 cenários e 100 mil NDFs, são 5 milhões de potências, não 250 milhões.
+    Retorna um DataFrame com os choques de spot nas linhas e os de DI nas colunas.
+    """
+    choques_spot = np.asarray(choques_spot, dtype=float)
+    choques_di = np.asarray(choques_di, dtype=float)
+    quantidade = _sinal(marcado) * marcado["Notional"].to_numpy(dtype=float)
+    parte_spot = np.sum(quantidade * marcado["Spot"].to_numpy() / marcado["Fator Cupom"].to_numpy())
+    taxas = marcado["Taxa DI"].to_numpy()[None, :] + choques_di[:, None]
+    descontos = (1 + taxas) ** (-marcado["Dias Úteis"].to_numpy()[None, :] / 252)
+    parte_di = descontos @ (quantidade * marcado["Cotação Fechada"].to_numpy(dtype=float))
+    grade = (1 + choques_spot)[:, None] * parte_spot - parte_di[None, :]
+    return pd.DataFrame(grade, index=choques_spot, columns=choques_di)
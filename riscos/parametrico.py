@@ -0,0 +1,227 @@
+"""VaR paramétrico (delta-normal) de um ativo ou de uma carteira.
+
+Para carteiras, a covariância dos retornos é estimada a partir do histórico em cache
+(amostral, EWMA RiskMetrics ou Ledoit-Wolf) por um `EstimadorCovariancia` sobre uma
+janela móvel: a cada dia, os dias novos entram e os mais antigos saem, sem refazer a
+estimativa. VaR total, marginal, componente e incremental saem de um único produto
+matriz-vetor Σw por requisição.
+"""
+import threading
+from datetime import date
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from riscos.cotacoes import obter_cotacoes_lote
+from riscos.historico import matriz_retornos
+
+LAMBDA_RISKMETRICS = 0.94
+
+# Estimadores mantidos em memória (os mais antigos são descartados primeiro)
+MAX_ESTIMADORES = 32
+
+ESTIMADORES = {
+    "amostral": "Amostral",
+    "ewma": "EWMA RiskMetrics (λ = 0,94)",
+    "ledoit_wolf": "Ledoit-Wolf (shrinkage)",
+}
+
+_estimadores = {}
+_trava = threading.Lock()
+
+
+def var_parametrico(valor_portfolio, volatilidade_diaria, nivel_confianca, horizonte_tempo=1):
+    """VaR paramétrico de uma posição: valor × volatilidade no horizonte × z-score."""
+    volatilidade_horizonte = volatilidade_diaria * np.sqrt(horizonte_tempo)
+    return valor_portfolio * volatilidade_horizonte * NormalDist().inv_cdf(nivel_confianca)
+
+
+class EstimadorCovariancia:
+    """Covariância dos retornos de uma janela móvel, mantida incrementalmente.
+
+    Guarda somas suficientes (número de dias, soma dos retornos, soma dos produtos
+    externos e dos quadrados das normas), a matriz EWMA e os retornos da janela;
+    `atualizar` e `remover` custam O(dias novos ou removidos × ativos²),
+    independentemente do tamanho da janela. Depois que a janela inteira foi renovada
+    por remoções, as somas são recalculadas do zero, para não acumular erro de
+    arredondamento.
+    """
+
+    def __init__(self, num_ativos, lambda_=LAMBDA_RISKMETRICS):
+        self.lambda_ = lambda_
+        self.num_dias = 0
+        self.soma = np.zeros(num_ativos)
+        self.soma_produtos = np.zeros((num_ativos, num_ativos))
+        self.soma_normas_quarta = 0.0
+        self.ewma = None
+        self.valores = np.zeros((0, num_ativos))
+        self.datas = pd.DatetimeIndex([])
+        self.ultima_data = None
+        self.removidos = 0
+
+    def atualizar(self, retornos):
+        """Incorpora novos dias (DataFrame datas × ativos, sem NaN, em ordem cronológica)."""
+        valores = np.asarray(retornos, dtype=float)
+        if not len(valores):
+            return self
+        self.num_dias += len(valores)
+        self.soma += valores.sum(axis=0)
+        self.soma_produtos += valores.T @ valores
+        self.soma_normas_quarta += np.sum(np.sum(valores ** 2, axis=1) ** 2)
+
+        # EWMA: Σₜ = λ·Σₜ₋₁ + (1 - λ)·rₜrₜ', combinando os dias novos numa soma ponderada
+        inicio = 0
+        if self.ewma is None:
+            self.ewma = np.outer(valores[0], valores[0])
+            inicio = 1
+        novos = valores[inicio:]
+        if len(novos):
+            pesos = (1 - self.lambda_) * self.lambda_ ** np.arange(len(novos) - 1, -1, -1)
+            self.ewma = self.lambda_ ** len(novos) * self.ewma + (novos * pesos[:, None]).T @ novos
+        self.valores = np.vstack([self.valores, valores])
+        if hasattr(retornos, "index"):
+            self.datas = self.datas.append(pd.DatetimeIndex(retornos.index))
+            self.ultima_data = retornos.index[-1]
+        return self
+
+    def remover(self, quantidade):
+        """Descarta os `quantidade` dias mais antigos da janela.
+
+        Com n dias, o EWMA pesa o primeiro por λⁿ⁻¹ e o dia t ≥ 1 por (1 - λ)·λⁿ⁻¹⁻ᵗ.
+        Sem os k primeiros, o dia k passa a ser o inicial, com peso λⁿ⁻ᵏ⁻¹; os demais
+        pesos não mudam. Logo Σ' = Σ - Σₜ₍ₜ<ₖ₎ pesoₜ·rₜrₜ' + λⁿ⁻ᵏ·rₖrₖ'.
+        """
+        if quantidade <= 0:
+            return self
+        if quantidade >= self.num_dias:
+            self.__init__(len(self.soma), self.lambda_)
+            return self
+        antigos = self.valores[:quantidade]
+        n, lambda_ = self.num_dias, self.lambda_
+        pesos = (1 - lambda_) * lambda_ ** (n - 1 - np.arange(quantidade, dtype=float))
+        pesos[0] = lambda_ ** (n - 1)
+        novo_inicial = self.valores[quantidade]
+        self.ewma = (self.ewma - (antigos * pesos[:, None]).T @ antigos
+                     + lambda_ ** (n - quantidade) * np.outer(novo_inicial, novo_inicial))
+
+        self.num_dias -= quantidade
+        self.soma -= antigos.sum(axis=0)
+        self.soma_produtos -= antigos.T @ antigos
+        self.soma_normas_quarta -= np.sum(np.sum(antigos ** 2, axis=1) ** 2)
+        self.valores = self.valores[quantidade:]
+        self.datas = self.datas[quantidade:]
+        self.removidos += quantidade
+        if self.removidos >= self.num_dias:
+            valores, datas = self.valores, self.datas
+            self.__init__(len(self.soma), self.lambda_)
+            self.atualizar(pd.DataFrame(valores, index=datas) if len(datas) else valores)
+        return self
+
+    def compativel(self, retornos):
+        """Os retornos continuam a janela: os dias em comum são os mesmos e nenhum é anterior ao fim."""
+        if self.ultima_data is None or self.ultima_data > retornos.index[-1]:
+            return False
+        comuns = self.datas[self.datas >= retornos.index[0]]
+        return comuns.equals(pd.DatetimeIndex(retornos.index[retornos.index <= self.ultima_data]))
+
+    def amostral(self):
+        media = self.soma / self.num_dias
+        return (self.soma_produtos - self.num_dias * np.outer(media, media)) / max(self.num_dias - 1, 1)
+
+    def ledoit_wolf(self):
+        """Encolhimento de Ledoit-Wolf (2004) em direção a μ·I.
+
+        A intensidade é estimada com retornos tratados como de média zero (convenção
+        usual para retornos diários), o que permite atualizá-la incrementalmente.
+        """
+        n = self.num_dias
+        amostra = self.soma_produtos / n
+        num_ativos = amostra.shape[0]
+        mu = np.trace(amostra) / num_ativos
+        delta = np.sum((amostra - mu * np.eye(num_ativos)) ** 2)
+        # β = (1/n²)·Σₜ ‖rₜrₜ' - S‖² = (1/n)·[(1/n)·Σₜ ‖rₜ‖⁴ - ‖S‖²]
+        beta = max(self.soma_normas_quarta / n - np.sum(amostra ** 2), 0.0) / n
+        intensidade = min(beta, delta) / delta if delta > 0 else 1.0
+        return intensidade * mu * np.eye(num_ativos) + (1 - intensidade) * amostra
+
+    def covariancia(self, metodo):
+        if metodo == "ewma":
+            return self.ewma
+        if metodo == "ledoit_wolf":
+            return self.ledoit_wolf()
+        return self.amostral()
+
+
+def covariancia_em_cache(chave, retornos, metodo):
+    """Covariância de `retornos` pelo estimador em memória da `chave` (ativos e tamanho da janela).
+
+    Se os retornos continuam a janela do estimador, só os dias novos entram e os que
+    saíram da janela são removidos; senão, o estimador é refeito. Usado pelas
+    covariâncias de cotações e de PTAX.
+    """
+    with _trava:
+        estimador = _estimadores.pop(chave, None)
+        if estimador is None or not estimador.compativel(retornos):
+            estimador = EstimadorCovariancia(retornos.shape[1]).atualizar(retornos)
+        else:
+            estimador.atualizar(retornos.loc[retornos.index > estimador.ultima_data])
+            estimador.remover(int((estimador.datas < retornos.index[0]).sum()))
+        _estimadores[chave] = estimador
+        while len(_estimadores) > MAX_ESTIMADORES:
+            _estimadores.pop(next(iter(_estimadores)))
+        return estimador.covariancia(metodo)
+
+
+def dias_janela(inicio, fim=None):
+    """Tamanho da janela em dias corridos, que identifica o estimador no cache."""
+    return (pd.Timestamp(fim or date.today()) - pd.Timestamp(inicio)).days
+
+
+def covariancia_historica(tickers, inicio, metodo="amostral", fim=None):
+    """Covariância diária dos retornos dos ativos, a partir do cache de cotações.
+
+    O estimador de cada combinação (ativos, tamanho da janela) fica em memória; a cada
+    dia, os pregões novos entram e os que saíram da janela são removidos. Retorna
+    (covariância, retornos usados).
+    """
+    if metodo not in ESTIMADORES:
+        raise ValueError(f"Estimador desconhecido: {metodo!r}. Opções: {', '.join(ESTIMADORES)}.")
+    tickers = list(tickers)
+    cotacoes = obter_cotacoes_lote(tickers, inicio, fim)
+    faltantes = [ticker for ticker in tickers if ticker not in cotacoes or cotacoes[ticker].empty]
+    if faltantes:
+        raise ValueError(f"Sem cotações para: {', '.join(faltantes)}.")
+    # Apenas datas com retorno de todos os ativos
+    retornos = matriz_retornos(cotacoes).reindex(columns=tickers).dropna()
+    if len(retornos) < 2:
+        raise ValueError("Histórico insuficiente para estimar a covariância.")
+
+    covariancia = covariancia_em_cache(("cotacoes", tuple(tickers), dias_janela(inicio, fim)), retornos, metodo)
+    return covariancia, retornos
+
+
+def decompor_var(exposicoes, covariancia, nivel_confianca, horizonte_tempo=1):
+    """VaR total, marginal, componente e incremental de uma carteira delta-normal.
+
+    Todas as medidas derivam de Σw, calculado uma única vez. O VaR incremental de
+    cada posição (VaR da carteira menos o VaR sem a posição) usa a identidade
+    σ²₋ᵢ = σ² - 2·wᵢ·(Σw)ᵢ + wᵢ²·Σᵢᵢ, sem refazer o produto para cada posição.
+    """
+    exposicoes = np.asarray(exposicoes, dtype=float)
+    covariancia = np.asarray(covariancia, dtype=float)
+    escala = NormalDist().inv_cdf(nivel_confianca) * np.sqrt(horizonte_tempo)
+
+    sigma_w = covariancia @ exposicoes
+    variancia = float(exposicoes @ sigma_w)
+    volatilidade = np.sqrt(max(variancia, 0.0))
+    var_total = escala * volatilidade
+    var_marginal = escala * sigma_w / volatilidade if volatilidade > 0 else np.zeros_like(exposicoes)
+    variancia_sem = np.maximum(variancia - 2 * exposicoes * sigma_w + exposicoes ** 2 * np.diag(covariancia), 0.0)
+    return {
+        "var": var_total,
+        "volatilidade": volatilidade,
+        "var_marginal": var_marginal,
+        "var_componentes": exposicoes * var_marginal,
+        "var_incremental": var_total - escala * np.sqrt(variancia_sem),
+    }
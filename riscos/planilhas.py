@@ -0,0 +1,13 @@
+"""Arquivos de planilha gerados a partir de tabelas, para os downloads das páginas."""
+from io import BytesIO
+
+import pandas as pd
+
+
+def gerar_excel(tabelas):
+    """Arquivo Excel (bytes) com uma aba por tabela de {nome da aba: DataFrame}."""
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+        for aba, tabela in tabelas.items():
+            tabela.to_excel(writer, sheet_name=aba, index=False)
+    return output.getvalue()
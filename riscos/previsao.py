@@ -0,0 +1,122 @@
+"""Previsão por suavização exponencial de Holt com cache de modelos ajustados.
+
+O ajuste (estimação de alfa e beta por `ExponentialSmoothing`) é o passo caro. Cada
+modelo ajustado fica em memória, indexado por (série, data inicial, data final,
+tendência), junto do estado final do filtro (nível e inclinação). Uma consulta
+repetida é servida do cache; quando a série só ganhou observações novas no fim, o
+estado é atualizado pelas equações de recorrência de Holt, com os parâmetros já
+estimados, sem reajuste. Depois de `MAX_ATUALIZACOES` observações acumuladas dessa
+forma, o modelo é reajustado para que os parâmetros acompanhem os dados.
+
+`prever_em_segundo_plano` executa a previsão num pool de threads e devolve um
+`Future`, para que a página desenhe os demais gráficos enquanto o ajuste roda.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Observações incorporadas por recorrência antes de um novo ajuste completo
+MAX_ATUALIZACOES = 21
+
+# Modelos mantidos em memória (os mais antigos são descartados primeiro)
+MAX_MODELOS = 64
+
+_modelos = {}
+_trava = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="previsao")
+
+
+def ajustar(valores, tendencia="add"):
+    """Ajusta o modelo de Holt (tendência aditiva) ou de suavização simples (`tendencia=None`).
+
+    Retorna o estado do modelo: parâmetros, nível e inclinação finais, número de
+    observações, último valor e quantas observações foram incorporadas sem reajuste.
+    """
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+    valores = np.asarray(valores, dtype=float)
+    ajuste = ExponentialSmoothing(valores, trend=tendencia, seasonal=None).fit()
+    return {
+        "alfa": float(ajuste.params["smoothing_level"]),
+        "beta": float(ajuste.params["smoothing_trend"]) if tendencia else 0.0,
+        "nivel": float(ajuste.level[-1]),
+        "inclinacao": float(ajuste.trend[-1]) if tendencia else 0.0,
+        "observacoes": len(valores),
+        "ultimo": float(valores[-1]),
+        "atualizacoes": 0,
+    }
+
+
+def atualizar(estado, novos):
+    """Estado do modelo após as observações `novos`, pelas recorrências de Holt, sem reajuste."""
+    estado = dict(estado)
+    alfa, beta = estado["alfa"], estado["beta"]
+    nivel, inclinacao = estado["nivel"], estado["inclinacao"]
+    novos = np.asarray(novos, dtype=float)
+    for valor in novos:
+        nivel_anterior = nivel
+        nivel = alfa * valor + (1 - alfa) * (nivel + inclinacao)
+        inclinacao = beta * (nivel - nivel_anterior) + (1 - beta) * inclinacao
+    estado.update(nivel=nivel, inclinacao=inclinacao, observacoes=estado["observacoes"] + len(novos),
+                  atualizacoes=estado["atualizacoes"] + len(novos))
+    if len(novos):
+        estado["ultimo"] = float(novos[-1])
+    return estado
+
+
+def projetar(estado, passos):
+    """Previsão para os próximos `passos` períodos: nível + h × inclinação."""
+    return estado["nivel"] + np.arange(1, passos + 1) * estado["inclinacao"]
+
+
+def _guardar(chave, estado):
+    _modelos.pop(chave, None)
+    _modelos[chave] = estado
+    while len(_modelos) > MAX_MODELOS:
+        _modelos.pop(next(iter(_modelos)))
+
+
+def _anterior_compativel(nome, serie, tendencia):
+    """Chave e estado do modelo da mesma série e início cuja amostra é um prefixo de `serie`."""
+    inicio, fim = serie.index[0], serie.index[-1]
+    candidatos = [(chave, estado) for chave, estado in _modelos.items()
+                  if chave[0] == nome and chave[1] == inicio and chave[3] == tendencia and chave[2] < fim]
+    for chave, estado in sorted(candidatos, key=lambda item: item[0][2], reverse=True):
+        prefixo = serie.loc[:chave[2]]
+        if len(prefixo) == estado["observacoes"] and prefixo.iloc[-1] == estado["ultimo"]:
+            return chave, estado
+    return None, None
+
+
+def prever(nome, serie, passos, tendencia="add"):
+    """Previsão de `passos` períodos à frente para a série (pd.Series indexada por data).
+
+    `nome` identifica a série no cache (por exemplo, o código SGS). Retorna
+    (previsão, origem), com origem "cache", "atualização" ou "ajuste".
+    """
+    serie = serie.dropna()
+    if len(serie) < 3:
+        raise ValueError("São necessárias ao menos 3 observações para a previsão.")
+    chave = (nome, serie.index[0], serie.index[-1], tendencia)
+    with _trava:
+        estado = _modelos.get(chave)
+        origem = "cache"
+        if estado is None:
+            chave_anterior, anterior = _anterior_compativel(nome, serie, tendencia)
+            novos = 0 if anterior is None else len(serie) - anterior["observacoes"]
+            if anterior is not None and anterior["atualizacoes"] + novos <= MAX_ATUALIZACOES:
+                estado, origem = atualizar(anterior, serie.to_numpy()[anterior["observacoes"]:]), "atualização"
+            else:
+                estado = None
+    if estado is None:
+        # O ajuste roda fora da trava: previsões de outras séries não esperam por ele
+        estado, origem = ajustar(serie.to_numpy(), tendencia), "ajuste"
+    with _trava:
+        _guardar(chave, estado)
+    return projetar(estado, passos), origem
+
+
+def prever_em_segundo_plano(nome, serie, passos, tendencia="add"):
+    """Agenda `prever` no pool de threads do módulo e retorna o `Future` correspondente."""
+    return _executor.submit(prever, nome, serie.copy(), passos, tendencia)
@@ -0,0 +1,115 @@
+"""Cotações PTAX de fechamento (venda, em R$ por unidade da moeda) com cache local.
+
+A fonte padrão é a API Olinda do Banco Central; com `RISCOS_BUSCADOR_PTAX=sintetico`
+usa-se um gerador determinístico local, útil para testes e uso offline. Como nas
+demais séries, cada moeda tem um Parquet e um JSON de metadados no cache, e só os
+trechos ainda não consultados (ou vencidos pelo TTL) são buscados na fonte.
+"""
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from riscos.armazenamento import diretorio_cache, ler_json, ler_parquet, salvar_json, salvar_parquet, trechos_faltantes
+from riscos.bcb import TIMEOUT, sessao_http
+
+URL_OLINDA = ("https://olinda.bcb.gov.br/olinda/servico/PTAX/versao/v1/odata/"
+              "CotacaoMoedaPeriodo(moeda=@moeda,dataInicial=@dataInicial,dataFinalCotacao=@dataFinalCotacao)")
+
+# Moedas com PTAX divulgada pelo Banco Central
+MOEDAS_PTAX = ["USD", "EUR", "GBP", "JPY", "CHF", "CAD", "AUD", "DKK", "NOK", "SEK"]
+
+TTL_PADRAO = timedelta(hours=6)
+
+# Nível inicial das cotações sintéticas (R$ por unidade)
+_NIVEIS_SINTETICOS = {"USD": 5.0, "EUR": 5.5, "GBP": 6.3, "JPY": 0.035, "CHF": 5.7, "CAD": 3.7, "AUD": 3.3,
+                      "DKK": 0.74, "NOK": 0.48, "SEK": 0.48}
+
+_travas = {}
+_trava_global = threading.Lock()
+
+
+def buscar_olinda(moeda, inicio, fim):
+    """Baixa a PTAX de fechamento (cotação de venda) de uma moeda entre `inicio` e `fim`."""
+    resposta = sessao_http().get(URL_OLINDA, timeout=TIMEOUT, params={
+        "@moeda": f"'{moeda}'",
+        "@dataInicial": f"'{inicio:%m-%d-%Y}'",
+        "@dataFinalCotacao": f"'{fim:%m-%d-%Y}'",
+        "$filter": "tipoBoletim eq 'Fechamento'",
+        "$select": "cotacaoVenda,dataHoraCotacao",
+        "$format": "json",
+    })
+    resposta.raise_for_status()
+    dados = pd.DataFrame(resposta.json()["value"], columns=["cotacaoVenda", "dataHoraCotacao"])
+    datas = pd.to_datetime(dados["dataHoraCotacao"]).dt.normalize()
+    return pd.Series(dados["cotacaoVenda"].to_numpy(dtype=float), index=pd.DatetimeIndex(datas), name="valor")
+
+
+def buscar_sintetico(moeda, inicio, fim):
+    """PTAX determinística: passeio log-normal com um fator comum a todas as moedas (correlação ~0,5)."""
+    base = pd.bdate_range("2000-01-03", fim)
+    comum = np.random.default_rng(0).normal(0, 0.007, base.size)
+    propria = np.random.default_rng(zlib.crc32(moeda.encode())).normal(0, 0.007, base.size)
+    cotacao = _NIVEIS_SINTETICOS.get(moeda, 1.0) * np.exp(np.cumsum(comum + propria))
+    serie = pd.Series(cotacao, index=base, name="valor")
+    return serie[serie.index >= pd.Timestamp(inicio)]
+
+
+BUSCADORES = {"olinda": buscar_olinda, "sintetico": buscar_sintetico}
+
+
+def buscador_padrao():
+    return BUSCADORES[os.environ.get("RISCOS_BUSCADOR_PTAX", "olinda")]
+
+
+def _trava(moeda):
+    with _trava_global:
+        return _travas.setdefault(moeda, threading.Lock())
+
+
+def _caminhos(moeda):
+    diretorio = diretorio_cache("ptax")
+    return diretorio / f"{moeda}.parquet", diretorio / f"{moeda}.json"
+
+
+def obter_ptax(moeda, inicio, fim=None, ttl=TTL_PADRAO, buscador=None):
+    """PTAX de venda da moeda entre `inicio` e `fim`, buscando na fonte só os trechos faltantes."""
+    moeda = str(moeda).upper()
+    if moeda not in MOEDAS_PTAX:
+        raise ValueError(f"Moeda sem PTAX: {moeda}. Opções: {', '.join(MOEDAS_PTAX)}.")
+    buscador = buscador or buscador_padrao()
+    inicio, fim = pd.Timestamp(inicio).date(), min(pd.Timestamp(fim or date.today()).date(), date.today())
+    agora = datetime.now()
+    arquivo, arquivo_meta = _caminhos(moeda)
+
+    with _trava(moeda):
+        armazenado = ler_parquet(arquivo)
+        serie = None if armazenado is None else armazenado["valor"]
+        meta = ler_json(arquivo_meta)
+        trechos = trechos_faltantes(meta, inicio, fim, agora, ttl)
+        if trechos:
+            partes = ([] if serie is None else [serie]) + [buscador(moeda, *trecho) for trecho in trechos]
+            serie = pd.concat(partes)
+            serie = serie[~serie.index.duplicated(keep="last")].sort_index()
+            meta = {
+                "inicio": min(inicio, date.fromisoformat(meta["inicio"])).isoformat() if meta else inicio.isoformat(),
+                "fim": max(fim, date.fromisoformat(meta["fim"])).isoformat() if meta else fim.isoformat(),
+                "atualizado_em": agora.isoformat(),
+            }
+            salvar_json(meta, arquivo_meta)
+            salvar_parquet(serie.rename("valor").to_frame(), arquivo)
+    return serie.loc[pd.Timestamp(inicio):pd.Timestamp(fim)].copy()
+
+
+def obter_ptax_lote(moedas, inicio, fim=None, ttl=TTL_PADRAO, buscador=None):
+    """DataFrame (datas × moedas) com a PTAX de várias moedas, buscadas em paralelo."""
+    moedas = list(dict.fromkeys(str(moeda).upper() for moeda in moedas))
+    if not moedas:
+        return pd.DataFrame()
+    with ThreadPoolExecutor(max_workers=len(moedas)) as executor:
+        series = list(executor.map(lambda moeda: obter_ptax(moeda, inicio, fim, ttl, buscador), moedas))
+    return pd.concat(series, axis=1, keys=moedas).sort_index()
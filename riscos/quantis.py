@@ -0,0 +1,132 @@
+"""Estimação de quantis de cauda em memória constante.
+
+O `HistogramaCauda` recebe os resultados simulados lote a lote e guarda apenas
+contagens e somas por faixa numa grade fixa que cobre a cauda esquerda. O quantil
+(VaR) e a média da cauda (Expected Shortfall) são obtidos com erro de discretização
+limitado pela largura de uma faixa, independentemente do número de simulações.
+
+Ambos os estimadores aceitam pesos de razão de verossimilhança (amostragem por
+importância): a função de distribuição é estimada por (1/N)·Σ pesos·1{x ≤ q}.
+"""
+import numpy as np
+
+NUM_FAIXAS_PADRAO = 20_000
+
+
+def quantil_cauda(valores, alfa, pesos=None):
+    """Retorna (quantil α, média dos valores até o quantil) de uma amostra completa."""
+    valores = np.asarray(valores, dtype=float)
+    if pesos is None:
+        quantil = np.quantile(valores, alfa)
+        return quantil, valores[valores <= quantil].mean()
+    ordem = np.argsort(valores)
+    ordenados = valores[ordem]
+    acumulado = np.cumsum(pesos[ordem]) / valores.size
+    posicao = min(int(np.searchsorted(acumulado, alfa)), valores.size - 1)
+    quantil = ordenados[posicao]
+    soma = (pesos[ordem][:posicao + 1] * ordenados[:posicao + 1]).sum() / valores.size
+    return quantil, soma / max(acumulado[posicao], alfa)
+
+
+class HistogramaCauda:
+    """Histograma de largura fixa sobre a cauda esquerda de uma distribuição.
+
+    Valores abaixo de `limite_inferior` são acumulados (contagem e soma) numa faixa
+    de transbordo; acima de `limite_superior` guarda-se apenas a contagem, pois não
+    participam do quantil nem da média da cauda.
+    """
+
+    def __init__(self, limite_inferior, limite_superior, num_faixas=NUM_FAIXAS_PADRAO):
+        if not limite_superior > limite_inferior:
+            raise ValueError("O limite superior do histograma deve ser maior que o inferior.")
+        self.bordas = np.linspace(limite_inferior, limite_superior, num_faixas + 1)
+        self.contagens = np.zeros(num_faixas)
+        self.somas = np.zeros(num_faixas)
+        self.contagem_abaixo = 0.0
+        self.soma_abaixo = 0.0
+        self.contagem_acima = 0.0
+        self.num_observacoes = 0
+
+    @classmethod
+    def a_partir_de_amostra(cls, amostra, alfa, num_faixas=NUM_FAIXAS_PADRAO, pesos=None):
+        """Define a grade a partir de uma amostra piloto (tipicamente o primeiro lote).
+
+        A grade vai do mínimo da amostra até o quantil max(3α, α + 5%), com folga de 25%
+        nas duas pontas para que o quantil α da simulação completa caia dentro dela.
+        """
+        amostra = np.asarray(amostra, dtype=float)
+        minimo = amostra.min()
+        superior = quantil_cauda(amostra, min(1.0, max(3 * alfa, alfa + 0.05)), pesos)[0]
+        folga = max(superior - minimo, np.abs(superior) * 1e-12, 1e-12)
+        return cls(minimo - 0.25 * folga, superior + 0.25 * folga, num_faixas)
+
+    @property
+    def largura(self):
+        return self.bordas[1] - self.bordas[0]
+
+    def atualizar(self, valores, pesos=None):
+        """Incorpora um lote de valores (opcionalmente ponderados) ao histograma."""
+        valores = np.asarray(valores, dtype=float)
+        pesos = np.ones_like(valores) if pesos is None else np.asarray(pesos, dtype=float)
+        abaixo = valores < self.bordas[0]
+        acima = valores >= self.bordas[-1]
+        self.num_observacoes += valores.size
+        self.contagem_abaixo += pesos[abaixo].sum()
+        self.soma_abaixo += (pesos[abaixo] * valores[abaixo]).sum()
+        self.contagem_acima += pesos[acima].sum()
+
+        dentro = ~(abaixo | acima)
+        faixas = np.minimum(((valores[dentro] - self.bordas[0]) / self.largura).astype(np.intp),
+                            self.contagens.size - 1)
+        self.contagens += np.bincount(faixas, weights=pesos[dentro], minlength=self.contagens.size)
+        self.somas += np.bincount(faixas, weights=pesos[dentro] * valores[dentro], minlength=self.somas.size)
+        return self
+
+    def combinar(self, outro):
+        """Soma a este histograma outro construído sobre a mesma grade."""
+        if not np.array_equal(self.bordas, outro.bordas):
+            raise ValueError("Só é possível combinar histogramas com a mesma grade.")
+        self.contagens += outro.contagens
+        self.somas += outro.somas
+        self.contagem_abaixo += outro.contagem_abaixo
+        self.soma_abaixo += outro.soma_abaixo
+        self.contagem_acima += outro.contagem_acima
+        self.num_observacoes += outro.num_observacoes
+        return self
+
+    def _localizar(self, alfa):
+        """Faixa que contém o quantil α e a fração dela necessária para atingi-lo."""
+        alvo = alfa * self.num_observacoes
+        if alvo <= self.contagem_abaixo:
+            return -1, 0.0, alvo
+        acumulado = self.contagem_abaixo + np.cumsum(self.contagens)
+        faixa = int(np.searchsorted(acumulado, alvo))
+        if faixa >= self.contagens.size:
+            return self.contagens.size, 0.0, alvo
+        anterior = acumulado[faixa - 1] if faixa > 0 else self.contagem_abaixo
+        fracao = (alvo - anterior) / self.contagens[faixa] if self.contagens[faixa] else 0.0
+        return faixa, fracao, alvo
+
+    def quantil(self, alfa):
+        """Retorna (quantil α, erro máximo de discretização).
+
+        O erro é infinito quando o quantil cai fora da grade (amostra piloto pouco
+        representativa); nesse caso o valor devolvido é o limite da grade.
+        """
+        faixa, fracao, _ = self._localizar(alfa)
+        if faixa < 0:
+            return self.bordas[0], np.inf
+        if faixa >= self.contagens.size:
+            return self.bordas[-1], np.inf
+        return self.bordas[faixa] + fracao * self.largura, self.largura
+
+    def media_cauda(self, alfa):
+        """Retorna (média dos valores até o quantil α, erro máximo de discretização)."""
+        faixa, fracao, alvo = self._localizar(alfa)
+        if faixa < 0 or faixa >= self.contagens.size or alvo <= 0:
+            return (self.soma_abaixo / self.contagem_abaixo if self.contagem_abaixo else self.bordas[0]), np.inf
+        # Faixas inteiras abaixo do quantil entram com a soma exata; a faixa parcial, pela média dela
+        soma = self.soma_abaixo + self.somas[:faixa].sum()
+        if self.contagens[faixa]:
+            soma += fracao * self.somas[faixa]
+        return soma / alvo, self.largura
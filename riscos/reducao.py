@@ -0,0 +1,104 @@
+"""Redução de séries longas para gráficos: LTTB, mínimo/máximo por faixa e agregados por período.
+
+Um gráfico de linha não mostra mais pontos do que a sua largura em pixels; enviar ao
+navegador uma série diária inteira só aumenta o tráfego e o tempo de desenho. As
+funções daqui devolvem os índices dos pontos a manter (no máximo `pontos`), de modo
+que a forma visual da série é preservada:
+
+- `lttb` (Largest-Triangle-Three-Buckets) escolhe, em cada faixa, o ponto que forma o
+  maior triângulo com o ponto escolhido na faixa anterior e a média da seguinte;
+- `min_max` mantém o mínimo e o máximo de cada faixa, preservando picos e degraus.
+
+`agregar` resume a série por semana ou mês (último, mínimo, máximo e média).
+"""
+import numpy as np
+import pandas as pd
+
+# Pontos por gráfico: da ordem da largura de um gráfico em pixels
+MAX_PONTOS_GRAFICO = 1000
+
+FREQUENCIAS = {"semanal": "W-FRI", "mensal": "ME"}
+
+
+def _eixo(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[s]").astype(float)
+    return x.astype(float)
+
+
+def _limites(tamanho, faixas):
+    """Limites das `faixas` faixas em que se dividem os pontos 1..tamanho-2 (o primeiro e o último ficam fora)."""
+    return np.linspace(1, tamanho - 1, faixas + 1).astype(np.int64)
+
+
+def lttb(x, y, pontos=MAX_PONTOS_GRAFICO):
+    """Índices dos `pontos` pontos escolhidos pelo LTTB (todos, se a série já for menor)."""
+    y = np.asarray(y, dtype=float)
+    tamanho = len(y)
+    if pontos >= tamanho or pontos < 3:
+        return np.arange(tamanho)
+    x = _eixo(x)
+    limites = _limites(tamanho, pontos - 2)
+    # Média de cada faixa (e, depois da última, o ponto final), usada como vértice do triângulo
+    medias_x = np.append(np.add.reduceat(x[1:-1], limites[:-1] - 1) / np.diff(limites), x[-1])
+    medias_y = np.append(np.add.reduceat(y[1:-1], limites[:-1] - 1) / np.diff(limites), y[-1])
+
+    escolhidos = np.empty(pontos, dtype=np.int64)
+    escolhidos[0], escolhidos[-1] = 0, tamanho - 1
+    anterior = 0
+    for faixa in range(pontos - 2):
+        inicio, fim = limites[faixa], limites[faixa + 1]
+        xs, ys = x[inicio:fim], y[inicio:fim]
+        areas = np.abs((x[anterior] - medias_x[faixa + 1]) * (ys - y[anterior])
+                       - (x[anterior] - xs) * (medias_y[faixa + 1] - y[anterior]))
+        anterior = inicio + int(np.argmax(areas))
+        escolhidos[faixa + 1] = anterior
+    return escolhidos
+
+
+def min_max(y, pontos=MAX_PONTOS_GRAFICO):
+    """Índices do mínimo e do máximo de cada faixa, em ordem, com no máximo `pontos` pontos."""
+    y = np.asarray(y, dtype=float)
+    tamanho = len(y)
+    if pontos >= tamanho or pontos < 4:
+        return np.arange(tamanho)
+    limites = _limites(tamanho, (pontos - 2) // 2)
+    escolhidos = [0, tamanho - 1]
+    for inicio, fim in zip(limites[:-1], limites[1:]):
+        trecho = y[inicio:fim]
+        escolhidos += [inicio + int(np.nanargmin(trecho)), inicio + int(np.nanargmax(trecho))]
+    return np.unique(escolhidos)
+
+
+def reduzir(serie, pontos=MAX_PONTOS_GRAFICO, metodo="lttb"):
+    """Série (pd.Series indexada por data) com no máximo `pontos` pontos."""
+    serie = serie.dropna()
+    if metodo == "lttb":
+        indices = lttb(serie.index.to_numpy(), serie.to_numpy(), pontos)
+    elif metodo == "min_max":
+        indices = min_max(serie.to_numpy(), pontos)
+    else:
+        raise ValueError(f"Método de redução desconhecido: {metodo}. Opções: lttb, min_max.")
+    return serie.iloc[indices]
+
+
+def agregar(serie, frequencia):
+    """Último valor, mínimo, máximo e média de cada semana ou mês da série.
+
+    O índice é a data da última observação do período, para que os agregados
+    fiquem alinhados à série diária no gráfico.
+    """
+    if frequencia not in FREQUENCIAS:
+        raise ValueError(f"Frequência desconhecida: {frequencia}. Opções: {', '.join(FREQUENCIAS)}.")
+    serie = serie.dropna()
+    periodo = pd.Grouper(freq=FREQUENCIAS[frequencia])
+    grupos = serie.groupby(periodo)
+    agregado = pd.DataFrame({
+        "data": pd.Series(serie.index, index=serie.index).groupby(periodo).max(),
+        "valor": grupos.last(),
+        "minimo": grupos.min(),
+        "maximo": grupos.max(),
+        "media": grupos.mean(),
+    }).dropna()
+    return agregado.set_index("data")
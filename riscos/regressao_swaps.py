@@ -0,0 +1,189 @@
+"""Regressão do motor de swaps em float64 contra a implementação de referência em Decimal.
+
+A referência reproduz as regras de truncamento documentadas em `riscos.swaps`
+(fatores em 8 casas, produtos e fatores acumulados em 16, valores em centavos) com
+aritmética decimal de 34 dígitos, operação a operação. A verificação sorteia pontas
+de todos os tipos e convenções, avalia todas de uma vez pelo caminho vetorizado e
+uma a uma pela referência, e exige concordância até o centavo. O mesmo é feito para
+o fator acumulado de uma série diária (soma de logs × produtório decimal).
+
+Quando o fator exato antes do truncamento fica a ~1e-14 de uma fronteira de 8 casas,
+o float64 não tem resolução para decidir o lado; esses casos, raros, são contados à
+parte e só precisam concordar em uma unidade da 8ª casa.
+
+Uso: python -m riscos.regressao_swaps [--casos 5000] [--semente 0]
+"""
+import argparse
+import sys
+import time
+from datetime import date
+from decimal import ROUND_DOWN, Decimal, localcontext
+
+import numpy as np
+import pandas as pd
+
+from riscos.bcb import buscar_sintetico, log_fatores_acumulados
+from riscos.swaps import (CASAS_FATOR, CASAS_FATOR_ACUMULADO, CASAS_VALOR, CONVENCAO_PADRAO, CONVENCOES, TIPOS_PONTA,
+                          fator_ponta, valor_ponta)
+
+PRECISAO_DECIMAL = 34
+
+# Diferença máxima aceita entre os dois caminhos, em reais
+TOLERANCIA_VALOR = 0.01
+
+# Distância, em unidades da última casa truncada, abaixo da qual um fator antes do truncamento
+# está a menos de ~1e-14 da fronteira e o float64 (erro de poucos ulps na potência) não decide o lado
+FOLGA_FRONTEIRA = 1e-6
+
+
+def _truncar(valor, casas):
+    return valor.quantize(Decimal(1).scaleb(-casas), rounding=ROUND_DOWN)
+
+
+def _na_fronteira(valor, casas):
+    # Fatores exatos em 8 casas (fração zero) são resolvidos pela folga de `truncar`
+    fracao = valor.scaleb(casas) % 1
+    return 0 < fracao < FOLGA_FRONTEIRA or fracao > 1 - FOLGA_FRONTEIRA
+
+
+def _decimal(valor):
+    # 15 algarismos significativos recuperam o número digitado: 0,7 / 100 vira 0,006999999999999999 em float,
+    # mas a taxa contratada é 0,007, e o truncamento em 8 casas é sensível a essa diferença
+    return Decimal(f"{float(valor):.15g}")
+
+
+def fator_taxa_decimal(taxa, dias_uteis, dias_corridos, convencao):
+    taxa = _decimal(taxa)
+    if convencao == "du252":
+        return (1 + taxa) ** (Decimal(int(dias_uteis)) / 252)
+    if convencao == "dc360":
+        return 1 + taxa * Decimal(int(dias_corridos)) / 360
+    return (1 + taxa) ** (Decimal(int(dias_corridos)) / 365)
+
+
+def _fator_ponta_decimal(tipo, dias_uteis, dias_corridos, taxa, indexador, cambio_inicial, cambio_final, convencao):
+    """(fator da ponta, algum fator de 8 casas caiu na fronteira do truncamento)."""
+    with localcontext() as contexto:
+        contexto.prec = PRECISAO_DECIMAL
+        convencao = convencao or CONVENCAO_PADRAO[tipo]
+        if tipo in ("di", "selic", "igpm"):
+            indexacao = fator_taxa_decimal(indexador, dias_uteis, 0, "du252")
+        elif tipo == "cambial":
+            indexacao = _decimal(cambio_final) / _decimal(cambio_inicial)
+        else:
+            indexacao = Decimal(1)
+        fator = fator_taxa_decimal(taxa, dias_uteis, dias_corridos, convencao)
+        fronteira = _na_fronteira(indexacao, CASAS_FATOR) or _na_fronteira(fator, CASAS_FATOR)
+        fator = _truncar(_truncar(indexacao, CASAS_FATOR) * _truncar(fator, CASAS_FATOR), CASAS_FATOR_ACUMULADO)
+        return fator, fronteira
+
+
+def fator_ponta_decimal(tipo, dias_uteis=0, dias_corridos=0, taxa=0.0, indexador=0.0, cambio_inicial=1.0,
+                        cambio_final=1.0, convencao=None):
+    """Fator de uma ponta em Decimal, com as mesmas regras de truncamento de `fator_ponta`."""
+    return _fator_ponta_decimal(tipo, dias_uteis, dias_corridos, taxa, indexador, cambio_inicial, cambio_final,
+                                convencao)[0]
+
+
+def valor_ponta_decimal(nocional, tipo, **parametros):
+    with localcontext() as contexto:
+        contexto.prec = PRECISAO_DECIMAL
+        return _truncar(_decimal(nocional) * fator_ponta_decimal(tipo, **parametros), CASAS_VALOR)
+
+
+def sortear_pontas(casos, semente=0):
+    """Pontas aleatórias de todos os tipos e convenções, com entradas nos formatos das páginas."""
+    rng = np.random.default_rng(semente)
+    tipos = rng.choice(list(TIPOS_PONTA), casos)
+    return pd.DataFrame({
+        "nocional": np.round(rng.uniform(1e3, 1e9, casos), 2),
+        "tipo": tipos,
+        "convencao": np.where(rng.random(casos) < 0.5, [CONVENCAO_PADRAO[tipo] for tipo in tipos],
+                              rng.choice(list(CONVENCOES), casos)),
+        "dias_uteis": rng.integers(1, 2521, casos),
+        "dias_corridos": rng.integers(1, 3651, casos),
+        "taxa": np.round(rng.uniform(0, 40, casos), 2) / 100,
+        "indexador": np.round(rng.uniform(0, 40, casos), 2) / 100,
+        "cambio_inicial": np.round(rng.uniform(1, 7, casos), 4),
+        "cambio_final": np.round(rng.uniform(1, 7, casos), 4),
+    })
+
+
+def verificar_pontas(casos, semente=0):
+    """Compara o caminho vetorizado com a referência decimal; retorna um dicionário de resultados."""
+    pontas = sortear_pontas(casos, semente)
+    parametros = {coluna: pontas[coluna].to_numpy() for coluna in pontas.columns if coluna != "nocional"}
+
+    inicio = time.perf_counter()
+    fatores = fator_ponta(**parametros)
+    valores = valor_ponta(pontas["nocional"].to_numpy(), **parametros)
+    tempo_vetorizado = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    referencia_fatores, referencia_valores, fronteira = [], [], []
+    for linha in pontas.itertuples(index=False):
+        argumentos = linha._asdict()
+        nocional = argumentos.pop("nocional")
+        fator, na_fronteira = _fator_ponta_decimal(**argumentos)
+        referencia_fatores.append(fator)
+        referencia_valores.append(valor_ponta_decimal(nocional, **argumentos))
+        fronteira.append(na_fronteira)
+    tempo_decimal = time.perf_counter() - inicio
+
+    fronteira = np.array(fronteira)
+    diferencas_fator = np.abs(fatores - np.array(referencia_fatores, dtype=float))
+    # Em valores da ordem de R$ 1 bi, o ulp do float (~1e-7) aparece na diferença: compara-se em centavos
+    diferencas_valor = np.round(np.abs(valores - np.array(referencia_valores, dtype=float)), CASAS_VALOR)
+    # Na fronteira, o float pode truncar para o lado vizinho: a diferença fica limitada a
+    # uma unidade na 8ª casa de um dos fatores (vezes o outro fator, no máximo ~40)
+    return {
+        "casos": casos,
+        "maior diferença de fator": diferencas_fator.max(),
+        "maior diferença de valor (R$)": diferencas_valor[~fronteira].max(initial=0),
+        "valores idênticos (%)": np.mean(diferencas_valor == 0) * 100,
+        "casos na fronteira do truncamento": int(fronteira.sum()),
+        "maior diferença de fator na fronteira": diferencas_fator[fronteira].max(initial=0),
+        "tempo vetorizado (s)": tempo_vetorizado,
+        "tempo Decimal (s)": tempo_decimal,
+        "aprovado": bool(diferencas_valor[~fronteira].max(initial=0) <= TOLERANCIA_VALOR
+                         and diferencas_fator[fronteira].max(initial=0) <= 50 * 10.0 ** -CASAS_FATOR),
+    }
+
+
+def verificar_fator_acumulado(nocional=1e9):
+    """Fator acumulado de 10 anos de taxas diárias: soma de logs em float × produtório em Decimal."""
+    serie = buscar_sintetico(12, date(2015, 1, 1), date(2024, 12, 31))
+    _, log_acumulado = log_fatores_acumulados(serie)
+    fator = np.exp(log_acumulado[-1])
+    with localcontext() as contexto:
+        contexto.prec = PRECISAO_DECIMAL
+        referencia = Decimal(1)
+        for taxa in serie.to_numpy():
+            referencia = _truncar(referencia * (1 + _decimal(taxa) / 100), CASAS_FATOR_ACUMULADO)
+    diferenca = abs(fator - float(referencia)) * nocional
+    return {
+        "dias": len(serie),
+        f"diferença sobre R$ {nocional:,.0f} (R$)": diferenca,
+        "aprovado": bool(diferenca <= TOLERANCIA_VALOR),
+    }
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--casos", type=int, default=5000)
+    parser.add_argument("--semente", type=int, default=0)
+    argumentos = parser.parse_args(argumentos)
+
+    resultados = {
+        "Pontas de swap": verificar_pontas(argumentos.casos, argumentos.semente),
+        "Fator acumulado diário": verificar_fator_acumulado(),
+    }
+    for nome, resultado in resultados.items():
+        print(nome)
+        for chave, valor in resultado.items():
+            print(f"  {chave}: {valor}")
+    return 0 if all(resultado["aprovado"] for resultado in resultados.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Servidor HTTP local que imita a API de séries do SGS, para testes sem acesso à rede.
+
+Responde em `/dados/serie/bcdata.sgs.<código>/dados?formato=json&dataInicial=...&dataFinal=...`
+com a série determinística de `riscos.bcb.buscar_sintetico`, no mesmo formato JSON do
+Banco Central (datas dd/mm/aaaa e valores como texto) e com 404 quando não há
+observações no intervalo. Para apontar o cliente para ele:
+
+    python -m riscos.servidor_sgs --porta 8765
+    RISCOS_URL_SGS=http://127.0.0.1:8765/dados/serie/bcdata.sgs.{codigo}/dados streamlit run 1_Home.py
+
+Em código, `iniciar_servidor()` sobe o servidor numa thread e devolve a URL a usar.
+"""
+import argparse
+import json
+import re
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from riscos.bcb import buscar_sintetico
+
+_CAMINHO = re.compile(r"^/dados/serie/bcdata\.sgs\.(\d+)/dados$")
+
+
+class _Manipulador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        endereco = urlparse(self.path)
+        encontrado = _CAMINHO.match(endereco.path)
+        parametros = parse_qs(endereco.query)
+        if not encontrado or "dataInicial" not in parametros or "dataFinal" not in parametros:
+            self._responder(400, {"erro": "Informe a série e os parâmetros dataInicial e dataFinal."})
+            return
+        inicio = datetime.strptime(parametros["dataInicial"][0], "%d/%m/%Y").date()
+        fim = datetime.strptime(parametros["dataFinal"][0], "%d/%m/%Y").date()
+        self.server.requisicoes.append((int(encontrado.group(1)), inicio, fim))
+        serie = buscar_sintetico(int(encontrado.group(1)), inicio, fim)
+        if serie.empty:
+            self._responder(404, {"erro": "Sem observações no intervalo."})
+            return
+        self._responder(200, [{"data": f"{data:%d/%m/%Y}", "valor": f"{valor:.8f}"} for data, valor in serie.items()])
+
+    def _responder(self, status, corpo):
+        dados = json.dumps(corpo).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, formato, *argumentos):
+        pass
+
+
+def iniciar_servidor(porta=0):
+    """Sobe o servidor numa thread; retorna (servidor, URL no formato de `riscos.bcb.URL_SGS`).
+
+    `servidor.requisicoes` guarda (código, início, fim) de cada consulta recebida, o
+    que permite conferir o que o cache evitou buscar. Encerre com `servidor.shutdown()`.
+    """
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), _Manipulador)
+    servidor.requisicoes = []
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_port}/dados/serie/bcdata.sgs.{{codigo}}/dados"
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--porta", type=int, default=8765)
+    argumentos = parser.parse_args(argumentos)
+    servidor = ThreadingHTTPServer(("127.0.0.1", argumentos.porta), _Manipulador)
+    servidor.requisicoes = []
+    print(f"RISCOS_URL_SGS=http://127.0.0.1:{servidor.server_port}/dados/serie/bcdata.sgs.{{codigo}}/dados")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""Motor de fluxos de swaps: fatores de cada ponta e valor de carteiras inteiras.
+
+Toda ponta é um fator de indexação (DI/Selic/IGP-M capitalizados em 252 dias úteis
+ou variação cambial) multiplicado pelo fator da taxa contratada (pré, spread ou
+cupom) na convenção de contagem de dias da ponta. As funções aceitam escalares ou
+arrays e fazem broadcasting, de modo que uma carteira com milhares de swaps é
+avaliada com algumas operações vetorizadas.
+
+Arredondamento (convenção ANBIMA de truncamento, sempre em direção a zero):
+
+- cada fator de período (taxa pré, spread/cupom, indexador capitalizado e variação
+  cambial) é truncado em 8 casas decimais;
+- fatores acumulados de séries diárias e o fator da ponta (produto de dois fatores
+  de 8 casas) são truncados em 16 casas, o que, para fatores da ordem de 1, está
+  abaixo da resolução do float64 e não altera o valor;
+- valores financeiros são truncados em centavos.
+
+A implementação de referência em `Decimal` e a verificação de que este caminho em
+float64 concorda com ela até o centavo estão em `riscos.regressao_swaps`.
+"""
+import numpy as np
+import pandas as pd
+
+from riscos.bcb import SERIES_INDEXADOR, fator_acumulado
+from riscos.calendario import dias_corridos, dias_uteis
+
+TIPOS_PONTA = {
+    "pre": "Pré-fixada",
+    "di": "DI (over)",
+    "selic": "Selic (over)",
+    "cambial": "Variação cambial + cupom",
+    "igpm": "IGP-M + cupom",
+}
+
+CONVENCOES = {
+    "du252": "Exponencial, dias úteis/252",
+    "dc360": "Linear, dias corridos/360",
+    "act365": "Exponencial, dias corridos/365",
+}
+
+# Convenção usual da taxa contratada em cada tipo de ponta
+CONVENCAO_PADRAO = {"pre": "du252", "di": "du252", "selic": "du252", "cambial": "dc360", "igpm": "du252"}
+
+CASAS_FATOR = 8
+CASAS_FATOR_ACUMULADO = 16
+CASAS_VALOR = 2
+
+# Pontas cujo indexador é uma taxa anual capitalizada em dias úteis
+_INDEXADAS_TAXA = ("di", "selic", "igpm")
+
+
+def _convencao_padrao(tipo):
+    if np.ndim(tipo) == 0:
+        return CONVENCAO_PADRAO[str(tipo)]
+    return pd.Series(np.ravel(tipo)).map(CONVENCAO_PADRAO).to_numpy().reshape(np.shape(tipo))
+
+
+def _valores_distintos(valores):
+    # pd.unique usa hash: bem mais rápido que np.unique (ordenação) em arrays de strings
+    return set(pd.unique(np.ravel(valores)))
+
+
+def truncar(valores, casas):
+    """Trunca em `casas` decimais, em direção a zero (escalares ou arrays).
+
+    Uma folga de poucos ulps absorve o erro de representação binária (1,23456789 é
+    guardado como 1,2345678899999999...), para que o resultado coincida com o
+    truncamento decimal. Com 15 casas ou mais, a escala passa da precisão do float64
+    para fatores da ordem de 1 e o valor é devolvido sem alteração.
+    """
+    valores = np.asarray(valores, dtype=float)
+    if casas >= 15:
+        return valores
+    escala = 10.0 ** casas
+    return np.trunc(valores * escala * (1 + 4 * np.finfo(float).eps)) / escala
+
+
+def fator_taxa(taxa, dias_uteis=0, dias_corridos=0, convencao="du252"):
+    """Fator de uma taxa anual no prazo, na convenção indicada (escalares ou arrays)."""
+    taxa = np.asarray(taxa, dtype=float)
+    convencao = np.asarray(convencao)
+    desconhecidas = _valores_distintos(convencao) - set(CONVENCOES)
+    if desconhecidas:
+        raise ValueError(f"Convenção desconhecida: {', '.join(map(str, desconhecidas))}. "
+                         f"Opções: {', '.join(CONVENCOES)}.")
+    dias_uteis = np.asarray(dias_uteis, dtype=float)
+    dias_corridos = np.asarray(dias_corridos, dtype=float)
+    return np.select(
+        [convencao == "du252", convencao == "dc360"],
+        [(1 + taxa) ** (dias_uteis / 252), 1 + taxa * dias_corridos / 360],
+        (1 + taxa) ** (dias_corridos / 365),
+    )
+
+
+def fator_ponta(tipo, dias_uteis=0, dias_corridos=0, taxa=0.0, indexador=0.0, cambio_inicial=1.0,
+                cambio_final=1.0, convencao=None, fator_indexador=None, dias_projetados=0):
+    """Fator de atualização de uma ponta (ou de um array de pontas).
+
+    - `pre`: taxa pré-fixada.
+    - `di` / `selic`: taxa média do indexador no período (`indexador`) capitalizada em
+      dias úteis, mais o spread `taxa`.
+    - `cambial`: câmbio final / câmbio inicial, mais o cupom cambial `taxa`.
+    - `igpm`: variação anualizada do IGP-M (`indexador`) capitalizada em dias úteis,
+      composta com o cupom `taxa`.
+
+    Taxas em fração ao ano. Sem `convencao`, usa a convenção padrão de cada tipo.
+    `fator_indexador`, quando informado (NaN onde não se aplica), substitui a
+    capitalização de `indexador` pelo fator já acumulado, por exemplo o CDI realizado;
+    os `dias_projetados` dias úteis ainda sem taxa divulgada são capitalizados por
+    `indexador` sobre ele, de modo que um choque no indexador recai só sobre esses dias.
+    """
+    tipo = np.asarray(tipo)
+    desconhecidos = _valores_distintos(tipo) - set(TIPOS_PONTA)
+    if desconhecidos:
+        raise ValueError(f"Tipo de ponta desconhecido: {', '.join(map(str, desconhecidos))}. "
+                         f"Opções: {', '.join(TIPOS_PONTA)}.")
+    if convencao is None:
+        convencao = _convencao_padrao(tipo)
+
+    fator_taxa_indexador = truncar(fator_taxa(indexador, dias_uteis), CASAS_FATOR)
+    if fator_indexador is not None:
+        fator_indexador = truncar(np.asarray(fator_indexador, dtype=float) * fator_taxa(indexador, dias_projetados),
+                                  CASAS_FATOR_ACUMULADO)
+        fator_taxa_indexador = np.where(np.isnan(fator_indexador), fator_taxa_indexador, fator_indexador)
+    variacao_cambial = truncar(np.asarray(cambio_final, dtype=float) / np.asarray(cambio_inicial, dtype=float),
+                               CASAS_FATOR)
+    indexacao = np.select([np.isin(tipo, _INDEXADAS_TAXA), tipo == "cambial"],
+                          [fator_taxa_indexador, variacao_cambial], 1.0)
+    return truncar(indexacao * truncar(fator_taxa(taxa, dias_uteis, dias_corridos, convencao), CASAS_FATOR),
+                   CASAS_FATOR_ACUMULADO)
+
+
+def valor_ponta(nocional, tipo, **parametros):
+    """Valor atualizado de uma ponta: nocional × fator da ponta, truncado em centavos."""
+    return truncar(np.asarray(nocional, dtype=float) * fator_ponta(tipo, **parametros), CASAS_VALOR)
+
+
+def avaliar_swap(nocional, pontas):
+    """Fator e valor de cada ponta e resultado (ativa - passiva) de um swap.
+
+    `pontas` é {"Ativa": parâmetros, "Passiva": parâmetros}, com os argumentos de
+    `fator_ponta` de cada ponta (incluindo `tipo`).
+    """
+    avaliacao = {}
+    for ponta in ("Ativa", "Passiva"):
+        fator = fator_ponta(**pontas[ponta])
+        avaliacao[f"fator_{ponta.lower()}"] = float(fator)
+        avaliacao[f"valor_{ponta.lower()}"] = float(truncar(np.asarray(nocional, dtype=float) * fator, CASAS_VALOR))
+    avaliacao["resultado"] = avaliacao["valor_ativa"] - avaliacao["valor_passiva"]
+    return avaliacao
+
+
+def _parametros_ponta(carteira, ponta):
+    """Argumentos de `fator_ponta` para a ponta ("Ativa" ou "Passiva") de cada swap da carteira."""
+    def coluna(nome, padrao):
+        return carteira[nome].to_numpy() if nome in carteira else padrao
+
+    convencao = coluna(f"Convenção {ponta}", None)
+    if convencao is not None:
+        convencao = np.where(pd.isna(convencao), _convencao_padrao(carteira[f"Ponta {ponta}"].to_numpy()), convencao)
+    return {
+        "tipo": carteira[f"Ponta {ponta}"].to_numpy(),
+        "dias_uteis": coluna("Dias Úteis", 0),
+        "dias_corridos": coluna("Dias Corridos", 0),
+        "taxa": coluna(f"Taxa {ponta} (%)", 0.0) / 100,
+        "indexador": coluna(f"Indexador {ponta} (%)", 0.0) / 100,
+        "cambio_inicial": coluna("Câmbio Inicial", 1.0),
+        "cambio_final": coluna("Câmbio Final", 1.0),
+        "convencao": convencao,
+    }
+
+
+def _fatores_realizados(carteira, ponta):
+    """CDI/Selic acumulados de cada swap com ponta DI ou Selic (NaN nas demais).
+
+    O indexador informado na carteira projeta os dias úteis sem taxa divulgada.
+    """
+    tipos = carteira[f"Ponta {ponta}"].to_numpy()
+    projecao = (carteira[f"Indexador {ponta} (%)"].to_numpy(dtype=float) / 100
+                if f"Indexador {ponta} (%)" in carteira else None)
+    fatores = np.full(len(carteira), np.nan)
+    for tipo, codigo in SERIES_INDEXADOR.items():
+        linhas = tipos == tipo
+        if linhas.any():
+            fatores[linhas] = fator_acumulado(codigo, carteira["Data Inicial"].to_numpy()[linhas],
+                                              carteira["Vencimento"].to_numpy()[linhas],
+                                              None if projecao is None else projecao[linhas])
+    return fatores
+
+
+def avaliar_carteira(carteira, realizado=False):
+    """Valor de cada ponta e resultado (ativa - passiva) de uma carteira de swaps.
+
+    Colunas esperadas: `Nocional`, `Ponta Ativa`, `Ponta Passiva` (tipos de
+    `TIPOS_PONTA`) e os prazos `Dias Úteis` / `Dias Corridos` ou as datas
+    `Data Inicial` / `Vencimento`, das quais os prazos são obtidos pelo calendário
+    ANBIMA. Opcionais, por ponta: `Taxa Ativa (%)`, `Indexador Ativa (%)`,
+    `Convenção Ativa` (idem para Passiva), além de `Câmbio Inicial` e `Câmbio Final`
+    para as pontas cambiais.
+
+    Com `realizado=True` (exige as datas), as pontas DI e Selic acumulam as taxas
+    diárias do SGS entre as datas, e o indexador informado passa a ser apenas a
+    projeção dos dias ainda sem taxa.
+    """
+    resultado = carteira.copy()
+    if "Dias Úteis" not in carteira and {"Data Inicial", "Vencimento"} <= set(carteira.columns):
+        resultado["Dias Úteis"] = dias_uteis(carteira["Data Inicial"], carteira["Vencimento"])
+        resultado["Dias Corridos"] = dias_corridos(carteira["Data Inicial"], carteira["Vencimento"])
+        carteira = resultado
+    nocional = carteira["Nocional"].to_numpy(dtype=float)
+    for ponta in ("Ativa", "Passiva"):
+        parametros = _parametros_ponta(carteira, ponta)
+        if realizado:
+            parametros["fator_indexador"] = _fatores_realizados(carteira, ponta)
+        resultado[f"Valor {ponta} (R$)"] = truncar(nocional * fator_ponta(**parametros), CASAS_VALOR)
+    resultado["Resultado (R$)"] = resultado["Valor Ativa (R$)"] - resultado["Valor Passiva (R$)"]
+    return resultado
+
+
+# Fatores de risco de cada tipo de ponta: {parâmetro de `fator_ponta`: nome do fator}
+FATORES_RISCO = {
+    "pre": {"taxa": "Taxa pré"},
+    "di": {"indexador": "DI", "taxa": "Spread"},
+    "selic": {"indexador": "Selic", "taxa": "Spread"},
+    "cambial": {"cambio_final": "Câmbio", "taxa": "Cupom cambial"},
+    "igpm": {"indexador": "IGP-M", "taxa": "Cupom"},
+}
+
+# Choque usado em cada parâmetro: 1 bp nas taxas (DV01) e 1% no câmbio final (delta cambial)
+CHOQUES_SENSIBILIDADE = {"taxa": 0.0001, "indexador": 0.0001, "cambio_final": 0.01}
+
+_SINAL_PONTA = {"Ativa": 1, "Passiva": -1}
+
+
+def _chocar(parametros, parametro, choques):
+    """Cópia dos parâmetros da ponta com `choques` aplicados a `parametro` (broadcasting).
+
+    Taxas recebem choques aditivos (fração ao ano); o câmbio final, choques relativos.
+    """
+    chocados = dict(parametros)
+    base = np.asarray(parametros.get(parametro, 1.0 if parametro == "cambio_final" else 0.0), dtype=float)
+    choques = np.asarray(choques, dtype=float)
+    chocados[parametro] = base * (1 + choques) if parametro == "cambio_final" else base + choques
+    return chocados
+
+
+def sensibilidades(nocional, pontas, choques=None, fatores=None):
+    """Sensibilidade do resultado de um swap (ativa - passiva) a cada fator de risco das pontas.
+
+    `pontas` é {"Ativa": parâmetros, "Passiva": parâmetros}, com os argumentos de
+    `fator_ponta` de cada ponta. Cada fator é reavaliado com choques para cima e para
+    baixo (diferença central), todos de uma vez: uma única chamada de `valor_ponta`
+    por ponta, com um array de cenários. O DV01 é a variação para +1 bp na taxa e o
+    delta cambial a variação para +1% no câmbio final. `fatores` ({ponta: parâmetros})
+    restringe os fatores de uma ponta, por exemplo para omitir uma taxa que a ponta não tem.
+    """
+    choques = {**CHOQUES_SENSIBILIDADE, **(choques or {})}
+    linhas = []
+    for ponta, parametros in pontas.items():
+        fatores_ponta = FATORES_RISCO[str(parametros["tipo"])]
+        if fatores and ponta in fatores:
+            fatores_ponta = {parametro: fatores_ponta[parametro] for parametro in fatores[ponta]}
+        cenarios = dict(parametros)
+        # Cenários 2k e 2k+1: choque para cima e para baixo no k-ésimo fator; os demais ficam na base
+        for k, parametro in enumerate(fatores_ponta):
+            vetor = np.zeros(2 * len(fatores_ponta))
+            vetor[2 * k:2 * k + 2] = choques[parametro], -choques[parametro]
+            cenarios = _chocar(cenarios, parametro, vetor)
+        valores = valor_ponta(nocional, **cenarios)
+        for k, (parametro, fator) in enumerate(fatores_ponta.items()):
+            linhas.append({
+                "Ponta": ponta,
+                "Fator de risco": fator,
+                "Choque": f"{choques[parametro]:.0%}" if parametro == "cambio_final"
+                else f"{choques[parametro] * 1e4:g} bp",
+                # + 0.0 troca o -0.0 das pontas sem exposição ao fator por zero
+                "Sensibilidade (R$)": _SINAL_PONTA[ponta] * (valores[2 * k] - valores[2 * k + 1]) / 2 + 0.0,
+            })
+    return pd.DataFrame(linhas)
+
+
+def grade_reavaliacao(nocional, pontas, eixo_linhas, choques_linhas, eixo_colunas, choques_colunas):
+    """Resultado do swap (ativa - passiva) em cada par de choques, por reavaliação completa.
+
+    Cada eixo é uma lista de pares (ponta, parâmetro) chocados juntos, por exemplo
+    [("Passiva", "indexador")] para a Selic. Os choques seguem a regra de `_chocar`.
+    As pontas são avaliadas uma vez cada sobre a grade inteira (broadcasting linhas ×
+    colunas). Retorna um DataFrame com os choques do primeiro eixo nas linhas.
+    """
+    choques_linhas = np.asarray(choques_linhas, dtype=float)
+    choques_colunas = np.asarray(choques_colunas, dtype=float)
+    grade = np.zeros((len(choques_linhas), len(choques_colunas)))
+    for ponta, parametros in pontas.items():
+        for alvo, parametro in eixo_linhas:
+            if alvo == ponta:
+                parametros = _chocar(parametros, parametro, choques_linhas[:, None])
+        for alvo, parametro in eixo_colunas:
+            if alvo == ponta:
+                parametros = _chocar(parametros, parametro, choques_colunas[None, :])
+        grade = grade + _SINAL_PONTA[ponta] * valor_ponta(nocional, **parametros)
+    return pd.DataFrame(grade, index=choques_linhas, columns=choques_colunas)
@@ -0,0 +1,149 @@
+"""Tempo de importação de cada página do aplicativo, medido com `python -X importtime`.
+
+Cada página roda num processo de servidor em que o Streamlit já está carregado; o
+custo da primeira abertura da página é importar o que ela importa no nível do
+módulo. A medição executa, num processo novo, `import streamlit` e depois apenas as
+importações de nível superior da página (as importações dentro de funções ficam de
+fora, pois só acontecem no caminho que as usa). O tempo é a soma dos tempos
+cumulativos que o `-X importtime` registra depois do Streamlit; a memória é o
+acréscimo de RSS máximo do processo (Linux e macOS).
+
+A mediana de algumas repetições é comparada com a linha de base gravada em
+`tempo_importacao.json`. Uma página que ficar mais lenta do que a base além da
+tolerância reprova a verificação:
+
+    python -m riscos.tempo_importacao                 # compara com a base
+    python -m riscos.tempo_importacao --atualizar     # grava a base a partir desta máquina
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+ARQUIVO_BASE = Path(__file__).with_suffix(".json")
+
+# Tolerância sobre a linha de base: relativa e absoluta (ruído de medição em páginas leves)
+TOLERANCIA_RELATIVA = 0.25
+TOLERANCIA_MS = 30.0
+
+REPETICOES_PADRAO = 5
+
+_MARCADOR = "--pagina--"
+
+_MEDIDOR = """import sys
+try:
+    import resource
+except ImportError:
+    resource = None
+def rss():
+    if resource is None:
+        return 0
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximo // 1024 if sys.platform == "darwin" else maximo
+import streamlit
+antes = rss()
+sys.stderr.write({marcador!r} + "\\n")
+sys.stderr.flush()
+{importacoes}
+print(rss() - antes)
+"""
+
+
+def paginas():
+    """Página inicial e páginas de `pages/`, na ordem do menu do Streamlit."""
+    return [RAIZ / "1_Home.py"] + sorted((RAIZ / "pages").glob("*.py"))
+
+
+def importacoes(caminho):
+    """Código das importações de nível superior do arquivo."""
+    codigo = Path(caminho).read_text(encoding="utf-8")
+    return "\n".join(ast.get_source_segment(codigo, no) for no in ast.parse(codigo).body
+                     if isinstance(no, (ast.Import, ast.ImportFrom)))
+
+
+def _interpretar(saida_erro):
+    """Tempo total (ms) e tempos por módulo de nível superior após o marcador, da saída do importtime."""
+    linhas = saida_erro.split(_MARCADOR, 1)[-1].splitlines()
+    modulos = {}
+    for linha in linhas:
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        _, cumulativo, nome = linha[len("import time:"):].split("|")
+        # Só os módulos importados diretamente (sem recuo), para não contar duas vezes os dependentes
+        if not nome[1:].startswith(" "):
+            modulos[nome.strip()] = int(cumulativo) / 1000
+    return sum(modulos.values()), modulos
+
+
+def medir(caminho, repeticoes=REPETICOES_PADRAO):
+    """Mediana do tempo de importação (ms), acréscimo de RSS (KB) e os módulos mais pesados da página."""
+    codigo = _MEDIDOR.format(marcador=_MARCADOR, importacoes=importacoes(caminho))
+    ambiente = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(RAIZ), os.environ.get("PYTHONPATH")]))}
+    tempos, memorias, por_modulo = [], [], []
+    for _ in range(repeticoes):
+        processo = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo], cwd=RAIZ, env=ambiente,
+                                  capture_output=True, text=True)
+        if processo.returncode != 0:
+            raise RuntimeError(f"Falha ao importar {Path(caminho).name}:\n{processo.stderr[-2000:]}")
+        total, modulos = _interpretar(processo.stderr)
+        tempos.append(total)
+        memorias.append(int(processo.stdout.split()[-1]))
+        por_modulo.append(modulos)
+    mediana = statistics.median(tempos)
+    modulos = por_modulo[tempos.index(min(tempos, key=lambda tempo: abs(tempo - mediana)))]
+    return {
+        "ms": round(mediana, 1),
+        "rss_kb": int(statistics.median(memorias)),
+        "mais_pesados": dict(sorted(modulos.items(), key=lambda item: -item[1])[:5]),
+    }
+
+
+def ler_base(arquivo=ARQUIVO_BASE):
+    arquivo = Path(arquivo)
+    return json.loads(arquivo.read_text(encoding="utf-8")) if arquivo.exists() else {}
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES_PADRAO)
+    parser.add_argument("--base", default=str(ARQUIVO_BASE), help="arquivo JSON da linha de base")
+    parser.add_argument("--atualizar", action="store_true", help="grava as medições como nova linha de base")
+    parser.add_argument("--detalhar", action="store_true", help="lista os módulos mais pesados de cada página")
+    argumentos = parser.parse_args(argumentos)
+
+    base = ler_base(argumentos.base)
+    medicoes = {}
+    reprovadas = []
+    print(f"{'Página':34} {'ms':>8} {'base':>8} {'RSS (MB)':>9}")
+    for caminho in paginas():
+        nome = caminho.name
+        medicao = medir(caminho, argumentos.repeticoes)
+        medicoes[nome] = {"ms": medicao["ms"], "rss_kb": medicao["rss_kb"]}
+        referencia = base.get(nome, {}).get("ms")
+        limite = None if referencia is None else referencia * (1 + TOLERANCIA_RELATIVA) + TOLERANCIA_MS
+        situacao = "" if limite is None or medicao["ms"] <= limite else "  ← acima da base"
+        if situacao:
+            reprovadas.append(nome)
+        texto_base = "-" if referencia is None else f"{referencia:.1f}"
+        print(f"{nome:34} {medicao['ms']:8.1f} {texto_base:>8} {medicao['rss_kb'] / 1024:9.1f}{situacao}")
+        if argumentos.detalhar:
+            for modulo, tempo in medicao["mais_pesados"].items():
+                print(f"    {modulo:30} {tempo:8.1f} ms")
+
+    if argumentos.atualizar:
+        Path(argumentos.base).write_text(json.dumps(medicoes, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"Linha de base gravada em {argumentos.base}.")
+        return 0
+    if reprovadas:
+        print(f"Importação mais lenta que a base em: {', '.join(reprovadas)}.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
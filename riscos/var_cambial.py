@@ -0,0 +1,104 @@
+"""VaR cambial delta-normal do mapa de exposição, em reais.
+
+O mapa de exposição mantém o total de cada moeda em cada faixa de prazo
+(`exposicao.matriz_exposicao`); a carteira inteira, com qualquer número de
+exposições, chega aqui como uma matriz moedas × faixas. Ela é convertida em reais
+pela última PTAX em cache, e o VaR sai de uma única passada vetorizada:
+
+- VaR total, marginal, componente e incremental por moeda (`parametrico.decompor_var`);
+- VaR isolado de cada faixa de prazo, √(eᵀΣe) para todas as faixas de uma vez.
+
+A covariância dos log-retornos diários da PTAX é mantida por um
+`EstimadorCovariancia` em memória, sobre uma janela móvel: os dias novos entram e os
+que saíram da janela são removidos, sem refazer a estimativa. Exposições em
+reais não têm risco cambial; moedas sem PTAX são deixadas de fora e informadas.
+"""
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from riscos.exposicao import FAIXAS_PRAZO, matriz_exposicao
+from riscos.parametrico import ESTIMADORES, covariancia_em_cache, decompor_var, dias_janela
+from riscos.ptax import MOEDAS_PTAX, obter_ptax_lote
+
+MOEDA_LOCAL = "BRL"
+
+
+def covariancia_cambial(moedas, inicio, metodo="amostral", fim=None):
+    """Covariância diária dos log-retornos da PTAX das moedas.
+
+    Retorna (covariância, PTAX usada). O estimador de cada combinação (moedas, tamanho
+    da janela) fica em memória e, a cada chamada, incorpora apenas os dias novos e
+    remove os que saíram da janela.
+    """
+    if metodo not in ESTIMADORES:
+        raise ValueError(f"Estimador desconhecido: {metodo!r}. Opções: {', '.join(ESTIMADORES)}.")
+    moedas = list(moedas)
+    ptax = obter_ptax_lote(moedas, inicio, fim).reindex(columns=moedas)
+    retornos = np.log(ptax).diff().dropna()
+    if len(retornos) < 2:
+        raise ValueError("Histórico de PTAX insuficiente para estimar a covariância.")
+
+    return covariancia_em_cache(("ptax", tuple(moedas), dias_janela(inicio, fim)), retornos, metodo), ptax
+
+
+def carteira_em_reais(carteira, inicio, metodo="amostral", caminho=None):
+    """Matriz moedas × faixas da carteira convertida em reais, com a covariância cambial.
+
+    Retorna um dicionário com a matriz em reais (`matriz_brl`, incluindo BRL), a parte
+    sujeita a risco cambial (`em_reais`, só moedas com PTAX), a covariância dessas
+    moedas, a última PTAX e sua data, e a lista de moedas sem PTAX.
+    """
+    matriz = matriz_exposicao(carteira, caminho)
+    moedas = [moeda for moeda in matriz.index if moeda in MOEDAS_PTAX]
+    locais = matriz.loc[[moeda for moeda in matriz.index if moeda == MOEDA_LOCAL]]
+    carteira_brl = {
+        "moedas_sem_ptax": [moeda for moeda in matriz.index if moeda != MOEDA_LOCAL and moeda not in MOEDAS_PTAX],
+        "matriz_brl": locais,
+        "em_reais": matriz.loc[moedas],
+        "covariancia": np.zeros((0, 0)),
+        "ptax": pd.Series(dtype=float),
+        "data_ptax": None,
+    }
+    if not moedas:
+        return carteira_brl
+
+    covariancia, ptax = covariancia_cambial(moedas, inicio, metodo)
+    ptax = ptax.dropna()
+    # Conversão da carteira inteira: uma multiplicação da matriz moedas × faixas pela PTAX
+    em_reais = matriz.loc[moedas].mul(ptax.iloc[-1].to_numpy(), axis=0)
+    carteira_brl.update(matriz_brl=pd.concat([locais, em_reais]), em_reais=em_reais, covariancia=covariancia,
+                        ptax=ptax.iloc[-1], data_ptax=ptax.index[-1].date())
+    return carteira_brl
+
+
+def var_exposicao(carteira, nivel_confianca, horizonte_tempo, inicio, metodo="amostral", caminho=None):
+    """VaR cambial da carteira de exposições, em reais.
+
+    Retorna um dicionário com a matriz moedas × faixas em reais, a PTAX usada
+    (data e cotação), o VaR total, o detalhamento por moeda, o VaR isolado de cada
+    faixa de prazo e a lista de moedas sem PTAX (não incluídas no cálculo).
+    """
+    resultado = carteira_em_reais(carteira, inicio, metodo, caminho)
+    em_reais, covariancia = resultado["em_reais"], resultado["covariancia"]
+    exposicoes = em_reais.sum(axis=1).to_numpy()
+    decomposicao = decompor_var(exposicoes, covariancia, nivel_confianca, horizonte_tempo)
+
+    escala = NormalDist().inv_cdf(nivel_confianca) * np.sqrt(horizonte_tempo)
+    por_faixa = em_reais.to_numpy().T
+    variancias_faixa = np.einsum("fi,ij,fj->f", por_faixa, covariancia, por_faixa)
+    resultado.update(
+        var=decomposicao["var"],
+        por_moeda=pd.DataFrame({
+            "Moeda": em_reais.index,
+            "PTAX": resultado["ptax"].reindex(em_reais.index).to_numpy(),
+            "Exposição (R$)": exposicoes,
+            "VaR Isolado (R$)": escala * np.abs(exposicoes) * np.sqrt(np.diag(covariancia)),
+            "VaR Componente (R$)": decomposicao["var_componentes"],
+            "VaR Incremental (R$)": decomposicao["var_incremental"],
+        }),
+        por_faixa=pd.DataFrame({"Faixa de Prazo": FAIXAS_PRAZO,
+                                "VaR Isolado (R$)": escala * np.sqrt(np.maximum(variancias_faixa, 0.0))}),
+    )
+    return resultado
@@ -0,0 +1,116 @@
+"""Volatilidade condicional (EWMA e GARCH(1,1)) e simulação histórica filtrada (FHS).
+
+As recursões de variância são filtros lineares sobre os retornos ao quadrado e são
+avaliadas de uma vez com `scipy.signal.lfilter`, sem laço em Python. Os parâmetros
+GARCH ajustados ficam em cache (memória e disco) por ativo e intervalo de datas;
+uma nova consulta com outro nível de confiança não reajusta o modelo, e um intervalo
+novo do mesmo ativo parte dos últimos parâmetros conhecidos.
+"""
+import threading
+
+import numpy as np
+
+from riscos.armazenamento import diretorio_cache, ler_json, salvar_json
+from riscos.historico import var_historico
+
+LAMBDA_RISKMETRICS = 0.94
+
+# Chute inicial típico de séries diárias quando não há ajuste anterior do ativo
+PARAMETROS_GARCH_INICIAIS = (0.08, 0.90)
+
+_parametros_garch = {}
+_trava = threading.Lock()
+
+
+def variancia_ewma(retornos, lambda_=LAMBDA_RISKMETRICS):
+    """Variância condicional EWMA: σ²ₜ = λ·σ²ₜ₋₁ + (1 - λ)·r²ₜ₋₁ (um valor por retorno, mais a previsão)."""
+    from scipy.signal import lfilter
+
+    quadrados = np.asarray(retornos, dtype=float) ** 2
+    inicial = quadrados.mean()
+    variancias = lfilter([1 - lambda_], [1, -lambda_], quadrados, zi=[lambda_ * inicial])[0]
+    return np.concatenate([[inicial], variancias])
+
+
+def variancia_garch(retornos, omega, alfa, beta):
+    """Variância condicional GARCH(1,1): σ²ₜ = ω + α·r²ₜ₋₁ + β·σ²ₜ₋₁ (um valor por retorno, mais a previsão)."""
+    from scipy.signal import lfilter
+
+    quadrados = np.asarray(retornos, dtype=float) ** 2
+    inicial = quadrados.mean()
+    variancias = lfilter([1], [1, -beta], omega + alfa * quadrados, zi=[beta * inicial])[0]
+    return np.concatenate([[inicial], variancias])
+
+
+def _verossimilhanca_negativa(parametros, retornos, variancia_amostral):
+    alfa, beta = parametros
+    # Variance targeting: ω fixado pela variância incondicional da amostra
+    omega = variancia_amostral * (1 - alfa - beta)
+    variancias = np.maximum(variancia_garch(retornos, omega, alfa, beta)[:-1], 1e-20)
+    return 0.5 * np.sum(np.log(variancias) + retornos ** 2 / variancias)
+
+
+def ajustar_garch(retornos, inicial=None):
+    """Ajusta um GARCH(1,1) gaussiano por máxima verossimilhança e retorna (ω, α, β)."""
+    from scipy.optimize import minimize
+
+    retornos = np.asarray(retornos, dtype=float)
+    variancia_amostral = np.mean(retornos ** 2)
+    resultado = minimize(
+        _verossimilhanca_negativa, x0=np.asarray(inicial or PARAMETROS_GARCH_INICIAIS),
+        args=(retornos, variancia_amostral), method="SLSQP",
+        bounds=[(1e-6, 0.5), (0.0, 0.9999)],
+        constraints=[{"type": "ineq", "fun": lambda p: 0.9999 - p[0] - p[1]}],
+    )
+    alfa, beta = resultado.x
+    return variancia_amostral * (1 - alfa - beta), alfa, beta
+
+
+def _arquivo_cache():
+    return diretorio_cache("volatilidade") / "parametros_garch.json"
+
+
+def parametros_garch(retornos, ticker=None):
+    """Parâmetros GARCH do ativo para o intervalo de datas de `retornos`, ajustando só se necessário.
+
+    `retornos` deve ser uma série indexada por data. Sem `ticker`, o ajuste não é
+    guardado em cache.
+    """
+    if ticker is None:
+        return ajustar_garch(retornos.to_numpy())
+
+    chave = f"{ticker}|{retornos.index[0]:%Y-%m-%d}|{retornos.index[-1]:%Y-%m-%d}|{len(retornos)}"
+    with _trava:
+        if not _parametros_garch:
+            _parametros_garch.update(ler_json(_arquivo_cache()) or {})
+        if chave in _parametros_garch:
+            return tuple(_parametros_garch[chave])
+        # Parte do ajuste mais recente do mesmo ativo (warm start), se houver
+        anteriores = [valor for chave_anterior, valor in _parametros_garch.items()
+                      if chave_anterior.startswith(f"{ticker}|")]
+        inicial = tuple(anteriores[-1][1:]) if anteriores else None
+
+    parametros = ajustar_garch(retornos.to_numpy(), inicial)
+    with _trava:
+        _parametros_garch[chave] = list(parametros)
+        salvar_json(_parametros_garch, _arquivo_cache())
+    return parametros
+
+
+def var_filtrado(retornos, nivel_confianca, modelo="ewma", ticker=None, lambda_=LAMBDA_RISKMETRICS):
+    """VaR e ES por simulação histórica filtrada.
+
+    Os retornos são padronizados pela volatilidade condicional de cada dia e
+    reescalados pela volatilidade prevista para o dia seguinte; VaR e ES seguem a
+    mesma convenção de `var_historico`. Retorna (VaR, ES, volatilidade prevista).
+    """
+    retornos = retornos.dropna()
+    valores = retornos.to_numpy()
+    if modelo == "garch":
+        variancias = variancia_garch(valores, *parametros_garch(retornos, ticker))
+    else:
+        variancias = variancia_ewma(valores, lambda_)
+    volatilidade_prevista = np.sqrt(variancias[-1])
+    padronizados = valores / np.sqrt(variancias[:-1])
+    var, es = var_historico(padronizados * volatilidade_prevista, nivel_confianca)
+    return var, es, volatilidade_prevista